@@ -1,7 +1,9 @@
 __author__ = 'Thodoris Sotiropoulos'
 
 
-from flask import Flask
+from flask import Flask, session
+
+from mvc.controller.graphfile import graphfile
 
 app = Flask(__name__)
 app.secret_key = "rd"
@@ -15,6 +17,14 @@ import mvc.view.diagram
 import mvc.view.project
 import mvc.view.download
 
+@app.teardown_request
+def flush_graph(exception):
+    """Save the graph of user to session store, if it has changed, and persist
+    the graphs which have been evicted during request."""
+    user = session.get('user')
+    if user:
+        graphfile.flush(user)
+
 @app.errorhandler(404)
 def page_not_found(e):
     """Return a custom 404 error."""
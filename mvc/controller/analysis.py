@@ -14,63 +14,543 @@ import matplotlib as mat
 
 mat.use('AGG')
 import operator
+from collections import deque
 
+import community
+import numpy as np
+from heapq import heappop, heappush
 
-def _remove_max_edge(G, weight=None):
+from mvc.controller.brandes import accumulate_betweenness
+from mvc.controller.cliques import degeneracy_ordering, find_cliques
+from mvc.controller.louvain import (modularity, positive_weight,
+                                    weighted_adjacency)
+from mvc.controller.parallel import map_sources
+
+
+# Relative difference under which edge betweenness values are considered
+# equal, because they are sums of the same dependencies in different order.
+TIE_TOLERANCE = 1.0e-9
+
+# Maximum number of cliques which are enumerated and number of cliques of a
+# page of cliques.
+MAX_CLIQUES = 10000
+PAGE_SIZE = 100
+
+# Estimated size in bytes of the state of Girvan - Newman algorithm for every
+# edge of graph.
+COMMUNITY_EDGE_SIZE = 1 << 9
+
+
+class GirvanNewman:
+    """
+    This class represents the state of Girvan - Newman algorithm on a graph:
+    an integer indexed adjacency list of graph, whose edges are removed, its
+    connected components and the edge betweenness centrality inside each of
+    them. Every node is labeled with the component it belongs to, so that the
+    communities of a level are a single array of labels.
+
+    Removing an edge changes betweenness centrality only inside the component
+    which contains it, so betweenness is calculated again only for that
+    component, or for the components it is split into. The maximum edge
+    betweenness of every component is kept in a heap, so that the edges with
+    the highest betweenness of graph are found without scanning all of them.
+    Node and edge betweenness are accumulated together by Brandes algorithm.
+
+    Removed edges are recorded, so that the state of algorithm can be
+    restored from graph and the removed edges.
     """
-    Removes edge with the highest value on betweenness centrality.
+    def __init__(self, graph, weight='weight', nodes=None, removed=()):
+        """
+        Finds connected components of graph and calculates edge betweenness
+        centrality inside each of them.
+
+        :param graph Undirected networkx graph, which is not changed.
+        :param weight Edge data key corresponding to the edge weight, which
+        is 1 for edges without it, or None for unweighted shortest paths.
+        :param nodes List of nodes of graph, which defines their indices, or
+        None for the order of nodes of graph.
+        :param removed Pairs of indices of nodes of edges which have already
+        been removed.
+        """
+        self.nodes = graph.nodes() if nodes is None else nodes
+        index = dict((node, i) for i, node in enumerate(self.nodes))
+        self.weighted = weight is not None and any(
+            weight in data for u, v, data in graph.edges_iter(data=True))
+        self.adjacency = [[] for node in self.nodes]
+        for u, v, data in graph.edges_iter(data=True):
+            i, j = index[u], index[v]
+            if self.weighted:
+                length = data.get(weight, 1)
+                self.adjacency[i].append((j, length))
+                if i != j:
+                    self.adjacency[j].append((i, length))
+            else:
+                self.adjacency[i].append(j)
+                if i != j:
+                    self.adjacency[j].append(i)
+        self.removed = []
+        for v, w in removed:
+            self.remove_edge(v, w)
+        self.components = {}
+        self.heap = []
+        self.labels = np.zeros(len(self.nodes), dtype=np.int32)
+        self.next_component = 0
+        self.number_of_components = 0
+        for nodes in self.find_components(range(len(self.nodes))):
+            self.add_component(nodes)
+
+    def neighbors(self, v):
+        """ Gets indices of the neighbors of a node. """
+        if self.weighted:
+            return [w for w, length in self.adjacency[v]]
+        return self.adjacency[v]
+
+    def find_components(self, nodes):
+        """
+        Finds connected components with breadth first search.
+
+        :param nodes Indices of nodes, which include all nodes of their
+        connected components.
+        :return List of lists of indices of nodes of each component.
+        """
+        components = []
+        seen = set()
+        for source in nodes:
+            if source in seen:
+                continue
+            seen.add(source)
+            component = [source]
+            queue = deque([source])
+            while queue:
+                for w in self.neighbors(queue.popleft()):
+                    if w not in seen:
+                        seen.add(w)
+                        component.append(w)
+                        queue.append(w)
+            components.append(component)
+        return components
+
+    def add_component(self, nodes):
+        """
+        Adds a connected component, calculating edge betweenness centrality of
+        its edges. Edges which are not on any shortest path, such as self-loops,
+        have zero betweenness.
+
+        :param nodes List of indices of nodes of component.
+        """
+        component = self.next_component
+        self.next_component += 1
+        self.number_of_components += 1
+        self.labels[nodes] = component
+        edges = {}
+        for v in nodes:
+            for w in self.neighbors(v):
+                if v <= w:
+                    edges[(v, w)] = 0.0
+        if not edges:
+            return
+        edges.update(accumulate_betweenness(self.adjacency, nodes,
+                                            self.weighted, False)[1])
+        self.components[component] = (nodes, edges)
+        heappush(self.heap, (-max(edges.values()), component))
+
+    def remove_edge(self, v, w):
+        """ Removes an edge, given the indices of its nodes. """
+        self.removed.append((v, w))
+        if self.weighted:
+            self.adjacency[v] = [entry for entry in self.adjacency[v]
+                                 if entry[0] != w]
+            self.adjacency[w] = [entry for entry in self.adjacency[w]
+                                 if entry[0] != v]
+        else:
+            self.adjacency[v].remove(w)
+            if v != w:
+                self.adjacency[w].remove(v)
 
-    Repeat this step until more connected components than the connected
-    components of the original graph are detected.
+    def has_edges(self):
+        """ Checks if graph has edges which have not been removed. """
+        return bool(self.heap)
 
-    It is part of Girvan-Newman algorithm.
+    def community_labels(self):
+        """
+        Gets the communities of nodes, which are the current connected
+        components of graph.
+
+        :return Array of labels of the communities of nodes, in the order of
+        nodes. Communities are numbered from 0 in decreasing order of size.
+        """
+        return order_labels(self.labels)
 
-    :param G: NetworkX graph
-    :param weight: string, optional (default=None) Edge data key corresponding
-    to the edge weight.
+    def split(self):
+        """
+        Removes the edges with the highest betweenness centrality of graph,
+        until more connected components than the connected components of graph
+        before removal are detected, or until graph has no edges.
+
+        All the edges with the highest betweenness are removed at once, in
+        every component in which they are found. Values which differ less than
+        tie tolerance are considered equal.
+        """
+        number_components = self.number_of_components
+        while self.number_of_components <= number_components and self.heap:
+            threshold = -self.heap[0][0] * (1.0 - TIE_TOLERANCE)
+            split_components = []
+            while self.heap and -self.heap[0][0] >= threshold:
+                component = heappop(self.heap)[1]
+                split_components.append(self.components.pop(component))
+            for nodes, edges in split_components:
+                for (v, w), value in edges.items():
+                    if value >= threshold:
+                        self.remove_edge(v, w)
+                self.number_of_components -= 1
+                for component in self.find_components(nodes):
+                    self.add_component(component)
+
+
+def order_labels(labels):
     """
-    number_components = nx.number_connected_components(G)
-    while nx.number_connected_components(G) <= number_components:
-        betweenness = nx.edge_betweenness_centrality(G, weight=weight)
-        max_value = max(betweenness.values())
-        for edge in G.edges():
-            if betweenness[edge] == max_value:
-                G.remove_edge(*edge)
+    Numbers communities from 0 in decreasing order of size.
+
+    :param labels Array of labels of the communities of nodes.
+    :return Array of new labels of the communities of nodes.
+    """
+    communities, labels = np.unique(labels, return_inverse=True)
+    order = np.argsort(-np.bincount(labels), kind='mergesort')
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order))
+    return rank[labels]
 
 
-def girvan_newman_algorithm(graph, weight='weight'):
+def group_nodes(nodes, labels):
     """
-    Implementation of Girvan - Newman algorithm for community detection.
+    Groups nodes by the label of their community.
 
-    :param graph Graph object to check for communities.
-    :return List of communities which are detected.
+    :param nodes List of nodes.
+    :param labels Array of labels of the communities of nodes, numbered from 0.
+    :return List of lists of nodes of each community.
     """
-    g = graph.copy().to_undirected()
-    components = []
-    while g.number_of_edges() > 0:
-        _remove_max_edge(g, weight)
-        components.append(nx.connected_component_subgraphs(g))
-    return components
+    communities = [[] for i in range(int(labels.max()) + 1 if len(nodes) else 0)]
+    for node, label in zip(nodes, labels.tolist()):
+        communities[label].append(node)
+    return communities
 
 
 class Community:
     """
-    This class represents clusters that can be detected on a graph such as
-    communities and cliques.
+    This class represents the communities that can be detected on a graph.
+
+    Levels of communities are detected by Girvan - Newman algorithm on demand,
+    up to the level after the highest one which has been requested, and each
+    level is kept as an array of the labels of the communities of nodes,
+    together with its modularity.
+
+    Only the levels and the edges which algorithm has removed are pickled. The
+    state of algorithm is restored from graph, which is given again with
+    attach(), when further levels are detected.
     """
+    graph = None
+
     def __init__(self, graph):
         """
-        Detects both cliques and communities of graph.
+        Prepares the detection of the communities of graph.
 
         :param graph Graph object to be analyzed.
         """
         g = nx.Graph(graph)
-        self.cliques = self.get_cliques(g)
-        self.communities = girvan_newman_algorithm(g)
+        self.algorithm = GirvanNewman(g)
+        self.nodes = self.algorithm.nodes
+        self.adjacency = weighted_adjacency(g, self.nodes)
+        self.number_of_edges = g.number_of_edges()
+        self.levels = []
+        self.modularity = []
+
+    def __getstate__(self):
+        """
+        Gets the state of communities to be pickled, without the state of
+        algorithm and graph.
+
+        :return Dictionary of attributes of communities.
+        """
+        state = self.__dict__.copy()
+        for name in ('algorithm', 'adjacency', 'graph'):
+            state.pop(name, None)
+        if self.algorithm is not None:
+            state['removed'] = np.array(self.algorithm.removed,
+                                        dtype=np.int32).reshape(-1, 2)
+            state['exhausted'] = not self.algorithm.has_edges()
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restores pickled communities, whose algorithm is restored when it is
+        needed.
+
+        :param state Dictionary of attributes of pickled communities.
+        """
+        self.__dict__.update(state)
+        self.algorithm = None
+        self.adjacency = None
+
+    def attach(self, graph):
+        """
+        Gives the graph of communities, from which the state of algorithm is
+        restored, if communities have been pickled.
+
+        :param graph Graph object, which has not changed since communities
+        were detected.
+        """
+        self.graph = graph
+
+    def restore(self):
+        """ Restores the state of algorithm, if it has been pickled. """
+        if self.algorithm is None:
+            g = nx.Graph(self.graph)
+            self.algorithm = GirvanNewman(g, nodes=self.nodes,
+                                          removed=self.removed.tolist())
+            self.adjacency = weighted_adjacency(g, self.nodes)
+
+    def has_edges(self):
+        """ Checks if graph can be split further. """
+        if self.algorithm is None:
+            return not self.exhausted
+        return self.algorithm.has_edges()
+
+    def estimate_size(self):
+        """
+        Estimates the memory which is occupied by the levels of communities
+        and the state of their detection.
+
+        :return: Estimated size in bytes.
+        """
+        size = sum(labels.nbytes for labels in self.levels)
+        if self.algorithm is not None:
+            size += COMMUNITY_EDGE_SIZE * self.number_of_edges
+        return size
+
+    def detect(self, level):
+        """
+        Detects the levels of communities up to the level after a level, if
+        they have not been detected yet, so that it is known whether the next
+        level is the last one.
+
+        :param level Level of communities, starting from 1.
+        """
+        if len(self.levels) <= level and self.has_edges():
+            self.restore()
+        while len(self.levels) <= level and self.algorithm.has_edges():
+            self.algorithm.split()
+            labels = self.algorithm.community_labels()
+            self.levels.append(labels)
+            self.modularity.append(modularity(self.adjacency, labels.tolist()))
+
+    def get_level(self, level):
+        """
+        Gets the communities of a level, detecting the levels up to it, if
+        they have not been detected yet. Levels after the last one are the
+        same as the last one.
+
+        :param level Level of communities, starting from 1.
+        :return List of lists of nodes of each community, in decreasing order
+        of size.
+        """
+        self.detect(level)
+        if self.levels:
+            labels = self.levels[min(level, len(self.levels)) - 1]
+        else:
+            self.restore()
+            labels = self.algorithm.community_labels()
+        return group_nodes(self.nodes, labels)
 
-    def get_cliques(self, graph):
-        """ Detects maximal cliques of graph. """
-        return list(nx.find_cliques(graph))
+    def number_of_levels(self):
+        """
+        Gets the number of levels which can be requested: the levels which
+        have been detected, except for the last level, in which graph has no
+        edges, once all levels have been detected.
+
+        :return Number of levels.
+        """
+        if self.has_edges():
+            return len(self.levels)
+        return max(len(self.levels) - 1, 0)
+
+    def get_modularity(self, level):
+        """
+        Gets the modularity of the communities of a level.
+
+        :param level Level of communities, starting from 1.
+        :return Modularity.
+        """
+        self.detect(level)
+        if self.levels:
+            return self.modularity[min(level, len(self.levels)) - 1]
+        self.restore()
+        return modularity(self.adjacency,
+                          self.algorithm.community_labels().tolist())
+
+
+class Cliques:
+    """
+    This class represents the maximal cliques of a graph.
+
+    Enumeration is bounded by a minimum size of cliques and a maximum number of
+    cliques, and it runs in parallel over the nodes of graph in a degeneracy
+    ordering. Cliques are kept as an array of their nodes and an array of the
+    offsets of cliques in it, in decreasing order of size, and they are read
+    in pages.
+    """
+    def __init__(self, snapshot, min_size=1, limit=MAX_CLIQUES, workers=1):
+        """
+        Enumerates the maximal cliques of graph. If graph has more cliques than
+        limit, the ones which are found first in degeneracy ordering are kept,
+        for any number of workers: each worker searches its nodes in this
+        ordering and stops after limit cliques, so its cliques which are among
+        the first ones of graph have all been found when they are merged.
+
+        :param snapshot GraphSnapshot object of graph.
+        :param min_size Minimum number of nodes of cliques.
+        :param limit Maximum number of cliques.
+        :param workers Number of processes which search cliques in parallel.
+        """
+        self.nodes = snapshot.nodes
+        self.min_size = min_size
+        self.limit = limit
+        order, adjacency = degeneracy_ordering(snapshot.undirected().adjacency())
+        found = []
+        self.complete = True
+        for partial, truncated in map_sources(find_cliques, adjacency,
+                                              range(len(order)), workers,
+                                              min_size, limit):
+            found.extend(partial)
+            self.complete = self.complete and not truncated
+        found.sort(key=operator.itemgetter(0))
+        if len(found) > limit:
+            found = found[:limit]
+            self.complete = False
+        cliques = sorted((clique for node, clique in found), key=len,
+                         reverse=True)
+        sizes = np.array([len(clique) for clique in cliques], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(sizes)))
+        self.members = np.array(order, dtype=np.int32)[
+            [u for clique in cliques for u in clique]]
+
+    def covers(self, min_size, limit):
+        """
+        Checks if these cliques are the result of an enumeration with some
+        minimum size and limit.
+
+        :param min_size Minimum number of nodes of cliques.
+        :param limit Maximum number of cliques.
+        :return True if enumeration would find the same cliques, False
+        otherwise.
+        """
+        return min_size == self.min_size and (
+            (self.complete and (limit is None or
+                                self.number_of_cliques() <= limit)) or
+            limit == self.limit)
+
+    def estimate_size(self):
+        """
+        Estimates the memory which is occupied by cliques.
+
+        :return: Estimated size in bytes.
+        """
+        return self.offsets.nbytes + self.members.nbytes
+
+    def number_of_cliques(self):
+        """ Gets the number of cliques. """
+        return len(self.offsets) - 1
+
+    def get_page(self, page, page_size=PAGE_SIZE):
+        """
+        Gets a page of cliques.
+
+        :param page Number of page, starting from 1.
+        :param page_size Number of cliques of a page.
+        :return List of lists of nodes of each clique of page.
+        """
+        start = max(page - 1, 0) * page_size
+        end = min(start + page_size, self.number_of_cliques())
+        if start >= end:
+            return []
+        offsets = (self.offsets[start:end + 1] - self.offsets[start]).tolist()
+        members = self.members[self.offsets[start]:self.offsets[end]].tolist()
+        return [[self.nodes[u] for u in members[offsets[i]:offsets[i + 1]]]
+                for i in range(len(offsets) - 1)]
+
+
+class LouvainCommunities:
+    """
+    This class represents the communities of a graph which are detected by
+    Louvain algorithm of the community library.
+
+    Levels are in the same order as the levels of Girvan - Newman algorithm:
+    the first level has the fewest communities and the highest modularity,
+    and every next level has more communities. Each level is kept as an array
+    of the labels of the communities of nodes, together with its modularity.
+    """
+    def __init__(self, graph):
+        """
+        Detects all levels of communities of graph. Nodes are visited in the
+        same pseudo-random order every time, so that the same graph always
+        gets the same communities.
+
+        :param graph Graph object to be analyzed.
+        """
+        g = nx.Graph(graph)
+        self.nodes = g.nodes()
+        adjacency = weighted_adjacency(g, self.nodes)
+        if positive_weight(g) is None:
+            unweighted = nx.Graph()
+            unweighted.add_nodes_from(self.nodes)
+            unweighted.add_edges_from(g.edges_iter())
+            g = unweighted
+        dendrogram = community.generate_dendrogram(g, random_state=0)
+        self.levels = []
+        for level in reversed(range(len(dendrogram))):
+            partition = community.partition_at_level(dendrogram, level)
+            self.levels.append(order_labels(
+                np.array([partition[node] for node in self.nodes])))
+        self.modularity = [modularity(adjacency, labels.tolist())
+                           for labels in self.levels]
+
+    def estimate_size(self):
+        """
+        Estimates the memory which is occupied by the levels of communities.
+
+        :return: Estimated size in bytes.
+        """
+        return sum(labels.nbytes for labels in self.levels)
+
+    def get_level(self, level):
+        """
+        Gets the communities of a level. Levels after the last one are the
+        same as the last one and graphs without edges have a community for
+        every node.
+
+        :param level Level of communities, starting from 1.
+        :return List of lists of nodes of each community, in decreasing order
+        of size.
+        """
+        if self.levels:
+            labels = self.levels[min(level, len(self.levels)) - 1]
+        else:
+            labels = np.arange(len(self.nodes), dtype=np.int32)
+        return group_nodes(self.nodes, labels)
+
+    def number_of_levels(self):
+        """ Gets the number of levels of communities. """
+        return len(self.levels)
+
+    def get_modularity(self, level):
+        """
+        Gets the modularity of the communities of a level.
+
+        :param level Level of communities, starting from 1.
+        :return Modularity.
+        """
+        if self.levels:
+            return self.modularity[min(level, len(self.levels)) - 1]
+        return 0.0
 
 
 def define_size_ranking(ranking):
@@ -0,0 +1,124 @@
+"""
+This module contains Brandes algorithm for betweenness centrality.
+
+Shortest paths from every source node are found on an integer indexed
+adjacency list, with breadth first search for unweighted graphs and Dijkstra
+algorithm for weighted graphs, and the dependencies of source node on nodes
+and edges are accumulated from them in reverse order of distance.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+from collections import deque
+from heapq import heappop, heappush
+
+
+def shortest_path_dag(adjacency, source):
+    """
+    Finds shortest paths (based on path length) from a source node to every
+    node reachable from it with breadth first search.
+
+    :param adjacency Integer indexed adjacency list without weights.
+    :param source Index of source node.
+    :return List of nodes in order of non-decreasing distance from source
+    node, dictionary of predecessors of every node in shortest paths and
+    dictionary of number of shortest paths to every node.
+    """
+    order = []
+    predecessors = {source: []}
+    sigma = {source: 1.0}
+    distance = {source: 0}
+    queue = deque([source])
+    while queue:
+        v = queue.popleft()
+        order.append(v)
+        next_distance = distance[v] + 1
+        for w in adjacency[v]:
+            if w not in distance:
+                distance[w] = next_distance
+                sigma[w] = 0.0
+                predecessors[w] = []
+                queue.append(w)
+            if distance[w] == next_distance:
+                sigma[w] += sigma[v]
+                predecessors[w].append(v)
+    return order, predecessors, sigma
+
+
+def weighted_shortest_path_dag(adjacency, source):
+    """
+    Finds shortest paths (based on edge weights) from a source node to every
+    node reachable from it with Dijkstra algorithm.
+
+    :param adjacency Integer indexed adjacency list with weights.
+    :param source Index of source node.
+    :return List of nodes in order of non-decreasing distance from source
+    node, dictionary of predecessors of every node in shortest paths and
+    dictionary of number of shortest paths to every node.
+    """
+    order = []
+    predecessors = {source: []}
+    sigma = {source: 1.0}
+    distance = {}
+    seen = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        dist, v = heappop(heap)
+        if v in distance:
+            continue
+        distance[v] = dist
+        order.append(v)
+        for w, weight in adjacency[v]:
+            length = dist + weight
+            if w not in distance and (w not in seen or length < seen[w]):
+                seen[w] = length
+                heappush(heap, (length, w))
+                sigma[w] = sigma[v]
+                predecessors[w] = [v]
+            elif length == seen[w]:
+                sigma[w] += sigma[v]
+                predecessors[w].append(v)
+    return order, predecessors, sigma
+
+
+def accumulate_betweenness(adjacency, sources, weighted, directed):
+    """
+    Accumulates the dependencies of source nodes on every other node and
+    every edge according to Brandes algorithm.
+
+    Both dependencies are accumulated from the same shortest paths, so
+    betweenness centrality of nodes and edges is calculated with a single
+    traversal from every source node.
+
+    :param adjacency Integer indexed adjacency list.
+    :param sources List of indices of source nodes.
+    :param weighted If True, adjacency list contains weights and shortest
+    paths are based on them.
+    :param directed If False, edges are identified by the pair of indices
+    of their nodes in ascending order.
+    :return List of (not normalized) betweenness centrality values of nodes
+    and dictionary of (not normalized) betweenness centrality values of edges
+    keyed by pairs of node indices, which are contributed by source nodes.
+    """
+    if weighted:
+        find_paths = weighted_shortest_path_dag
+    else:
+        find_paths = shortest_path_dag
+    betweenness = [0.0] * len(adjacency)
+    edge_betweenness = {}
+    for source in sources:
+        order, predecessors, sigma = find_paths(adjacency, source)
+        delta = dict.fromkeys(order, 0.0)
+        while order:
+            w = order.pop()
+            coefficient = (1.0 + delta[w]) / sigma[w]
+            for v in predecessors[w]:
+                c = sigma[v] * coefficient
+                if directed or v < w:
+                    edge = (v, w)
+                else:
+                    edge = (w, v)
+                edge_betweenness[edge] = edge_betweenness.get(edge, 0.0) + c
+                delta[v] += c
+            if w != source:
+                betweenness[w] += delta[w]
+    return betweenness, edge_betweenness
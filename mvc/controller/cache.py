@@ -0,0 +1,256 @@
+"""
+This module contains a cache of analyses of uploaded graphs, which is shared
+by all users of system.
+
+Analyses are addressed by the content of graph: the digest of its canonical
+form, which depends only on the type of graph, the labels of its nodes and
+its edges with their weights, and not on the order of lines of graph file.
+Together with the version of analysis algorithms, it makes the key of the
+analysis, so that the same graph uploaded again, by any user, gets the metrics
+and characteristics which have already been calculated.
+
+Analyses are kept compressed in memory, up to a total size. When this size is
+exceeded, least recently used analyses are spilled to a directory on disk,
+which is bounded by size too. Spilled analyses are unpickled when they are
+read, so they are kept only in a directory which is private to the user of
+process; otherwise analyses are not spilled.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import hashlib
+import os
+import pickle
+import stat
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Maximum size in bytes of the analyses which are kept in memory and of the
+# analyses which are spilled to disk.
+MEMORY_CAPACITY = 64 << 20
+DISK_CAPACITY = 1 << 30
+
+# Default directory of spilled analyses, which is shared by the processes of
+# the same user.
+SPILL_DIRECTORY = os.path.join(tempfile.gettempdir(),
+                               'netxanal-analyses-%d' % os.getuid())
+
+
+def private_directory(path):
+    """
+    Creates a directory which can be accessed only by the user of process, if
+    it does not exist, and checks that it is such a directory.
+
+    :param path Path of directory.
+    :return True if directory is owned by the user of process and nobody else
+    has access to it, False otherwise, e.g. if it is a symbolic link.
+    """
+    try:
+        os.makedirs(path, 0700)
+    except EnvironmentError:
+        pass
+    try:
+        status = os.lstat(path)
+    except EnvironmentError:
+        return False
+    return (stat.S_ISDIR(status.st_mode) and status.st_uid == os.getuid() and
+            not status.st_mode & 0077)
+
+
+class CanonicalForm:
+    """
+    This class represents a graph in a form which does not depend on the order
+    in which its nodes and edges were added: nodes are sorted by label and
+    edges by the positions of their nodes in sorted labels.
+    """
+    def __init__(self, labels, sources, targets, digest):
+        """
+        Initializes canonical form.
+
+        :param labels Sorted list of labels of nodes.
+        :param sources Array of positions of source nodes of sorted edges.
+        :param targets Array of positions of target nodes of sorted edges.
+        :param digest Hexadecimal digest of canonical form.
+        """
+        self.labels = labels
+        self.sources = sources
+        self.targets = targets
+        self.digest = digest
+
+
+def canonical_form(snapshot):
+    """
+    Creates the canonical form of a graph. Edges of undirected graphs are
+    stored from the node with the smaller position to the other one.
+
+    :param snapshot GraphSnapshot object of graph.
+    :return CanonicalForm object.
+    """
+    nodes = snapshot.nodes
+    order = sorted(range(len(nodes)), key=nodes.__getitem__)
+    labels = [nodes[i] for i in order]
+    position = np.empty(len(nodes), dtype=np.int64)
+    position[order] = np.arange(len(nodes))
+    rows, targets, weights = snapshot.edges()
+    sources = position[rows]
+    targets = position[targets]
+    if not snapshot.directed:
+        sources, targets = (np.minimum(sources, targets),
+                            np.maximum(sources, targets))
+    edge_order = np.lexsort((targets, sources))
+    sources = sources[edge_order]
+    targets = targets[edge_order]
+    digest = hashlib.sha1('directed' if snapshot.directed else 'undirected')
+    for label in labels:
+        digest.update(str(label) + '\0')
+    digest.update(sources.astype('<i8').tostring())
+    digest.update(targets.astype('<i8').tostring())
+    if weights is not None:
+        digest.update(weights[edge_order].astype('<f8').tostring())
+    return CanonicalForm(labels, sources, targets, digest.hexdigest())
+
+
+class AnalysisCache:
+    """
+    This class represents a cache of analyses with least recently used (LRU)
+    eviction and a tier on disk.
+
+    Analyses are stored as compressed pickles, so that their size is known and
+    they are written to disk as they are. Cache can be used by many threads.
+    """
+    def __init__(self, capacity=MEMORY_CAPACITY, directory=SPILL_DIRECTORY,
+                 disk_capacity=DISK_CAPACITY):
+        """
+        Initializes an empty cache.
+
+        :param capacity Maximum size in bytes of analyses in memory.
+        :param directory Directory of spilled analyses or None if analyses
+        which are evicted from memory are discarded. Analyses are discarded
+        too, if directory is not private to the user of process.
+        :param disk_capacity Maximum size in bytes of spilled analyses.
+        """
+        self.capacity = capacity
+        self.directory = directory
+        self.private = None
+        self.disk_capacity = disk_capacity
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def _spills(self):
+        """
+        Checks if analyses are spilled to disk, i.e. if there is a spill
+        directory and it is private. Directory is checked once.
+        """
+        if self.directory is None:
+            return False
+        if self.private is None:
+            self.private = private_directory(self.directory)
+        return self.private
+
+    def _path(self, key):
+        """ Gets the path of the file of a spilled analysis. """
+        return os.path.join(self.directory, key + '.analysis')
+
+    def get(self, key):
+        """
+        Gets an analysis. Analyses which are found on disk are copied back to
+        memory.
+
+        :param key Key of analysis.
+        :return Analysis or None if it is not cached.
+        """
+        with self.lock:
+            blob = self.entries.pop(key, None)
+            if blob is None:
+                blob = self._load(key)
+                if blob is None:
+                    return None
+                self.size += len(blob)
+            self.entries[key] = blob
+            self._evict()
+        return pickle.loads(zlib.decompress(blob))
+
+    def put(self, key, analysis):
+        """
+        Stores an analysis, replacing the previous one with the same key.
+
+        :param key Key of analysis.
+        :param analysis Picklable analysis.
+        """
+        blob = zlib.compress(pickle.dumps(analysis, pickle.HIGHEST_PROTOCOL))
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = blob
+            self.size += len(blob)
+            self._evict()
+
+    def _evict(self):
+        """
+        Moves least recently used analyses to disk, until the size of analyses
+        in memory does not exceed capacity.
+        """
+        while self.size > self.capacity and self.entries:
+            key, blob = self.entries.popitem(last=False)
+            self.size -= len(blob)
+            self._spill(key, blob)
+
+    def _load(self, key):
+        """
+        Reads a spilled analysis. File is kept, so that other processes can
+        read it too, and its modification time is updated, so that files are
+        removed from disk in least recently used order.
+
+        :param key Key of analysis.
+        :return Compressed analysis or None if it has not been spilled.
+        """
+        if not self._spills():
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+            os.utime(path, None)
+            return blob
+        except EnvironmentError:
+            return None
+
+    def _spill(self, key, blob):
+        """
+        Writes an analysis to disk. Files are renamed after they are written,
+        so that other processes never read partial analyses. The oldest files
+        are removed when disk capacity is exceeded.
+
+        :param key Key of analysis.
+        :param blob Compressed analysis.
+        """
+        if not self._spills() or len(blob) > self.disk_capacity:
+            return
+        try:
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(descriptor, 'wb') as f:
+                f.write(blob)
+            os.rename(temporary, self._path(key))
+            files = []
+            for name in os.listdir(self.directory):
+                if name.endswith('.analysis'):
+                    status = os.stat(os.path.join(self.directory, name))
+                    files.append((status.st_mtime, status.st_size, name))
+            total = sum(size for mtime, size, name in files)
+            for mtime, size, name in sorted(files):
+                if total <= self.disk_capacity:
+                    break
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+        except EnvironmentError:
+            pass
+
+
+# Cache which is shared by all users of system.
+shared_cache = AnalysisCache()
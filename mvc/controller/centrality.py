@@ -0,0 +1,131 @@
+"""
+This module contains sparse implementations of centrality measures which are
+defined by the dominant eigenvector of a matrix of graph, such as PageRank and
+eigenvector centrality.
+
+Instead of building dense n x n matrices, they run on the compressed sparse
+row (CSR) snapshot of graph and the dominant eigenvector is found with power
+iteration. Each iteration costs O(n + m) time and memory.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import numpy as np
+
+
+def _start_vector(nodes, start):
+    """
+    Creates the initial vector of power iteration.
+
+    :param nodes List of nodes.
+    :param start Dictionary of previous values keyed by node, or None. Nodes
+    which have no previous value get the mean of the previous values.
+    :return Array of initial values.
+    """
+    n = len(nodes)
+    if not start:
+        return np.ones(n) / n
+    known = [start[node] for node in nodes if node in start]
+    default = sum(known) / len(known) if known else 1.0 / n
+    x = np.array([float(start.get(node, default)) for node in nodes])
+    if not np.isfinite(x).all() or x.sum() <= 0:
+        return np.ones(n) / n
+    return x / x.sum()
+
+
+def _block_source(snapshot, weighted):
+    """
+    Gets a function which returns the blocks of edges of a snapshot for every
+    iteration. Snapshots in memory are a single block, which is created once,
+    whereas blocks of memory-mapped snapshots are read again in every iteration.
+
+    :param snapshot GraphSnapshot object.
+    :param weighted If True, edge weights are taken into account.
+    :return Function which returns an iterable of blocks of edges.
+    """
+    if snapshot.out_of_core:
+        return lambda: snapshot.blocks(weighted)
+    blocks = list(snapshot.blocks(weighted, max(len(snapshot.targets), 1)))
+    return lambda: blocks
+
+
+def pagerank(snapshot, alpha=0.85, weighted=True, tol=1.0e-6, max_iter=100,
+             start=None):
+    """
+    Calculates PageRank of every node of graph with power iteration.
+
+    Nodes without outgoing edges (dangling nodes) are considered to link to
+    every node, as in the Google matrix.
+
+    :param snapshot GraphSnapshot object.
+    :param alpha Damping factor.
+    :param weighted If True, edge weights are taken into account.
+    :param tol Error tolerance; iteration stops when the sum of the changes of
+    values is less than the number of nodes multiplied by tolerance.
+    :param max_iter Maximum number of iterations. If values have not converged
+    by then, the values of the last iteration are returned.
+    :param start Dictionary of previous PageRank values keyed by node, which
+    are used as a warm start.
+    :return Dictionary of PageRank values keyed by node.
+    """
+    nodes = snapshot.nodes
+    n = len(nodes)
+    if n == 0:
+        return {}
+    out_weight = snapshot.out_degree(weighted)
+    dangling = out_weight == 0
+    out_weight[dangling] = 1.0
+    blocks = _block_source(snapshot, weighted)
+    x = _start_vector(nodes, start)
+    for i in range(max_iter):
+        previous = x
+        x = np.zeros(n)
+        for rows, columns, values in blocks():
+            x += np.bincount(columns, weights=previous[rows] * values / out_weight[rows],
+                             minlength=n)
+        x *= alpha
+        x += (alpha * previous[dangling].sum() + 1.0 - alpha) / n
+        x /= x.sum()
+        if np.abs(x - previous).sum() < n * tol:
+            break
+    return snapshot.node_values(x)
+
+
+def eigenvector_centrality(snapshot, weighted=True, tol=1.0e-8, max_iter=1000,
+                           start=None):
+    """
+    Calculates eigenvector centrality of every node of graph with power
+    iteration.
+
+    The centrality vector is the dominant eigenvector of adjacency matrix A
+    of graph, normalized to unit length. Iteration is done on A + I, which has
+    the same eigenvectors, so that it converges for bipartite graphs too.
+
+    :param snapshot GraphSnapshot object.
+    :param weighted If True, edge weights are taken into account.
+    :param tol Error tolerance; iteration stops when the sum of the changes of
+    values is less than the number of nodes multiplied by tolerance.
+    :param max_iter Maximum number of iterations. If values have not converged
+    by then, the values of the last iteration are returned.
+    :param start Dictionary of previous centrality values keyed by node, which
+    are used as a warm start.
+    :return Dictionary of eigenvector centrality values keyed by node.
+    """
+    nodes = snapshot.nodes
+    n = len(nodes)
+    if n == 0:
+        return {}
+    blocks = _block_source(snapshot, weighted)
+    x = _start_vector(nodes, start)
+    x /= np.linalg.norm(x)
+    for i in range(max_iter):
+        previous = x
+        x = previous.copy()
+        for rows, columns, values in blocks():
+            x += np.bincount(rows, weights=values * previous[columns], minlength=n)
+        norm = np.linalg.norm(x)
+        if norm == 0:
+            return dict.fromkeys(nodes, 0.0)
+        x /= norm
+        if np.abs(x - previous).sum() < n * tol:
+            break
+    return snapshot.node_values(x)
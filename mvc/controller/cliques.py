@@ -0,0 +1,129 @@
+"""
+This module contains the enumeration of the maximal cliques of a graph with
+Bron - Kerbosch algorithm.
+
+Nodes are numbered in a degeneracy ordering, in which every node has at most d
+neighbors after it, where d is the degeneracy of graph. Maximal cliques are
+found from every node separately: cliques of a node are the ones whose first
+node, in this ordering, is the node itself, so that they are searched among
+its at most d later neighbors and every clique is found exactly once. Searches
+from different nodes are independent, so they can run in parallel.
+
+Enumeration is bounded: searches skip cliques smaller than a minimum size and
+stop as soon as a maximum number of cliques has been found.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+
+def degeneracy_ordering(adjacency):
+    """
+    Numbers the nodes of an undirected graph in a degeneracy ordering, by
+    removing a node of minimum degree repeatedly, in O(n + m) time.
+
+    :param adjacency Integer indexed adjacency list of graph.
+    :return List of node indices in degeneracy ordering and adjacency list of
+    graph without self-loops, whose nodes are numbered by their position in
+    this ordering.
+    """
+    n = len(adjacency)
+    neighbors = [set(adjacency[i]) for i in range(n)]
+    for i in range(n):
+        neighbors[i].discard(i)
+    degree = [len(nbrs) for nbrs in neighbors]
+    order = sorted(range(n), key=degree.__getitem__)
+    position = [0] * n
+    for i, node in enumerate(order):
+        position[node] = i
+    bins = [0] * (max(degree) + 2 if n else 1)
+    for d in degree:
+        bins[d + 1] += 1
+    for d in range(1, len(bins)):
+        bins[d] += bins[d - 1]
+    for node in order:
+        for neighbor in neighbors[node]:
+            d = degree[neighbor]
+            if d > degree[node]:
+                first = order[bins[d]]
+                if first != neighbor:
+                    i, j = position[neighbor], bins[d]
+                    order[i], order[j] = first, neighbor
+                    position[first], position[neighbor] = i, j
+                bins[d] += 1
+                degree[neighbor] -= 1
+    return order, [set(position[neighbor] for neighbor in neighbors[node])
+                   for node in order]
+
+
+def node_cliques(adjacency, node, min_size=1):
+    """
+    Finds the maximal cliques whose first node in the ordering of graph is a
+    node, with Bron - Kerbosch algorithm with pivoting. Pivot is the node which
+    is adjacent to the most candidates and branches in which an excluded node
+    is adjacent to all candidates are pruned, since they contain no maximal
+    cliques. Search is iterative, so that it is not limited by the size of
+    cliques.
+
+    :param adjacency Adjacency list of sets of neighbors, without self-loops.
+    :param node Index of node.
+    :param min_size Minimum number of nodes of cliques.
+    :return Generator of lists of node indices of cliques.
+    """
+    later = set(neighbor for neighbor in adjacency[node] if neighbor > node)
+    if 1 + len(later) < min_size:
+        return
+    stack = [([node], later, adjacency[node] - later)]
+    while stack:
+        clique, candidates, excluded = stack.pop()
+        if not candidates:
+            if not excluded and len(clique) >= min_size:
+                yield clique
+            continue
+        if len(clique) + len(candidates) < min_size:
+            continue
+        if not excluded and len(candidates) == 1:
+            yield clique + list(candidates)
+            continue
+        size = len(candidates)
+        pivot, connections = None, -1
+        for u in excluded:
+            k = len(candidates & adjacency[u])
+            if k > connections:
+                pivot, connections = u, k
+                if k == size:
+                    break
+        if connections == size:
+            continue
+        for u in candidates:
+            k = len(candidates & adjacency[u])
+            if k > connections:
+                pivot, connections = u, k
+                if k == size - 1:
+                    break
+        for u in list(candidates - adjacency[pivot]):
+            stack.append((clique + [u], candidates & adjacency[u],
+                          excluded & adjacency[u]))
+            candidates.remove(u)
+            excluded.add(u)
+
+
+def find_cliques(adjacency, sources, min_size=1, limit=None):
+    """
+    Finds the maximal cliques of a list of nodes, in increasing order of node
+    index, until limit is reached.
+
+    :param adjacency Adjacency list of graph in degeneracy ordering, as it is
+    created by degeneracy_ordering().
+    :param sources List of node indices.
+    :param min_size Minimum number of nodes of cliques.
+    :param limit Maximum number of cliques or None.
+    :return List of tuples of node index and clique, in the order in which
+    they were found, and True if search has stopped before all cliques were
+    found, False otherwise.
+    """
+    found = []
+    for node in sorted(sources):
+        for clique in node_cliques(adjacency, node, min_size):
+            if limit is not None and len(found) == limit:
+                return found, True
+            found.append((node, clique))
+    return found, False
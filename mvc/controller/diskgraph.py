@@ -0,0 +1,401 @@
+"""
+This module contains a disk-backed representation of graphs which are too
+large to be loaded in memory as networkx graphs.
+
+Edges of graph are sorted into files in compressed sparse row (CSR) format,
+which are memory-mapped by snapshots of graph, so that numeric algorithms scan
+them block by block. A graph directory contains:
+-- graph.json with the type and the size of graph.
+-- nodes with the labels of nodes, separated by NUL bytes. The position of a
+label is the index of node.
+-- For every view of graph (out, in and sym), an array of offsets in npy format
+and the raw arrays of int32 targets and float64 weights of edges. Directed
+graphs have all three views, with sym being their undirected view, whereas
+undirected graphs only have sym.
+-- A directory of values with an array of values of nodes in npy format for
+every metric which has been calculated.
+
+Files are created with a counting sort which scatters blocks of edges to their
+positions, so that edges are never loaded at once. Parallel edges are merged
+as in networkx: the weight of the last one is kept, except for the undirected
+view of directed graphs, which keeps the minimum weight.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import json
+import os
+import shutil
+import tempfile
+from array import array
+
+import numpy as np
+
+from mvc.controller.graphformat import (BATCH_SIZE, is_binary, load_binary,
+                                        parse_edge_list)
+from mvc.controller.snapshot import BLOCK_SIZE, GraphSnapshot
+
+
+# Names of files of a graph directory.
+META_FILE = 'graph.json'
+NODES_FILE = 'nodes'
+VALUES_DIRECTORY = 'values'
+
+# Scratch files where the edges of a graph file in txt format are appended,
+# before they are sorted.
+SCRATCH_FILES = ('sources.tmp', 'targets.tmp', 'weights.tmp')
+
+
+def _open_array(path, dtype, mode='r', length=None):
+    """
+    Memory-maps a raw array file.
+
+    :param path Path of file.
+    :param dtype Type of elements of array.
+    :param mode Mode of memory-mapping, 'r' for reading and 'w+' for creating.
+    :param length Number of elements of a created array.
+    :return Memory-mapped array, or an empty array for empty files.
+    """
+    if mode == 'w+' and not length:
+        open(path, 'wb').close()
+        return np.zeros(0, dtype=dtype)
+    if mode == 'r' and not os.path.getsize(path):
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode=mode, shape=length)
+
+
+def write_csr(prefix, n, blocks, weighted, keep_min=False):
+    """
+    Sorts edges into files in compressed sparse row format.
+
+    Edges are read twice: first, the number of edges of every node is counted
+    and then every edge is scattered to its position in a scratch file. Last,
+    rows of scratch file are sorted by target and parallel edges are merged,
+    while the final files are written sequentially.
+
+    :param prefix Path prefix of files of view.
+    :param n Number of nodes.
+    :param blocks Function which returns an iterable of blocks of edges. Each
+    block is a tuple of arrays of source node indices, target node indices and
+    weights (or None).
+    :param weighted True if edges have weights.
+    :param keep_min If True, the parallel edge with the minimum weight is kept,
+    otherwise the last one.
+    :return Number of edges and number of self loops which are stored.
+    """
+    counts = np.zeros(n, dtype=np.int64)
+    for rows, columns, values in blocks():
+        counts += np.bincount(rows, minlength=n)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    m = int(offsets[-1])
+    scratch_targets = _open_array(prefix + '.targets.tmp', np.int32, 'w+', m)
+    scratch_weights = None
+    if weighted:
+        scratch_weights = _open_array(prefix + '.weights.tmp', np.float64, 'w+', m)
+    cursor = offsets[:-1].copy()
+    for rows, columns, values in blocks():
+        order = np.argsort(rows, kind='mergesort')
+        rows = rows[order]
+        positions = (cursor[rows] + np.arange(len(rows)) -
+                     np.searchsorted(rows, rows))
+        scratch_targets[positions] = columns[order]
+        if weighted:
+            scratch_weights[positions] = values[order]
+        cursor += np.bincount(rows, minlength=n)
+
+    counts[:] = 0
+    loops = 0
+    target_file = open(prefix + '.targets', 'wb')
+    weight_file = open(prefix + '.weights', 'wb') if weighted else None
+    try:
+        start = 0
+        while start < n:
+            end = np.searchsorted(offsets, offsets[start] + BLOCK_SIZE, 'right') - 1
+            end = max(end, start + 1)
+            first, last = offsets[start], offsets[end]
+            rows = np.repeat(np.arange(start, end, dtype=np.int32),
+                             np.diff(offsets[start:end + 1]))
+            columns = np.asarray(scratch_targets[first:last])
+            if weighted and keep_min:
+                order = np.lexsort((scratch_weights[first:last], columns, rows))
+            else:
+                order = np.lexsort((-np.arange(len(rows)), columns, rows))
+            rows = rows[order]
+            columns = columns[order]
+            kept = np.ones(len(rows), dtype=bool)
+            kept[1:] = (rows[1:] != rows[:-1]) | (columns[1:] != columns[:-1])
+            rows = rows[kept]
+            columns = columns[kept]
+            counts[start:end] = np.bincount(rows - start, minlength=end - start)
+            loops += int((rows == columns).sum())
+            columns.astype('<i4').tofile(target_file)
+            if weighted:
+                values = np.asarray(scratch_weights[first:last])[order][kept]
+                values.astype('<f8').tofile(weight_file)
+            start = end
+    finally:
+        target_file.close()
+        if weight_file is not None:
+            weight_file.close()
+    del scratch_targets, scratch_weights
+    os.remove(prefix + '.targets.tmp')
+    if weighted:
+        os.remove(prefix + '.weights.tmp')
+    np.cumsum(counts, out=offsets[1:])
+    np.save(prefix + '.offsets.npy', offsets)
+    return int(offsets[-1]), loops
+
+
+def _edge_blocks(sources, targets, weights, view):
+    """
+    Creates a function which scans the edges of a graph in blocks, as they are
+    required by write_csr().
+
+    :param sources Array of indices of source nodes of edges.
+    :param targets Array of indices of target nodes of edges.
+    :param weights Array of weights of edges or None.
+    :param view 'out' for edges as they are, 'in' for reversed edges and 'sym'
+    for edges in both directions, with self loops stored once.
+    :return Function which returns a generator of blocks of edges.
+    """
+    def blocks():
+        for start in range(0, len(sources), BLOCK_SIZE):
+            u = np.asarray(sources[start:start + BLOCK_SIZE], dtype=np.int32)
+            v = np.asarray(targets[start:start + BLOCK_SIZE], dtype=np.int32)
+            w = None
+            if weights is not None:
+                w = np.asarray(weights[start:start + BLOCK_SIZE], dtype=np.float64)
+            if view == 'out':
+                yield u, v, w
+            elif view == 'in':
+                yield v, u, w
+            else:
+                mask = np.ones(2 * len(u), dtype=bool)
+                mask[1::2] = u != v
+                rows = np.column_stack((u, v)).ravel()[mask]
+                columns = np.column_stack((v, u)).ravel()[mask]
+                if w is not None:
+                    w = np.repeat(w, 2)[mask]
+                yield rows, columns, w
+    return blocks
+
+
+def build_disk_graph(directory, labels, directed, sources, targets, weights):
+    """
+    Writes the files of a graph to a graph directory.
+
+    :param directory Path of graph directory, which exists.
+    :param labels List of labels of nodes, indexed by node index.
+    :param directed True if graph is directed, False otherwise.
+    :param sources Array of indices of source nodes of edges.
+    :param targets Array of indices of target nodes of edges.
+    :param weights Array of weights of edges or None.
+    :return DiskGraph object.
+    """
+    n = len(labels)
+    weighted = weights is not None
+    views = ('out', 'in', 'sym') if directed else ('sym',)
+    for view in views:
+        m, loops = write_csr(os.path.join(directory, view), n,
+                             _edge_blocks(sources, targets, weights, view),
+                             weighted, keep_min=directed and view == 'sym')
+        if view == 'out':
+            edges = m
+        elif not directed:
+            edges = (m + loops) // 2
+    with open(os.path.join(directory, NODES_FILE), 'wb') as f:
+        f.write('\0'.join(labels))
+    with open(os.path.join(directory, META_FILE), 'w') as f:
+        json.dump({'directed': directed, 'weighted': weighted, 'nodes': n,
+                   'edges': edges}, f)
+    os.mkdir(os.path.join(directory, VALUES_DIRECTORY))
+    return DiskGraph(directory)
+
+
+def _write_edge_list(directory, stream, batch_size=BATCH_SIZE):
+    """
+    Appends the edges of a graph file in txt format to scratch files of
+    integer indices and weights.
+
+    :param directory Path of directory of scratch files.
+    :param stream File-like object or string with the contents of file.
+    :param batch_size Number of edges which are written at once.
+    :return List of labels of nodes, indexed by node index, and True if some
+    edge has weight.
+    :raise GraphFileError If file contains a line which cannot be parsed.
+    """
+    index = {}
+    labels = []
+    weighted = False
+    files = [open(os.path.join(directory, name), 'wb') for name in SCRATCH_FILES]
+    batch = (array('i'), array('i'), array('d'))
+    try:
+        for edge in parse_edge_list(stream):
+            for part, label in zip(batch, edge[:2]):
+                i = index.get(label)
+                if i is None:
+                    i = index[label] = len(labels)
+                    labels.append(label)
+                part.append(i)
+            if len(edge) == 3:
+                weighted = True
+                batch[2].append(edge[2]['weight'])
+            else:
+                batch[2].append(1.0)
+            if len(batch[0]) == batch_size:
+                for part, f in zip(batch, files):
+                    part.tofile(f)
+                    del part[:]
+        for part, f in zip(batch, files):
+            part.tofile(f)
+    finally:
+        for f in files:
+            f.close()
+    return labels, weighted
+
+
+def create_disk_graph(data, directed, parent=None):
+    """
+    Creates a disk-backed graph from a graph file.
+
+    :param data Stream or string of the data of graph file.
+    :param directed True if graph of a file in txt format is directed. Files in
+    binary format define whether graph is directed themselves.
+    :param parent Directory in which graph directory is created or None for
+    the default temporary directory.
+    :return DiskGraph object.
+    :raise GraphFileError If file cannot be parsed. Graph directory is removed
+    then.
+    """
+    directory = tempfile.mkdtemp(prefix='graph-', dir=parent)
+    try:
+        if is_binary(data):
+            contents = load_binary(data)
+            return build_disk_graph(directory, contents.labels,
+                                    contents.directed, contents.sources,
+                                    contents.targets, contents.weights)
+        labels, weighted = _write_edge_list(directory, data)
+        paths = [os.path.join(directory, name) for name in SCRATCH_FILES]
+        arrays = [_open_array(path, dtype)
+                  for path, dtype in zip(paths, (np.intc, np.intc, np.float64))]
+        graph = build_disk_graph(directory, labels, directed, arrays[0],
+                                 arrays[1], arrays[2] if weighted else None)
+        del arrays
+        for path in paths:
+            os.remove(path)
+        return graph
+    except Exception:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+
+class DiskGraph:
+    """
+    This class represents a graph which is stored in a graph directory.
+
+    Only the path of directory is pickled, so that pickled graphs remain small,
+    and files are opened again when they are needed.
+
+    Graph directories are temporary: they are removed when the progress of
+    analysis of graph is discarded, unless graph is persistent, i.e. it belongs
+    to a progress which user has saved.
+    """
+    def __init__(self, directory, persistent=False):
+        """
+        Opens a graph directory.
+
+        :param directory Path of graph directory.
+        :param persistent True if graph belongs to a saved progress.
+        """
+        self.directory = directory
+        self.persistent = persistent
+        self._nodes = None
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        self.directed = meta['directed']
+        self.weighted = meta['weighted']
+        self.number_of_nodes = meta['nodes']
+        self.number_of_edges = meta['edges']
+
+    def __getstate__(self):
+        """ Gets the state of graph to be pickled. """
+        return {'directory': self.directory, 'persistent': self.persistent}
+
+    def __setstate__(self, state):
+        """
+        Restores a pickled graph by opening its directory again. Graphs which
+        were pickled before they could be persistent are considered persistent,
+        so that they are never removed.
+        """
+        self.__init__(state['directory'], state.get('persistent', True))
+
+    def remove(self):
+        """ Removes graph directory with all of its files. """
+        self._nodes = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @property
+    def nodes(self):
+        """ List of labels of nodes, indexed by node index. """
+        if self._nodes is None:
+            if self.number_of_nodes:
+                with open(os.path.join(self.directory, NODES_FILE), 'rb') as f:
+                    self._nodes = [intern(label) for label in f.read().split('\0')]
+            else:
+                self._nodes = []
+        return self._nodes
+
+    def _load_view(self, view, directed):
+        """
+        Creates a snapshot which memory-maps the files of a view of graph.
+
+        :param view Name of view.
+        :param directed True if view is directed.
+        :return GraphSnapshot object.
+        """
+        prefix = os.path.join(self.directory, view)
+        weights = None
+        if self.weighted:
+            weights = _open_array(prefix + '.weights', '<f8')
+        snapshot = GraphSnapshot(self.nodes, None, np.load(prefix + '.offsets.npy'),
+                                 _open_array(prefix + '.targets', '<i4'),
+                                 weights, directed)
+        snapshot.out_of_core = True
+        return snapshot
+
+    def snapshot(self):
+        """
+        Creates a snapshot of graph, whose arrays are memory-mapped files.
+
+        :return GraphSnapshot object, which has stored views for the reversed
+        graph and for the undirected view of directed graphs.
+        """
+        if not self.directed:
+            return self._load_view('sym', False)
+        snapshot = self._load_view('out', True)
+        snapshot.reverse_view = self._load_view('in', True)
+        snapshot.undirected_view = self._load_view('sym', False)
+        return snapshot
+
+    def save_values(self, name, values):
+        """
+        Stores the values of a metric for every node of graph.
+
+        :param name Name of metric.
+        :param values Array of values, indexed by node index.
+        """
+        np.save(os.path.join(self.directory, VALUES_DIRECTORY, name + '.npy'),
+                values)
+
+    def load_values(self, name):
+        """
+        Loads the values of a metric for every node of graph.
+
+        :param name Name of metric.
+        :return Array of values, indexed by node index, or None if values have
+        not been stored.
+        """
+        path = os.path.join(self.directory, VALUES_DIRECTORY, name + '.npy')
+        if not os.path.exists(path):
+            return None
+        return np.load(path)
@@ -5,37 +5,783 @@ can either analyze or visualize.
 """
 __author__ = 'Thodoris Sotiropoulos'
 
-from random import random, randint
+import os
+from contextlib import contextmanager
+from heapq import heappop, heappush
+from math import ceil, log, sqrt
+from random import random, randint, sample
 
 import networkx as nx
+import numpy as np
+
+from mvc.controller import centrality
+from mvc.controller.analysis import (MAX_CLIQUES, Cliques, Community,
+                                     LouvainCommunities)
+from mvc.controller.brandes import accumulate_betweenness
+from mvc.controller.cache import canonical_form, shared_cache
+from mvc.controller.diskgraph import create_disk_graph
+from mvc.controller.graphformat import (estimate_edges, is_binary, read_binary,
+                                        read_edge_list)
+from mvc.controller.parallel import WorkerPool, map_sources, run_tasks
+from mvc.controller.snapshot import create_snapshot
+
+
+# Aspects of a graph that every stored metric depends on. When graph changes,
+# only the metrics which depend on one of the changed aspects are invalidated.
+METRIC_DEPENDENCIES = {
+    'betweenness': ('nodes', 'edges', 'weights'),
+    'edge_betweenness': ('nodes', 'edges', 'weights'),
+    'closeness': ('nodes', 'edges'),
+    'eigenvector': ('nodes', 'edges', 'weights'),
+    'pagerank': ('nodes', 'edges', 'weights'),
+    'degree': ('nodes', 'edges'),
+    'in_degree': ('nodes', 'edges'),
+    'out_degree': ('nodes', 'edges'),
+    'clustering': ('nodes', 'edges', 'weights'),
+    'weighted_degree': ('nodes', 'edges', 'weights'),
+    'weighted_in_degree': ('nodes', 'edges', 'weights'),
+    'weighted_out_degree': ('nodes', 'edges', 'weights'),
+    'weak': ('nodes', 'edges'),
+    'strong': ('nodes', 'edges'),
+    'full': ('nodes', 'edges'),
+    'is_weighted': ('edges', 'weights'),
+    'has_negative_weights': ('edges', 'weights'),
+    'negative_cycle': ('nodes', 'edges', 'weights'),
+    'is_connected': ('nodes', 'edges'),
+    'is_DAG': ('nodes', 'edges'),
+    'diameter': ('nodes', 'edges'),
+    'distances': ('nodes', 'edges'),
+    'average_shortest_path_length': ('nodes', 'edges', 'weights'),
+    'snapshot': ('nodes', 'edges', 'weights'),
+    'canonical': ('nodes', 'edges', 'weights'),
+    'communities': ('nodes', 'edges', 'weights'),
+    'louvain': ('nodes', 'edges', 'weights'),
+    'cliques': ('nodes', 'edges'),
+}
+
+# Metrics which are data structures derived from graph rather than results of
+# analysis, or intermediate results whose size grows with graph, such as the
+# summary of distances from which kept metrics are derived and enumerated
+# cliques. They are not pickled with graph, but created again on demand.
+TRANSIENT_METRICS = ('snapshot', 'canonical', 'distances', 'cliques')
+
+# Version of analysis algorithms. It is part of the key of cached analyses, so
+# it has to be increased whenever a change of algorithms changes their results.
+ANALYSIS_VERSION = 1
+
+# Characteristics of graph which are stored in cached analyses, because they
+# are expensive to calculate.
+CACHED_CHARACTERISTICS = ('negative_cycle', 'is_connected', 'is_DAG',
+                          'diameter', 'average_shortest_path_length')
+
+# Graph characteristics which are calculated lazily, the first time they are
+# read, instead of being calculated when graph is initialized.
+CHARACTERISTICS = ('is_weighted', 'has_negative_weights', 'negative_cycle',
+                   'is_connected', 'is_DAG', 'diameter',
+                   'average_shortest_path_length', 'density',
+                   'number_of_nodes', 'number_of_edges')
+
+# Metrics which are calculated for graphs stored on disk, because they scan
+# the edges of graph instead of traversing it from every node.
+OUT_OF_CORE_METRICS = ('eigenvector', 'pagerank', 'degree', 'in_degree',
+                       'out_degree', 'weighted_degree', 'weighted_in_degree',
+                       'weighted_out_degree', 'weak', 'strong', 'full')
+
+
+class MetricStore:
+    """
+    This class keeps track of the metrics which have been calculated for a
+    graph and the revision of graph they were calculated for.
+
+    Every change of graph increases its revision. Metrics which depend on
+    the changed aspects of graph (nodes, edges, weights) are invalidated,
+    whereas the rest of them are carried to the new revision.
+
+    Store also counts its changes, i.e. metrics which are added and changes of
+    revision, so that it can be found out cheaply whether it has changed.
+    """
+
+    # Number of changes of store. It is a class attribute, so that stores
+    # which were pickled before changes were counted have a value too.
+    changes = 0
+
+    def __init__(self):
+        """ Initializes an empty store for the first revision of graph. """
+        self.revision = 0
+        self._metrics = {}
+
+    def __getstate__(self):
+        """
+        Gets the state of store to be pickled, without transient metrics.
+
+        :return Dictionary of attributes of store.
+        """
+        state = self.__dict__.copy()
+        state['_metrics'] = dict((name, entry)
+                                 for name, entry in self._metrics.items()
+                                 if name not in TRANSIENT_METRICS)
+        return state
+
+    def add(self, name, value=None):
+        """
+        Marks a metric as calculated for the current revision of graph.
+
+        :param name Name of metric, e.g. 'closeness'.
+        :param value Value of metric, if it is not stored on graph itself,
+        e.g. the diameter of graph.
+        """
+        self._metrics[name] = (self.revision, value)
+        self.changes += 1
+
+    def get(self, name):
+        """
+        Gets the stored value of a metric.
+
+        :param name Name of metric.
+        :return Value of metric.
+        """
+        return self._metrics[name][1]
+
+    def values(self):
+        """
+        Gets the stored values of metrics, including the ones of previous
+        revisions of graph, which are still kept in store.
+
+        :return List of values of metrics.
+        """
+        return [value for revision, value in self._metrics.values()]
+
+    def is_current(self, name):
+        """
+        Checks if a metric has been calculated for the current revision of
+        graph.
+
+        :param name Name of metric.
+        :return True if metric is up to date, False otherwise.
+        """
+        return self._metrics.get(name, (None, None))[0] == self.revision
+
+    def invalidate(self, *aspects):
+        """
+        Increases revision of graph after a change on it.
+
+        :param aspects Aspects of graph which have been changed. These can be
+        'nodes', 'edges' and 'weights'.
+        """
+        previous = self.revision
+        self.revision += 1
+        self.changes += 1
+        for name, (revision, value) in self._metrics.items():
+            dependencies = METRIC_DEPENDENCIES.get(name, aspects)
+            if revision == previous and not set(aspects) & set(dependencies):
+                self._metrics[name] = (self.revision, value)
+
+
+def bfs_distances(adjacency, source):
+    """
+    Calculates length of shortest paths from a source node to every node
+    reachable from it with breadth first search.
+
+    :param adjacency Integer indexed adjacency list without weights.
+    :param source Index of source node.
+    :return Dictionary of distances keyed by node index.
+    """
+    distances = {source: 0}
+    frontier = [source]
+    level = 0
+    while frontier:
+        level += 1
+        next_frontier = []
+        for u in frontier:
+            for v in adjacency[u]:
+                if v not in distances:
+                    distances[v] = level
+                    next_frontier.append(v)
+        frontier = next_frontier
+    return distances
+
+
+def dijkstra_distances(adjacency, source):
+    """
+    Calculates length of shortest paths from a source node to every node
+    reachable from it with Dijkstra algorithm.
+
+    :param adjacency Integer indexed adjacency list with weights.
+    :param source Index of source node.
+    :return Dictionary of distances keyed by node index.
+    :raise ValueError If an edge with negative weight is found.
+    """
+    distances = {}
+    seen = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        dist, u = heappop(heap)
+        if u in distances:
+            continue
+        distances[u] = dist
+        for v, w in adjacency[u]:
+            if w < 0:
+                raise ValueError('Negative edge weight')
+            length = dist + w
+            if v not in seen or length < seen[v]:
+                seen[v] = length
+                heappush(heap, (length, v))
+    return distances
+
+
+def distance_rows(adjacency, sources, weighted):
+    """
+    Traverses graph from every source node and summarizes the lengths of
+    shortest paths from it.
+
+    :param adjacency Integer indexed adjacency list.
+    :param sources List of indices of source nodes.
+    :param weighted If True, adjacency list contains weights and traversals
+    are based on them.
+    :return List of tuples, one for every source node, which contain the
+    index of source node, its eccentricity, the sum of lengths of shortest
+    paths from it, the number of nodes it reaches and the minimum index
+    of these nodes, which identifies its connected component.
+    """
+    if weighted:
+        traverse = dijkstra_distances
+    else:
+        traverse = bfs_distances
+    rows = []
+    for source in sources:
+        distances = traverse(adjacency, source)
+        rows.append((source, max(distances.values()), sum(distances.values()),
+                     len(distances) - 1, min(distances)))
+    return rows
+
+
+class DistanceSummary:
+    """
+    This class represents the summary of all shortest path lengths of a graph.
+
+    Summary is built with a single traversal (BFS or Dijkstra) from every node
+    of graph. Each traversal contributes the eccentricity of its source node,
+    the sum of lengths of shortest paths from it and the number of nodes it
+    reaches, which are accumulated per connected component.
+    """
+    def __init__(self, nodes):
+        """
+        Initializes an empty summary.
+
+        :param nodes List of nodes of graph.
+        """
+        self.nodes = nodes
+        self.eccentricity = [0] * len(nodes)
+        self.totals = [0] * len(nodes)
+        self.reached = [0] * len(nodes)
+        self.components = {}
+
+    def add_rows(self, rows):
+        """
+        Adds the summaries of traversals from source nodes.
+
+        :param rows List of tuples as they are returned by distance_rows().
+        """
+        for source, eccentricity, total, reached, component in rows:
+            self.eccentricity[source] = eccentricity
+            self.totals[source] = total
+            self.reached[source] = reached
+            path_sum, size = self.components.get(component, (0, reached + 1))
+            self.components[component] = (path_sum + total, size)
+
+    def closeness(self):
+        """
+        Calculates closeness centrality of every node, normalized to the number
+        of nodes which each node reaches.
+
+        :return Dictionary of closeness centrality values keyed by node.
+        """
+        n = len(self.nodes)
+        values = {}
+        for i, node in enumerate(self.nodes):
+            if self.totals[i] > 0 and n > 1:
+                values[node] = (self.reached[i] / float(self.totals[i]) *
+                                self.reached[i] / float(n - 1))
+            else:
+                values[node] = 0.0
+        return values
+
+    @property
+    def diameter(self):
+        """
+        Diameter of graph or None if there are nodes which are not reachable
+        from every other node.
+        """
+        if not self.nodes or min(self.reached) < len(self.nodes) - 1:
+            return None
+        return max(self.eccentricity)
+
+    @property
+    def average_shortest_path_length(self):
+        """
+        Average of the average shortest path lengths of connected components
+        which consist of more than one node or None if there is no such
+        component.
+        """
+        average_path = []
+        for path_sum, size in self.components.values():
+            if size > 1:
+                average_path.append(path_sum / float(size * (size - 1)))
+        if not average_path:
+            return None
+        return sum(average_path) / len(average_path)
 
 
-def calculate_average_shortest_path_length(graph, weight):
+def summarize_distances(snapshot, weighted=False, workers=1):
+    """
+    Calculates the summary of all shortest path lengths of a graph by
+    traversing graph once from every node.
+
+    :param snapshot GraphSnapshot object of graph.
+    :param weighted If False, traversals are based on path length, otherwise
+    on edge weights.
+    :param workers Number of processes which traverse graph in parallel.
+    :return DistanceSummary object.
+    :raise ValueError If weighted is True and graph has negative weights.
+    """
+    nodes = snapshot.nodes
+    adjacency = snapshot.adjacency(weighted)
+    summary = DistanceSummary(nodes)
+    for rows in map_sources(distance_rows, adjacency, range(len(nodes)),
+                            workers, weighted):
+        summary.add_rows(rows)
+    return summary
+
+
+def betweenness_sample_size(n, epsilon, delta):
+    """
+    Calculates the number of source nodes which have to be sampled, so that
+    the estimated betweenness centrality of every node differs from its exact
+    value by at most epsilon with probability at least 1 - delta.
+
+    The bound follows from Hoeffding inequality for the normalized
+    dependencies of sampled source nodes and the union bound over all nodes.
+
+    :param n Number of nodes of graph.
+    :param epsilon Maximum error of estimated values.
+    :param delta Probability that error exceeds epsilon.
+    :return Number of source nodes to sample.
+    """
+    return int(ceil(log(2.0 * n / delta) / (2 * epsilon ** 2)))
+
+
+def calculate_betweenness(snapshot, weighted=False, workers=1, sample_size=None):
+    """
+    Calculates normalized betweenness centrality of every node and every edge
+    of a graph.
+
+    If a sample size is given, betweenness centrality is estimated from the
+    dependencies of a random sample of source nodes, scaled by the ratio of
+    the number of nodes to the sample size.
+
+    :param snapshot GraphSnapshot object of graph.
+    :param weighted If False, shortest paths are based on path length,
+    otherwise on edge weights.
+    :param workers Number of processes which traverse graph in parallel.
+    :param sample_size Number of sampled source nodes. If None or not less than
+    the number of nodes, betweenness centrality is calculated exactly.
+    :return Dictionary of betweenness centrality values keyed by node and
+    dictionary of betweenness centrality values keyed by edge.
+    """
+    nodes = snapshot.nodes
+    adjacency = snapshot.adjacency(weighted)
+    directed = snapshot.directed
+    sources = range(len(nodes))
+    if sample_size is not None and sample_size < len(nodes):
+        sources = sample(sources, sample_size)
+    betweenness = [0.0] * len(nodes)
+    edge_betweenness = {}
+    for partial, partial_edges in map_sources(accumulate_betweenness, adjacency,
+                                              sources, workers,
+                                              weighted, directed):
+        for i, value in enumerate(partial):
+            betweenness[i] += value
+        for edge, value in partial_edges.items():
+            edge_betweenness[edge] = edge_betweenness.get(edge, 0.0) + value
+    n = len(nodes)
+    extrapolation = n / float(len(sources)) if sources else 1.0
+    scale = extrapolation / ((n - 1) * (n - 2)) if n > 2 else extrapolation
+    node_values = dict((node, betweenness[i] * scale)
+                       for i, node in enumerate(nodes))
+    scale = extrapolation / (n * (n - 1)) if n > 1 else extrapolation
+    edge_values = {}
+    for edge in zip(*[indices.tolist() for indices in snapshot.edges()[:2]]):
+        edge_values[(nodes[edge[0]], nodes[edge[1]])] = \
+            edge_betweenness.get(edge, 0.0) * scale
+    return node_values, edge_values
+
+
+def calculate_average_shortest_path_length(snapshot, weighted, workers=1):
     """
     Calculates the average shortest path length of a graph. This
     algorithm can either take graph's weight into account or not.
 
-    :param graph Graph object
-    :param weight If None then average shortest path length will be calculated
-    without taking graph weight into account. Otherwise, if parameter's value
-    is equal to 'weight' average shortest path length will be calculated
-    taking graph's weight into account.
+    :param snapshot GraphSnapshot object of graph.
+    :param weighted If False then average shortest path length will be
+    calculated without taking graph weight into account. Otherwise, average
+    shortest path length will be calculated taking graph's weight into account.
+    :param workers Number of processes which traverse graph in parallel.
     :return Average shortest path length of graph.
     """
-    average_path = []
-    for g in nx.connected_component_subgraphs(graph.to_undirected()):
-        try:
-            average_path.append(nx.average_shortest_path_length(g, weight))
-        except ZeroDivisionError:
-            pass
-        except ValueError:
-            return None
-    return sum(average_path) / len(average_path)
+    try:
+        summary = summarize_distances(snapshot.undirected(), weighted, workers)
+    except ValueError:
+        return None
+    return summary.average_shortest_path_length
+
+
+class Estimate:
+    """
+    This class represents an approximate value of a graph characteristic such
+    as diameter or average shortest path length, together with the range in
+    which the exact value lies.
+
+    For sampled characteristics this range is a confidence interval, whereas
+    for bounded characteristics exact value always lies in this range.
+    """
+    def __init__(self, value, lower, upper, confidence=1.0):
+        """
+        Initializes an approximate value.
+
+        :param value Estimated value.
+        :param lower Lower limit of range of exact value.
+        :param upper Upper limit of range of exact value.
+        :param confidence Probability that exact value lies in range.
+        """
+        self.value = value
+        self.lower = lower
+        self.upper = upper
+        self.confidence = confidence
+
+    def __str__(self):
+        if self.lower == self.upper:
+            return str(self.value)
+        return '%s (%s - %s)' % (self.value, self.lower, self.upper)
+
+    def to_dict(self):
+        """
+        Gets estimate as a dictionary, in order to be sent to client in JSON
+        format.
+
+        :return Dictionary of value, range and confidence of estimate.
+        """
+        return {'value': self.value, 'lower': self.lower, 'upper': self.upper,
+                'confidence': self.confidence}
+
+
+def label_components(adjacency, weighted=False):
+    """
+    Labels connected components of an undirected graph with breadth first
+    search.
+
+    :param adjacency Integer indexed adjacency list of an undirected graph.
+    :param weighted True if adjacency list contains weights.
+    :return List of components. Each component is a list of node indices.
+    """
+    labelled = [False] * len(adjacency)
+    components = []
+    for start in range(len(adjacency)):
+        if labelled[start]:
+            continue
+        labelled[start] = True
+        component = [start]
+        for u in component:
+            for v in adjacency[u]:
+                if weighted:
+                    v = v[0]
+                if not labelled[v]:
+                    labelled[v] = True
+                    component.append(v)
+        components.append(component)
+    return components
+
+
+def label_strong_components(adjacency):
+    """
+    Labels strongly connected components of a directed graph with an
+    iterative version of Tarjan algorithm, so that deep graphs do not exceed
+    recursion limit.
+
+    :param adjacency Integer indexed adjacency list without weights.
+    :return List of components. Each component is a list of node indices.
+    """
+    n = len(adjacency)
+    index = [-1] * n
+    lowlink = [0] * n
+    on_stack = [False] * n
+    stack = []
+    components = []
+    counter = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(adjacency[root]))]
+        while work:
+            v, neighbours = work[-1]
+            for w in neighbours:
+                if index[w] == -1:
+                    index[w] = lowlink[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, iter(adjacency[w])))
+                    break
+                elif on_stack[w] and index[w] < lowlink[v]:
+                    lowlink[v] = index[w]
+            else:
+                work.pop()
+                if work and lowlink[v] < lowlink[work[-1][0]]:
+                    lowlink[work[-1][0]] = lowlink[v]
+                if lowlink[v] == index[v]:
+                    component = []
+                    w = None
+                    while w != v:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component.append(w)
+                    components.append(component)
+    return components
+
+
+def label_connected_components(snapshot, connectivity):
+    """
+    Labels connected components of a graph. Components are numbered in order
+    of decreasing size, e.g. nodes of the largest component are labelled as
+    'A0'.
+
+    :param snapshot GraphSnapshot object of graph.
+    :param connectivity 'strong' for strongly connected components of a
+    directed graph, otherwise (weakly) connected components are labelled.
+    :return Dictionary of labels of components keyed by node.
+    """
+    if connectivity.find("strong") != -1:
+        components = label_strong_components(snapshot.adjacency())
+    else:
+        components = label_components(snapshot.undirected().adjacency())
+    components.sort(key=len, reverse=True)
+    nodes = snapshot.nodes
+    labels = {}
+    for counter, component in enumerate(components):
+        label = 'A' + str(counter)
+        for i in component:
+            labels[nodes[i]] = label
+    return labels
+
+
+def calculate_clustering(snapshot, weighted=False):
+    """
+    Calculates clustering coefficient of every node of an undirected graph.
+
+    For weighted graphs, every triangle contributes the geometric mean of the
+    weights of its edges, normalized by the maximum weight of graph, as in
+    networkx.
+
+    :param snapshot GraphSnapshot object of an undirected graph.
+    :param weighted If True, edge weights are taken into account.
+    :return Dictionary of clustering coefficients keyed by node.
+    """
+    adjacency = snapshot.adjacency(weighted=True)
+    max_weight = 1.0
+    if weighted and len(snapshot.targets):
+        max_weight = float(snapshot.values().max())
+    values = []
+    for i, row in enumerate(adjacency):
+        neighbours = dict((j, w / max_weight) for j, w in row if j != i)
+        triangles = 0.0
+        for j, wij in neighbours.items():
+            for k, wjk in adjacency[j]:
+                if k != j and k in neighbours:
+                    if weighted:
+                        triangles += (wij * wjk / max_weight *
+                                      neighbours[k]) ** (1.0 / 3.0)
+                    else:
+                        triangles += 1
+        degree = len(neighbours)
+        if triangles == 0:
+            values.append(0.0)
+        else:
+            values.append(triangles / (degree * (degree - 1)))
+    return dict(zip(snapshot.nodes, values))
+
+
+def estimate_average_shortest_path_length(snapshot, weighted, sample_size,
+                                          workers=1):
+    """
+    Estimates the average shortest path length of a graph by traversing it
+    from a sample of source nodes of each connected component.
+
+    For every source node, the mean length of shortest paths from it is
+    calculated. The average shortest path length of a component is the mean
+    of these values over its nodes, so it is estimated by their mean over
+    the sampled source nodes. Components with no more nodes than sample size
+    are calculated exactly.
+
+    :param snapshot GraphSnapshot object of graph.
+    :param weighted If False, shortest paths are based on path length,
+    otherwise on edge weights.
+    :param sample_size Number of source nodes sampled from every component.
+    :param workers Number of processes which traverse graph in parallel.
+    :return Estimate with a 95% confidence interval or None if graph has no
+    component with more than one node or it has negative weights.
+    """
+    adjacency = snapshot.undirected().adjacency(weighted)
+    components = [c for c in label_components(adjacency, weighted)
+                  if len(c) > 1]
+    if not components:
+        return None
+    sources = []
+    for component in components:
+        if len(component) <= sample_size:
+            sources.extend(component)
+        else:
+            sources.extend(sample(component, sample_size))
+    means = {}
+    try:
+        for rows in map_sources(distance_rows, adjacency, sources, workers,
+                                weighted):
+            for source, eccentricity, total, reached, component in rows:
+                means.setdefault(component, []).append(total / float(reached))
+    except ValueError:
+        return None
+    value = 0.0
+    variance = 0.0
+    for component in components:
+        values = means[min(component)]
+        k = len(values)
+        mean = sum(values) / k
+        value += mean
+        if 1 < k < len(component):
+            sample_variance = sum((x - mean) ** 2 for x in values) / (k - 1)
+            correction = 1.0 - k / float(len(component))
+            variance += sample_variance / k * correction
+    value /= len(components)
+    error = 1.96 * sqrt(variance) / len(components)
+    return Estimate(value, value - error, value + error, confidence=0.95)
+
+
+def estimate_diameter(snapshot, sample_size, workers=1):
+    """
+    Estimates diameter of a graph by calculating lower and upper bounds of it.
+
+    The eccentricity of any node is a lower bound of diameter, whereas the sum
+    of the eccentricities of a node in graph and in reversed graph is an upper
+    bound. Bounds are tightened by a double sweep: the node farthest from a
+    central node is a good start for a traversal which finds a long shortest
+    path, and the middle node of this path is a good candidate for the upper
+    bound. Eccentricities of a sample of nodes are used too. Graph has a finite
+    diameter only if the central node reaches every node and every node
+    reaches it.
+
+    :param snapshot GraphSnapshot object of graph.
+    :param sample_size Number of sampled nodes.
+    :param workers Number of processes which traverse graph in parallel.
+    :return Estimate with the lower bound as value or None if there are nodes
+    which are not reachable from every other node.
+    """
+    nodes = snapshot.nodes
+    if not nodes:
+        return None
+    adjacency = snapshot.adjacency()
+    if snapshot.directed:
+        reverse = snapshot.reverse().adjacency()
+    else:
+        reverse = adjacency
+
+    def sweep(source):
+        """ Traverses graph from a node and returns the farthest node. """
+        distances = bfs_distances(adjacency, source)
+        if len(distances) < len(nodes):
+            return None, None, None
+        farthest = max(distances, key=distances.get)
+        return distances, farthest, distances[farthest]
+
+    center = max(range(len(nodes)), key=lambda i: len(adjacency[i]))
+    distances, start, eccentricity = sweep(center)
+    if distances is None:
+        return None
+    reached = bfs_distances(reverse, center)
+    if len(reached) < len(nodes):
+        return None
+    upper = eccentricity + max(reached.values())
+    distances, end, lower = sweep(start)
+    if distances is None:
+        return None
+    middle = end
+    for i in range(lower // 2):
+        middle = next(v for v in reverse[middle]
+                      if distances.get(v) == distances[middle] - 1)
+    eccentricity = sweep(middle)[2]
+    if eccentricity is None:
+        return None
+    upper = min(upper, eccentricity + max(bfs_distances(reverse, middle).values()))
+    lower = max(lower, eccentricity)
+    sources = sample(range(len(nodes)), min(sample_size, len(nodes)))
+    for rows in map_sources(distance_rows, adjacency, sources, workers, False):
+        for source, eccentricity, total, reached, component in rows:
+            if reached < len(nodes) - 1:
+                return None
+            lower = max(lower, eccentricity)
+    return Estimate(lower, lower, upper)
 
 
 class Graphs:
     """ Class that represents a graph. """
 
+    # Number of processes which run traversals of graph from all of its nodes,
+    # such as the ones for shortest path lengths and betweenness centrality.
+    # It is defined by the NETXANAL_WORKERS environment variable.
+    workers = int(os.environ.get('NETXANAL_WORKERS', 1))
+
+    # Pool of worker processes which is shared by the traversals of a running
+    # analysis (WorkerPool object) or None.
+    pool = None
+
+    # Graphs with more nodes than this threshold get approximate diameter and
+    # average shortest path lengths, calculated from a sample of source nodes.
+    approximation_threshold = 20000
+    sample_size = 256
+
+    # Graphs with more nodes than this threshold get estimated betweenness
+    # centrality, unless exact values are requested. Estimated values differ
+    # from exact ones by at most epsilon with probability 1 - delta.
+    betweenness_threshold = 5000
+    betweenness_epsilon = 0.05
+    betweenness_delta = 0.1
+
+    # If True and there is more than one worker, add_data() calculates
+    # independent metrics at the same time, as tasks of a pool of processes.
+    parallel_metrics = False
+
+    # Uploaded graph files with more edges than this threshold, as they are
+    # estimated from the size of file, are stored on disk instead of being
+    # loaded as networkx graphs. Graph directories are
+    # created in disk directory or in the default temporary directory if it is
+    # None.
+    disk_threshold = 5000000
+    disk_directory = None
+
+    # Disk-backed graph (DiskGraph object) or None for graphs in memory.
+    disk = None
+
+    # Cache of analyses of uploaded graphs (AnalysisCache object or None) and
+    # key of the analysis of graph in cache, which is None for graphs whose
+    # analysis is not cached. The key belongs to the revision of graph when it
+    # was uploaded. Changes counter of metric store when analysis was last
+    # stored.
+    analysis_cache = shared_cache
+    analysis_key = None
+    analysis_revision = None
+    stored_changes = None
+
     def __init__(self, parameters, layout='random', upload=True,
                  data=None):
         """
@@ -53,67 +799,72 @@ class Graphs:
 
         """
         self.growing = False
-        self.diameter = 0.0
-        self.average_shortest_path_length = []
         self.graph = None
-        self.is_weighted = False
-        self.has_negative_weights = False
-        self.negative_cycle = False
-        self.is_connected = False
-        self.is_DAG = False
-        self.density = 0.0
-        self.number_of_nodes = 0
         self.graphtype = None
-        self.number_of_edges = 0
+        self.disk = None
         self._initial_nodes = 0
+        self.metrics = MetricStore()
         if upload:
             self.uploaded = True
             self.create_graph(data, parameters['graphtype'])
         else:
             self.uploaded = False
             self.get_generated_graph(parameters)
-        self.initialize_graph_characteristics()
-        if self.is_weighted:
-            self.initialize_graph_characteristics_weighted()
-        if layout is not None:
+        if layout is not None and not self.out_of_core:
             self.set_node_pos(layout)
 
+    def __setstate__(self, state):
+        """
+        Restores a pickled graph object. Graphs which were saved before metric
+        store was introduced, get an empty one and their characteristics are
+        calculated again on demand.
+
+        :param state Dictionary of attributes of pickled graph object.
+        """
+        for name in CHARACTERISTICS:
+            state.pop(name, None)
+        self.__dict__.update(state)
+        if 'metrics' not in state:
+            self.metrics = MetricStore()
+
     def create_graph(self, data, graphtype):
         """
         Creates graph object of networkx library according to the data of the graph
-        file uploaded by user.
+        file uploaded by user. File is read as a stream, so it does not have to
+        be loaded in memory.
 
-        :param data Data of graph file which user uploaded.
+        Files in binary format define whether graph is directed themselves.
+        Files with more edges than disk threshold, as they are estimated
+        without reading file, are stored on disk and no networkx graph is
+        created for them.
+
+        :param data Stream or string of the data of graph file which user uploaded.
         :param graphtype type of graph. Directed or Undirected.
         :raise IOError IOError is thrown when graph object cannot be initialized
-        with the given data of uploaded file.
+        with the given data of uploaded file. For malformed files, it is a
+        GraphFileError which contains the number of line.
 
         """
-        if graphtype == 'Directed':
+        self.metrics = MetricStore()
+        self.disk = None
+        if estimate_edges(data) > self.disk_threshold:
+            self.graph = None
+            self.disk = create_disk_graph(data, graphtype == 'Directed',
+                                          self.disk_directory)
+        elif is_binary(data):
+            self.graph = read_binary(data)
+        elif graphtype == 'Directed':
+            self.graph = read_edge_list(nx.DiGraph(), data)
+        else:
+            self.graph = read_edge_list(nx.Graph(), data)
+        if self.out_of_core:
+            directed = self.disk.directed
+        else:
+            directed = self.graph.is_directed()
+        if directed:
             self.graphtype = 'Directed'
-            self.graph = nx.DiGraph()
         else:
-            self.graph = nx.Graph()
             self.graphtype = 'Undirected'
-        lines = str(data).split('\n')
-        for line in lines:
-            if line:
-                words = str(line).split(' ')
-                if len(words) == 2 or len(words) == 3:
-                    if not self.graph.has_node(words[0]):
-                        self.graph.add_node(words[0])
-                    if not self.graph.has_node(words[1]):
-                        self.graph.add_node(words[1])
-                    if len(words) == 3:
-                        try:
-                            self.graph.add_edge(words[0], words[1],
-                                                weight=float(words[2]))
-                        except ValueError:
-                            raise IOError
-                    else:
-                        self.graph.add_edge(words[0], words[1])
-                elif len(words) == 1 or len(words) > 3:
-                    raise IOError
 
     def set_node_pos(self, selection='random'):
         """
@@ -151,30 +902,38 @@ class Graphs:
 
     def check_if_weighted(self):
         """
-        Check is graph is a weighted graph or not. Assigns value of attribute
-        'is_weighted' accordingly. If graph is weighted value of this attribute
-        is True, False otherwise.
+        Check is graph is a weighted graph or not.
 
+        :return: True if graph is weighted, False otherwise.
         """
-        self.is_weighted = False
-        for u, v in self.graph.edges():
-            if 'weight' in self.graph.edge[u][v]:
-                self.is_weighted = True
-                break
+        return self.snapshot.weights is not None
 
     def check_if_has_negative_weights(self):
         """
         Check if a weighted graph has edges with negative weighted.
-        Assigns value of attribute 'has_negative_weights' accordingly.
-        If graph has negative weights, value of this attribute is True,
-        False otherwise.
 
+        :return: True if graph has negative weights, False otherwise.
         """
         if self.is_weighted:
-            for u, v in self.graph.edges():
-                if float(self.graph.edge[u][v]['weight']) < 0:
-                    self.has_negative_weights = True
-                    break
+            return bool(self.snapshot.weights.min() < 0)
+        return False
+
+    def check_if_has_negative_cycle(self):
+        """
+        Check if a weighted graph has a cycle with negative total weight.
+
+        Such a cycle requires at least one edge with negative weight, so
+        Bellman-Ford algorithm is only run for graphs with negative weights.
+        It is not run for graphs on disk.
+
+        :return: True if graph has a negative cycle, False otherwise and None
+        if it is unknown.
+        """
+        if self.has_negative_weights:
+            if self.out_of_core:
+                return None
+            return nx.negative_edge_cycle(self.graph, 'weight')
+        return False
 
     def is_fully_connected(self):
         """
@@ -182,58 +941,285 @@ class Graphs:
 
         :return: True if graph is connected, false otherwise.
         """
+        if self.out_of_core:
+            if self.snapshot.directed:
+                components = label_strong_components(self.snapshot.adjacency())
+            else:
+                components = label_components(self.snapshot.adjacency())
+            return len(components) == 1
         if self.graphtype == 'Directed':
             return nx.is_strongly_connected(self.graph)
         else:
             return nx.is_connected(self.graph)
 
+    def check_if_DAG(self):
+        """
+        Check if graph is a Directed Acyclic Graph. For graphs on disk, graph is
+        acyclic if it has no self loops and every strongly connected component
+        is a single node.
+
+        :return: True if graph is a DAG, False otherwise.
+        """
+        if not self.out_of_core:
+            return nx.is_directed_acyclic_graph(self.graph)
+        snapshot = self.snapshot
+        if not snapshot.directed or snapshot.self_loops().any():
+            return False
+        components = label_strong_components(snapshot.adjacency())
+        return len(components) == snapshot.number_of_nodes
+
     def calculate_diameter(self):
         """
-        Calculates graph's diameter.
+        Calculates graph's diameter. For large graphs, diameter is estimated.
 
         :return: graph's diameter.
         """
+        if self.is_approximate:
+            return estimate_diameter(self.snapshot, self.sample_size,
+                                     self.processes)
+        return self.distance_summary.diameter
+
+    def calculate_average_shortest_path_lengths(self):
+        """
+        Calculates average shortest path length of graph. For weighted graphs,
+        average shortest path length based on weights of edges is calculated
+        too. For large graphs, average shortest path lengths are estimated.
+
+        :return: List with average shortest path length as first element
+        and average shortest path length based on weights as second element
+        (for weighted graphs only).
+        """
+        weights = [False]
+        if self.is_weighted:
+            weights.append(True)
+        average_paths = []
+        with self.worker_pool():
+            for weighted in weights:
+                if self.is_approximate:
+                    average_paths.append(estimate_average_shortest_path_length(
+                        self.snapshot, weighted, self.sample_size,
+                        self.processes))
+                elif not weighted and self.graphtype != 'Directed':
+                    average_paths.append(
+                        self.distance_summary.average_shortest_path_length)
+                else:
+                    average_paths.append(calculate_average_shortest_path_length(
+                        self.snapshot, weighted, self.processes))
+        return average_paths
+
+    @property
+    def is_approximate(self):
+        """
+        True if diameter and average shortest path lengths of graph are
+        estimated, because graph is too large for them to be calculated exactly.
+        They are always estimated for graphs on disk.
+        """
+        return (self.out_of_core or
+                self.number_of_nodes > self.approximation_threshold)
+
+    @property
+    def out_of_core(self):
+        """ True if graph is stored on disk, False otherwise. """
+        return self.disk is not None
+
+    @property
+    def processes(self):
+        """
+        Worker processes of traversals of graph: the pool of the running
+        analysis or the number of processes of a pool which is created for a
+        single traversal.
+        """
+        if self.pool is not None:
+            return self.pool
+        return self.workers
+
+    @contextmanager
+    def worker_pool(self):
+        """
+        Shares a pool of worker processes among the traversals of graph which
+        run in this context, so that processes are started once for all of
+        them. Pool is closed when the outermost context exits.
+        """
+        if self.pool is not None or self.workers <= 1:
+            yield
+            return
+        self.pool = WorkerPool(self.workers)
         try:
-            return nx.diameter(self.graph)
-        except nx.NetworkXError:
-            return None
+            yield
+        finally:
+            self.pool.close()
+            del self.pool
 
-    def initialize_graph_characteristics(self):
-        """
-        Initializes class attributes which associated with information about
-        graph such as graph's diameter, if graph is weighted, if graph is Directed
-        Acyclic Graph, number of nodes, number of edges, average shortest path length,
-        etc.
-
-        """
-        self.has_negative_weights = False
-        self.negative_cycle = False
-        self.diameter = self.calculate_diameter()
-        self.density = nx.density(self.graph)
-        self.check_if_weighted()
-        self.is_connected = self.is_fully_connected()
-        self.is_DAG = nx.is_directed_acyclic_graph(self.graph)
-        self.number_of_nodes = self.graph.number_of_nodes()
-        self.number_of_edges = self.graph.number_of_edges()
-        if self.growing:
-            self.average_shortest_path_length = []
-            self.average_shortest_path_length.append(calculate_average_shortest_path_length(self.graph,
-                                                                                            None))
-        else:
-            self.average_shortest_path_length.append(calculate_average_shortest_path_length(self.graph,
-                                                                                            None))
+    def get_characteristic(self, name, calculate):
+        """
+        Gets a characteristic of graph such as diameter, average shortest path
+        length, etc. Characteristic is calculated the first time it is requested
+        and then it is stored until graph changes.
 
-    def initialize_graph_characteristics_weighted(self):
+        :param name: Name of characteristic.
+        :param calculate: Function which calculates characteristic.
+        :return: Value of characteristic.
+        """
+        if not self.metrics.is_current(name):
+            self.metrics.add(name, calculate())
+            if name in CACHED_CHARACTERISTICS:
+                self.store_analysis()
+        return self.metrics.get(name)
+
+    @property
+    def snapshot(self):
         """
-        Initializes class attributes which asscociated especially with weighted
-        graphs such as if graph has negative cycles, if graph has negative weights,
-        average shortest path length based on weights of edges.
+        Compact snapshot of the current revision of graph in compressed sparse
+        row format, on which numeric algorithms run. Snapshots of graphs on
+        disk are memory-mapped.
+        """
+        if self.out_of_core:
+            return self.get_characteristic('snapshot', self.disk.snapshot)
+        return self.get_characteristic('snapshot',
+                                       lambda: create_snapshot(self.graph))
+
+    @property
+    def canonical_form(self):
+        """
+        Canonical form of graph, which does not depend on the order of nodes
+        and edges of graph. It identifies graph in cache of analyses.
+        """
+        return self.get_characteristic('canonical',
+                                       lambda: canonical_form(self.snapshot))
+
+    @property
+    def distance_summary(self):
+        """
+        Summary of lengths of shortest paths of graph, based on path length.
+        For undirected graphs, both diameter and average shortest path length
+        are derived from it.
+        """
+        return self.get_characteristic('distances',
+                                       lambda: summarize_distances(self.snapshot,
+                                                                   workers=self.processes))
+
+    @property
+    def communities(self):
+        """
+        Communities of graph, which are detected by Girvan - Newman algorithm.
+        They are detected once for every revision of graph and every image of
+        graph selects a level of communities from them.
+        """
+        communities = self.get_characteristic('communities',
+                                              lambda: Community(self.graph))
+        communities.attach(self.graph)
+        return communities
+
+    @property
+    def louvain_communities(self):
+        """
+        Communities of graph, which are detected by Louvain algorithm. They
+        are detected once for every revision of graph.
+        """
+        return self.get_characteristic('louvain',
+                                       lambda: LouvainCommunities(self.graph))
+
+    def get_communities(self, algorithm='girvan_newman'):
+        """
+        Gets the communities of graph which are detected by an algorithm.
 
+        :param algorithm: 'louvain' for Louvain algorithm, otherwise Girvan -
+        Newman algorithm.
+        :return: Community or LouvainCommunities object.
         """
-        self.check_if_has_negative_weights()
-        self.negative_cycle = nx.negative_edge_cycle(self.graph, 'weight')
-        self.average_shortest_path_length.append(calculate_average_shortest_path_length(self.graph,
-                                                                                        'weight'))
+        if algorithm == 'louvain':
+            return self.louvain_communities
+        return self.communities
+
+    def get_cliques(self, min_size=1, limit=MAX_CLIQUES):
+        """
+        Gets the maximal cliques of graph. They are enumerated once for every
+        revision of graph, minimum size and limit.
+
+        :param min_size: Minimum number of nodes of cliques.
+        :param limit: Maximum number of cliques.
+        :return: Cliques object.
+        """
+        cliques = self.get_characteristic(
+            'cliques', lambda: Cliques(self.snapshot, min_size, limit,
+                                       self.processes))
+        if not cliques.covers(min_size, limit):
+            cliques = Cliques(self.snapshot, min_size, limit, self.processes)
+            self.metrics.add('cliques', cliques)
+        return cliques
+
+    @property
+    def is_weighted(self):
+        """ True if graph is weighted, False otherwise. """
+        return self.get_characteristic('is_weighted', self.check_if_weighted)
+
+    @property
+    def has_negative_weights(self):
+        """ True if graph has edges with negative weight, False otherwise. """
+        return self.get_characteristic('has_negative_weights',
+                                       self.check_if_has_negative_weights)
+
+    @property
+    def negative_cycle(self):
+        """ True if graph has a negative cycle, False otherwise. """
+        return self.get_characteristic('negative_cycle',
+                                       self.check_if_has_negative_cycle)
+
+    @property
+    def is_connected(self):
+        """ True if graph is (strongly) connected, False otherwise. """
+        return self.get_characteristic('is_connected', self.is_fully_connected)
+
+    @property
+    def is_DAG(self):
+        """ True if graph is a Directed Acyclic Graph, False otherwise. """
+        return self.get_characteristic('is_DAG', self.check_if_DAG)
+
+    @property
+    def diameter(self):
+        """ Diameter of graph or None if graph is not connected. """
+        return self.get_characteristic('diameter', self.calculate_diameter)
+
+    @property
+    def average_shortest_path_length(self):
+        """ Average shortest path lengths of graph. """
+        return self.get_characteristic('average_shortest_path_length',
+                                       self.calculate_average_shortest_path_lengths)
+
+    @property
+    def density(self):
+        """ Density of graph. """
+        if not self.out_of_core:
+            return nx.density(self.graph)
+        n = self.number_of_nodes
+        m = self.number_of_edges
+        if m == 0 or n <= 1:
+            return 0.0
+        density = m / float(n * (n - 1))
+        if self.disk.directed:
+            return density
+        return 2 * density
+
+    @property
+    def degree_scale(self):
+        """ Factor which normalizes degree of nodes to degree centrality. """
+        if self.number_of_nodes > 1:
+            return 1.0 / (self.number_of_nodes - 1)
+        return 1.0
+
+    @property
+    def number_of_nodes(self):
+        """ Number of graph's nodes. """
+        if self.out_of_core:
+            return self.disk.number_of_nodes
+        return self.graph.number_of_nodes()
+
+    @property
+    def number_of_edges(self):
+        """ Number of graph's edges. """
+        if self.out_of_core:
+            return self.disk.number_of_edges
+        return self.graph.number_of_edges()
 
     @staticmethod
     def initialize_barabasi_graph(n, directed):
@@ -301,6 +1287,7 @@ class Graphs:
                         if not self.graph.has_edge(node, random_node):
                             self.graph.add_edge(node, random_node)
                             new_edges.append((node, random_node))
+        self.metrics.invalidate('nodes', 'edges')
         return self.graph, new_edges
 
     def delete_node(self):
@@ -311,6 +1298,7 @@ class Graphs:
         """
         if self.number_of_nodes != self._initial_nodes:
             self.graph.remove_node(self.number_of_nodes - 1)
+            self.metrics.invalidate('nodes', 'edges')
         return self.graph
 
     def get_generated_graph(self, parameters):
@@ -324,6 +1312,7 @@ class Graphs:
         going to be initialized.
 
         """
+        self.metrics = MetricStore()
         model = parameters['model']
         n = int(parameters['nodes'])
         directed = False
@@ -368,11 +1357,8 @@ class Graphs:
 
         For undirected graphs only.
         """
-        if self.is_weighted:
-            values = nx.clustering(self.graph, weight="weight")
-        else:
-            values = nx.clustering(self.graph, weight=None)
-        nx.set_node_attributes(self.graph, 'clustering', values)
+        values = calculate_clustering(self.snapshot, self.is_weighted)
+        self.set_node_metric('clustering', values)
 
     def calculate_weighted_degree(self):
         """
@@ -381,8 +1367,8 @@ class Graphs:
         For weighted undirected graphs only.
         """
         if self.is_weighted:
-            values = nx.degree(self.graph, weight="weight")
-            nx.set_node_attributes(self.graph, 'weighted_degree', values)
+            values = self.snapshot.node_values(self.snapshot.degree(weighted=True))
+            self.set_node_metric('weighted_degree', values)
 
     def calculate_weighted_in_degree(self):
         """
@@ -391,8 +1377,8 @@ class Graphs:
         For weighted directed graphs only.
         """
         if self.is_weighted:
-            values = self.graph.in_degree(weight="weight")
-            nx.set_node_attributes(self.graph, 'weighted_in_degree', values)
+            values = self.snapshot.node_values(self.snapshot.in_degree(weighted=True))
+            self.set_node_metric('weighted_in_degree', values)
 
     def calculate_weighted_out_degree(self):
         """
@@ -401,20 +1387,20 @@ class Graphs:
         For weighted directed graphs only.
         """
         if self.is_weighted:
-            values = self.graph.out_degree(weight="weight")
-            nx.set_node_attributes(self.graph, 'weighted_out_degree', values)
+            values = self.snapshot.node_values(self.snapshot.out_degree(weighted=True))
+            self.set_node_metric('weighted_out_degree', values)
 
     def calculate_pagerank(self):
         """
-        Calculates PageRank for every node of graph.
+        Calculates PageRank for every node of graph. Values calculated for a
+        previous revision of graph are used as a warm start.
 
         For directed graphs only.
         """
-        if self.is_weighted:
-            values = nx.pagerank_numpy(self.graph, weight='weight')
-        else:
-            values = nx.pagerank_numpy(self.graph, weight=None)
-        nx.set_node_attributes(self.graph, 'pagerank', values)
+        previous = self.get_node_values('pagerank')
+        values = centrality.pagerank(self.snapshot, weighted=self.is_weighted,
+                                     start=previous)
+        self.set_node_metric('pagerank', values)
 
     def calculate_degree_centrality(self):
         """
@@ -422,8 +1408,9 @@ class Graphs:
 
         For undirected graphs only.
         """
-        values = nx.degree_centrality(self.graph)
-        nx.set_node_attributes(self.graph, 'degree', values)
+        values = self.snapshot.node_values(self.snapshot.degree() *
+                                           self.degree_scale)
+        self.set_node_metric('degree', values)
 
     def calculate_in_degree_centrality(self):
         """
@@ -431,8 +1418,9 @@ class Graphs:
 
         For directed graphs only.
         """
-        values = nx.in_degree_centrality(self.graph)
-        nx.set_node_attributes(self.graph, 'in_degree', values)
+        values = self.snapshot.node_values(self.snapshot.in_degree() *
+                                           self.degree_scale)
+        self.set_node_metric('in_degree', values)
 
     def calculate_out_degree_centrality(self):
         """
@@ -440,26 +1428,117 @@ class Graphs:
 
         For directed graphs only.
         """
-        values = nx.out_degree_centrality(self.graph)
-        nx.set_node_attributes(self.graph, 'out_degree', values)
+        values = self.snapshot.node_values(self.snapshot.out_degree() *
+                                           self.degree_scale)
+        self.set_node_metric('out_degree', values)
 
-    def calculate_betweeness_centrality(self):
-        """ Calculates betweenness centrality for every node of graph. """
-        if self.is_weighted:
-            values = nx.betweenness_centrality(self.graph, weight="weight")
+    def calculate_betweenness(self, approximate=None):
+        """
+        Calculates betweenness centrality for every node and every edge of graph
+        with a single pass of Brandes algorithm.
+
+        :param approximate: If True, betweenness centrality is estimated from a
+        sample of source nodes, if False it is calculated exactly. If None, it
+        is estimated only for graphs larger than betweenness threshold.
+        """
+        sample_size, estimation = self.betweenness_sampling(approximate)
+        values = calculate_betweenness(self.snapshot, self.is_weighted,
+                                       self.processes, sample_size)
+        self.set_betweenness(values, estimation)
+
+    def betweenness_sampling(self, approximate=None):
+        """
+        Decides how many source nodes are sampled for betweenness centrality.
+
+        :param approximate: If True, betweenness centrality is estimated, if
+        False it is calculated exactly and if None it depends on the size of
+        graph.
+        :return: Number of sampled source nodes (None for exact values) and
+        dictionary of the parameters of estimation (None for exact values).
+        """
+        if approximate is None:
+            approximate = self.number_of_nodes > self.betweenness_threshold
+        estimation = None
+        sample_size = None
+        if approximate:
+            sample_size = betweenness_sample_size(self.number_of_nodes,
+                                                  self.betweenness_epsilon,
+                                                  self.betweenness_delta)
+            if sample_size < self.number_of_nodes:
+                estimation = {'epsilon': self.betweenness_epsilon,
+                              'delta': self.betweenness_delta,
+                              'sources': sample_size}
+        return sample_size, estimation
+
+    def set_betweenness(self, values, estimation=None):
+        """
+        Stores betweenness centrality of nodes and edges on graph.
+
+        :param values: Tuple of dictionaries of betweenness centrality values
+        keyed by node and keyed by edge.
+        :param estimation: Parameters of estimation or None for exact values.
+        """
+        nx.set_node_attributes(self.graph, 'betweenness', values[0])
+        nx.set_edge_attributes(self.graph, 'betweenness', values[1])
+        self.metrics.add('betweenness', estimation)
+        self.metrics.add('edge_betweenness', estimation)
+
+    def set_node_metric(self, name, values):
+        """
+        Stores values of a metric on the nodes of graph and marks it as
+        calculated for the current revision of graph. Values of graphs on disk
+        are stored in the directory of graph.
+
+        :param name: Name of metric, which is the name of node attribute too.
+        :param values: Dictionary of values keyed by node.
+        """
+        if self.out_of_core:
+            self.disk.save_values(name, np.array([values[node] for node in
+                                                  self.snapshot.nodes]))
         else:
-            values = nx.betweenness_centrality(self.graph, weight=None)
-        nx.set_node_attributes(self.graph, 'betweenness', values)
+            nx.set_node_attributes(self.graph, name, values)
+        self.metrics.add(name)
+
+    def get_node_values(self, name):
+        """
+        Gets the values of a metric for the nodes of graph.
+
+        :param name: Name of metric.
+        :return: Dictionary of values keyed by node, which is empty if metric
+        has never been calculated.
+        """
+        if not self.out_of_core:
+            return nx.get_node_attributes(self.graph, name)
+        values = self.disk.load_values(name)
+        if values is None:
+            return {}
+        return self.snapshot.node_values(values)
+
+    def calculate_betweeness_centrality(self, approximate=None):
+        """
+        Calculates betweenness centrality for every node of graph.
+
+        :param approximate: True if values should be estimated, False if they
+        should be exact and None to decide according to the size of graph.
+        """
+        self.calculate_betweenness(approximate)
 
     def calculate_closeness_centrality(self):
-        """ Calculates closeness centrality for every node of graph. """
-        values = nx.closeness_centrality(self.graph)
-        nx.set_node_attributes(self.graph, 'closeness', values)
+        """
+        Calculates closeness centrality for every node of graph. It is derived
+        from the summary of shortest path lengths of graph.
+        """
+        values = self.distance_summary.closeness()
+        self.set_node_metric('closeness', values)
 
     def calculate_eigenvector_centrality(self):
-        """ Calculates eigenvector centrality for every node of graph. """
-        values = nx.eigenvector_centrality_numpy(self.graph)
-        nx.set_node_attributes(self.graph, 'eigenvector', values)
+        """
+        Calculates eigenvector centrality for every node of graph. Values
+        calculated for a previous revision of graph are used as a warm start.
+        """
+        previous = self.get_node_values('eigenvector')
+        values = centrality.eigenvector_centrality(self.snapshot, start=previous)
+        self.set_node_metric('eigenvector', values)
 
     def find_connected_components(self, connectivity):
         """
@@ -468,68 +1547,272 @@ class Graphs:
         For directed graphs, it detected both weakly and strongly connected
         components.
 
+        Components are labelled with a single pass over the snapshot of graph
+        and they are numbered in order of decreasing size, e.g. nodes of the
+        largest component are labelled as 'A0'.
+
         :param connectivity: Defines components to be found. Weakly, Strongly or
         for undirected graphs.
         """
-        if connectivity.find("weak") != -1:
-            components = nx.weakly_connected_component_subgraphs(self.graph)
-        elif connectivity.find("strong") != -1:
-            components = nx.strongly_connected_component_subgraphs(self.graph)
-        else:
-            components = nx.connected_component_subgraphs(self.graph)
-        counter = 0
-        connected_components = {}
-        for i in range(0, len(components)):
-            for node in self.graph.nodes():
-                if components[i].has_node(node):
-                    connected_components[node] = 'A' + str(counter)
-            counter += 1
-        nx.set_node_attributes(self.graph, connectivity, connected_components)
-
-    def calculate_edge_betweeness(self):
-        """ Calculates betweenness centrality for every edge of graph. """
-        if self.is_weighted:
-            values = nx.edge_betweenness_centrality(self.graph, weight="weight")
-        else:
-            values = nx.edge_betweenness_centrality(self.graph)
-        nx.set_edge_attributes(self.graph, 'betweenness', values)
-
-    def add_data(self):
-        """ Adds all information associated with the graph on the networkx graph object. """
-        self.calculate_betweeness_centrality()
-        self.calculate_closeness_centrality()
-        self.calculate_eigenvector_centrality()
-        self.calculate_edge_betweeness()
+        self.set_node_metric(connectivity,
+                             label_connected_components(self.snapshot, connectivity))
+
+    def calculate_edge_betweeness(self, approximate=None):
+        """
+        Calculates betweenness centrality for every edge of graph.
+
+        :param approximate: True if values should be estimated, False if they
+        should be exact and None to decide according to the size of graph.
+        """
+        self.calculate_betweenness(approximate)
+
+    def required_metrics(self, approximate=None):
+        """
+        Gets metrics which are associated with graph according to its type.
+
+        :param approximate: Defines whether betweenness centrality is estimated
+        or calculated exactly. If None, it depends on the size of graph.
+        :return: List of tuples. Each tuple contains the name of metric and the
+        method which calculates it. For graphs on disk, only the metrics which
+        scan the edges of graph are included.
+        """
+        metrics = [('betweenness', lambda: self.calculate_betweeness_centrality(approximate)),
+                   ('closeness', self.calculate_closeness_centrality),
+                   ('eigenvector', self.calculate_eigenvector_centrality),
+                   ('edge_betweenness', lambda: self.calculate_edge_betweeness(approximate))]
         if self.graphtype == 'Directed':
-            self.calculate_pagerank()
-            self.calculate_in_degree_centrality()
-            self.calculate_out_degree_centrality()
-            self.find_connected_components('weak')
-            self.find_connected_components('strong')
+            metrics += [('pagerank', self.calculate_pagerank),
+                        ('in_degree', self.calculate_in_degree_centrality),
+                        ('out_degree', self.calculate_out_degree_centrality),
+                        ('weak', lambda: self.find_connected_components('weak')),
+                        ('strong', lambda: self.find_connected_components('strong'))]
             if self.is_weighted:
-                self.calculate_weighted_in_degree()
-                self.calculate_weighted_out_degree()
+                metrics += [('weighted_in_degree', self.calculate_weighted_in_degree),
+                            ('weighted_out_degree', self.calculate_weighted_out_degree)]
         else:
-            self.calculate_clustering_coifficient()
-            self.calculate_degree_centrality()
-            self.find_connected_components('full')
+            metrics += [('clustering', self.calculate_clustering_coifficient),
+                        ('degree', self.calculate_degree_centrality),
+                        ('full', lambda: self.find_connected_components('full'))]
             if self.is_weighted:
-                self.calculate_weighted_degree()
+                metrics.append(('weighted_degree', self.calculate_weighted_degree))
+        if self.out_of_core:
+            metrics = [(name, calculate) for name, calculate in metrics
+                       if name in OUT_OF_CORE_METRICS]
+        return metrics
+
+    def is_estimate(self, name):
+        """
+        Check if the current values of a metric are estimates.
 
-    def data_exists(self):
+        :param name: Name of metric.
+        :return: True if values of metric are estimated, False otherwise.
+        """
+        return self.metrics.is_current(name) and self.metrics.get(name) is not None
+
+    def get_estimated_metrics(self):
+        """
+        Gets metrics of graph whose current values are estimates.
+
+        :return: List of names of metrics.
+        """
+        return [name for name, calculate in self.required_metrics()
+                if self.is_estimate(name)]
+
+    def requires_calculation(self, name, approximate=None):
+        """
+        Check if a metric has to be calculated, because it has not been
+        calculated for the current revision of graph or because its values
+        are estimates whereas exact values are requested.
+
+        :param name: Name of metric.
+        :param approximate: False if exact values are requested.
+        :return: True if metric has to be calculated, False otherwise.
+        """
+        if not self.metrics.is_current(name):
+            return True
+        return approximate is False and self.is_estimate(name)
+
+    def metric_tasks(self, names, approximate=None):
+        """
+        Gets the tasks which calculate the expensive metrics among the given
+        ones from the snapshot of graph, so that they can run independently of
+        each other in worker processes. Tasks are ordered from the longest to
+        the shortest one.
+
+        :param names: Names of metrics to be calculated.
+        :param approximate: Defines whether betweenness centrality is estimated
+        or calculated exactly. If None, it depends on the size of graph.
+        :return: List of tuples of task, as it is accepted by run_tasks(), and
+        the method which stores the result of task.
+        """
+        weighted = self.is_weighted
+        tasks = []
+        if 'betweenness' in names or 'edge_betweenness' in names:
+            sample_size, estimation = self.betweenness_sampling(approximate)
+            tasks.append(((calculate_betweenness, (weighted, 1, sample_size), {}),
+                          lambda values: self.set_betweenness(values, estimation)))
+        if 'closeness' in names and not self.metrics.is_current('distances'):
+            tasks.append(((summarize_distances, (), {}),
+                          lambda summary: self.metrics.add('distances', summary)))
+        if 'clustering' in names:
+            tasks.append(((calculate_clustering, (weighted,), {}),
+                          lambda values: self.set_node_metric('clustering', values)))
+        for name, function in (('eigenvector', centrality.eigenvector_centrality),
+                               ('pagerank', centrality.pagerank)):
+            if name in names:
+                kwargs = {'start': self.get_node_values(name)}
+                if name == 'pagerank':
+                    kwargs['weighted'] = weighted
+                tasks.append(((function, (), kwargs),
+                              lambda values, name=name: self.set_node_metric(name, values)))
+        for name in ('weak', 'strong', 'full'):
+            if name in names:
+                tasks.append(((label_connected_components, (name,), {}),
+                              lambda values, name=name: self.set_node_metric(name, values)))
+        return tasks
+
+    def add_data(self, approximate=None, parallel=None):
+        """
+        Adds all information associated with the graph on the networkx graph object.
+
+        Only metrics which have not been calculated for the current revision of
+        graph are calculated. In parallel mode, expensive metrics are calculated
+        at the same time by a pool of worker processes, which share the snapshot
+        of graph, and the rest of them are calculated afterwards. Metrics of
+        graphs on disk are always calculated serially, so that memory-mapped
+        snapshot is not copied to workers. All the traversals of graph share a
+        single pool of worker processes.
+
+        :param approximate: If True betweenness centrality is estimated, if False
+        it is calculated exactly and if None it depends on the size of graph.
+        :param parallel: If True, independent metrics are calculated in parallel.
+        If None, it is defined by parallel_metrics.
+        """
+        if parallel is None:
+            parallel = self.parallel_metrics
+        with self.worker_pool():
+            if parallel and self.workers > 1 and not self.out_of_core:
+                names = [name for name, calculate
+                         in self.required_metrics(approximate)
+                         if self.requires_calculation(name, approximate)]
+                tasks = self.metric_tasks(names, approximate)
+                results = run_tasks([task for task, store in tasks],
+                                    self.snapshot, self.processes)
+                for (task, store), result in zip(tasks, results):
+                    store(result)
+            for name, calculate in self.required_metrics(approximate):
+                if self.requires_calculation(name, approximate):
+                    calculate()
+        self.store_analysis()
+
+    def export_analysis(self):
+        """
+        Gets the metrics and characteristics which have been calculated for
+        the current revision of graph, in a form which does not depend on the
+        order of nodes and edges of graph.
+
+        :return: Dictionary with the metrics and the characteristics of graph.
+        Metrics are keyed by name and each of them is a tuple of the array of
+        values in the order of the canonical form of graph and the parameters of
+        estimation. Characteristics are keyed by name too.
+        """
+        form = self.canonical_form
+        metrics = {}
+        for name, calculate in self.required_metrics():
+            if not self.metrics.is_current(name):
+                continue
+            if name == 'edge_betweenness':
+                values = [self.graph[form.labels[u]][form.labels[v]]['betweenness']
+                          for u, v in zip(form.sources.tolist(), form.targets.tolist())]
+            else:
+                values = [self.graph.node[label][name] for label in form.labels]
+            metrics[name] = (np.array(values), self.metrics.get(name))
+        characteristics = dict((name, self.metrics.get(name))
+                               for name in CACHED_CHARACTERISTICS
+                               if self.metrics.is_current(name))
+        return {'metrics': metrics, 'characteristics': characteristics}
+
+    def import_analysis(self, analysis):
+        """
+        Stores the metrics and characteristics of a cached analysis on graph,
+        as they have been calculated for the current revision of graph.
+
+        :param analysis: Dictionary with metrics and characteristics, as it is
+        returned by export_analysis().
+        """
+        form = self.canonical_form
+        for name, (values, estimation) in analysis['metrics'].items():
+            if name == 'edge_betweenness':
+                labels = form.labels
+                edges = [(labels[u], labels[v]) for u, v in
+                         zip(form.sources.tolist(), form.targets.tolist())]
+                nx.set_edge_attributes(self.graph, 'betweenness',
+                                       dict(zip(edges, values.tolist())))
+            else:
+                nx.set_node_attributes(self.graph, name,
+                                       dict(zip(form.labels, values.tolist())))
+            self.metrics.add(name, estimation)
+        for name, value in analysis['characteristics'].items():
+            self.metrics.add(name, value)
+
+    def restore_analysis(self):
+        """
+        Looks up the analysis of an uploaded graph in cache of analyses, by the
+        digest of its canonical form and the version of analysis algorithms.
+        If the same graph has been analyzed before, its metrics and
+        characteristics are restored, otherwise they are stored in cache when
+        they are calculated. Graphs on disk are not cached.
+
+        :return: True if analysis of graph was found in cache, False otherwise.
+        """
+        if self.analysis_cache is None or self.out_of_core:
+            return False
+        self.analysis_key = '%s-%d' % (self.canonical_form.digest, ANALYSIS_VERSION)
+        self.analysis_revision = self.metrics.revision
+        analysis = self.analysis_cache.get(self.analysis_key)
+        if analysis is None:
+            return False
+        self.import_analysis(analysis)
+        self.stored_changes = self.metrics.changes
+        return True
+
+    def store_analysis(self):
+        """
+        Stores the metrics and characteristics which have been calculated for
+        graph in cache of analyses, together with the ones which are already
+        cached for the same graph.
+
+        Analysis is stored only if metrics have been calculated since it was
+        last stored, and only for the revision of graph which was uploaded, so
+        that changes of graph are not stored under the key of uploaded graph.
+        """
+        if self.analysis_key is None or self.analysis_cache is None or \
+                self.metrics.revision != self.analysis_revision or \
+                self.metrics.changes == self.stored_changes:
+            return
+        analysis = self.analysis_cache.get(self.analysis_key)
+        current = self.export_analysis()
+        if analysis is None:
+            analysis = current
+        else:
+            analysis['metrics'].update(current['metrics'])
+            analysis['characteristics'].update(current['characteristics'])
+        self.analysis_cache.put(self.analysis_key, analysis)
+        self.stored_changes = self.metrics.changes
+
+    def data_exists(self, approximate=None):
         """
         Check if information such as centralities, clustering associated with
-        the graph has already been calculated.
+        the graph has already been calculated for the current revision of graph.
 
+        :param approximate: False if estimated values are not accepted.
         :return: True if information has already been calculated,
         False otherwise.
         """
-        try:
-            value = self.graph.node['closeness']
-            exists = True
-        except KeyError:
-            exists = False
-        return exists
+        for name, calculate in self.required_metrics(approximate):
+            if self.requires_calculation(name, approximate):
+                return False
+        return True
 
     def calculate_evolution_over_time(self, time):
         """
@@ -542,14 +1825,12 @@ class Graphs:
         :return: dictionaries of average degree centrality and average shortest
         path length for each time.
         """
-        degree_values = list(nx.degree_centrality(self.graph).values())
-        degree_variance = {0: sum(degree_values) / len(degree_values)}
-        average_shortest_path = {0: calculate_average_shortest_path_length(self.graph, None)}
+        degree_variance = {0: self.snapshot.degree().mean() * self.degree_scale}
+        average_shortest_path = {0: calculate_average_shortest_path_length(self.snapshot, False)}
         for i in range(1, time + 1):
             self.add_new_node_barabasi_model()
-            degree_values = list(nx.degree_centrality(self.graph).values())
-            degree_variance[i] = sum(degree_values) / len(degree_values)
-            average_shortest_path[i] = calculate_average_shortest_path_length(self.graph, None)
+            degree_variance[i] = self.snapshot.degree().mean() * self.degree_scale
+            average_shortest_path[i] = calculate_average_shortest_path_length(self.snapshot, False)
         return degree_variance, average_shortest_path
 
     def directed_graph_data(self):
@@ -667,5 +1948,5 @@ class Graphs:
         :param values_type: Type of measure.
         :return: Average values of measure.
         """
-        values = nx.get_node_attributes(self.graph, values_type).values()
+        values = self.get_node_values(values_type).values()
         return sum(values) / len(values)
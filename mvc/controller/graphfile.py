@@ -1,11 +1,430 @@
 """
-This module contains a dictionary which describes the graph object which being
+This module contains a registry which describes the graph object which being
 currently analyzed by a user.
 
 For example, if there are two users A and B which are simultaneously using system
-the keys of this dictionary will be A and B with values the graph object which
+the keys of this registry will be A and B with values the graph object which
 each user is analyzing corresponding.
+
+Registry has a memory budget. Graphs of users who have been idle for long or,
+when budget is exceeded, the least recently used graphs are evicted from
+memory: their progress is persisted and it is loaded again when user comes
+back. Evicted graphs are persisted at the end of request, outside of the lock
+of registry, so that requests of other users do not wait for them.
+
+Registry can be backed by a session store, which is shared by processes, so
+that requests of a user can be served by any process. Then graphs are saved to
+store after every request which changes them, and processes load a graph from
+store again when its version in store is newer than the one in their memory.
+A graph which is set during a request is saved once, at the end of request.
+Whether a request has changed a graph is found out from its change stamp (see
+change_stamp()), so that graphs which have not changed are not serialized.
+Store is defined by the NETXANAL_SESSION_STORE environment variable (see
+create_store()); without store, graphs live only in the memory of process.
+
+Graphs which are stored on disk have temporary graph directories. They are
+removed when registry discards their graph, i.e. when the graph of a user is
+removed or replaced and, without store, when process exits, unless they
+belong to a progress which user has saved. Evicted graphs keep their
+directories, because they are loaded again.
 """
 __author__ = 'Thodoris Sotiropoulos'
-global graphfile
-graphfile = {}
\ No newline at end of file
+
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from mvc.controller.sessionstore import (create_store, deserialize, serialize,
+                                         version_of)
+from mvc.model.application_model import load_project, persist_project
+
+
+# Maximum estimated size in bytes of the graphs in memory and time in seconds
+# after which the graph of an idle user is evicted.
+MEMORY_BUDGET = 512 << 20
+IDLE_TIME = 30 * 60
+
+# Estimated size in bytes of a progress of graph analysis, of every node and of
+# every edge of its networkx graph, together with their attributes.
+ENTRY_SIZE = 16 << 10
+NODE_SIZE = 2 << 10
+EDGE_SIZE = 1 << 10
+
+# Version of graphs which have been set, but not saved to store yet.
+UNSAVED = 'unsaved'
+
+# Estimated size in bytes of every pixel of a retained figure of an image and
+# of the artists of every node and edge depicted on it.
+PIXEL_SIZE = 4
+ARTIST_SIZE = 2 << 10
+
+
+def estimate_size(project):
+    """
+    Estimates the memory which is occupied by a progress of graph analysis,
+    including the analyses which are kept with its metrics, e.g. communities,
+    and the figure which is retained by its image.
+
+    :param project: Progress of graph analysis.
+    :return: Estimated size in bytes.
+    """
+    size = ENTRY_SIZE
+    elements = 0
+    graph = getattr(project, 'graph', None)
+    if graph is not None and graph.graph is not None:
+        elements = (graph.graph.number_of_nodes() +
+                    graph.graph.number_of_edges())
+        size += (NODE_SIZE * graph.graph.number_of_nodes() +
+                 EDGE_SIZE * graph.graph.number_of_edges())
+    if graph is not None:
+        for value in graph.metrics.values():
+            if hasattr(value, 'estimate_size'):
+                size += value.estimate_size()
+    image = getattr(project, 'image', None)
+    url = getattr(image, 'url', None)
+    if url:
+        size += len(url)
+    if getattr(image, 'axes', None) is not None:
+        width, height = image.axes.figure.canvas.get_width_height()
+        size += PIXEL_SIZE * width * height + ARTIST_SIZE * elements
+    return size
+
+
+def change_stamp(project):
+    """
+    Gets a cheap summary of the state of a progress of graph analysis, which
+    changes whenever its graph, the analysis of graph or its image change. It
+    takes constant time, apart from hashing the image of graph once.
+
+    :param project: Progress of graph analysis.
+    :return: Tuple which is compared with previous stamps of progress.
+    """
+    graph = getattr(project, 'graph', None)
+    image = getattr(project, 'image', None)
+    metrics = getattr(graph, 'metrics', None)
+    url = getattr(image, 'url', None)
+    return (getattr(project, 'filename', None), id(graph), id(image),
+            id(getattr(graph, 'graph', None)),
+            None if metrics is None else (metrics.revision, metrics.changes),
+            None if url is None else hash(url))
+
+
+def release_project(project):
+    """
+    Removes the graph directory of a progress of graph analysis whose graph is
+    stored on disk, unless it belongs to a progress which user has saved.
+
+    :param project: Progress of graph analysis which is discarded.
+    """
+    disk = getattr(getattr(project, 'graph', None), 'disk', None)
+    if disk is not None and not disk.persistent:
+        disk.remove()
+
+
+class Evicted:
+    """
+    This class represents a graph which has been evicted from memory, but
+    has not been persisted yet.
+    """
+    def __init__(self, project):
+        """
+        Initializes evicted graph.
+
+        :param project: Progress of graph analysis.
+        """
+        self.project = project
+        self.persisting = False
+
+
+class GraphRegistry:
+    """
+    This class represents a registry of graphs which are being analyzed, keyed
+    by user. It can be used as a dictionary.
+
+    Without store, evicted graphs are persisted by a function which returns a
+    reference to them, and they are loaded from that reference the next time
+    they are requested. With store, graphs are already saved to store, so they
+    are just removed from memory.
+    """
+    def __init__(self, load, persist, store=None, budget=MEMORY_BUDGET,
+                 idle_time=IDLE_TIME, sizeof=estimate_size, clock=time.time,
+                 release=release_project):
+        """
+        Initializes an empty registry.
+
+        :param load: Function which loads an evicted graph from its reference.
+        :param persist: Function which persists a graph which is evicted and
+        returns its reference.
+        :param store: Session store which is shared by processes or None.
+        :param budget: Maximum estimated size in bytes of graphs in memory.
+        :param idle_time: Time in seconds after which a graph which has not
+        been requested is evicted.
+        :param sizeof: Function which estimates the size of a graph.
+        :param clock: Function which returns current time in seconds.
+        :param release: Function which releases the resources of a graph which
+        is discarded.
+        """
+        self.load = load
+        self.persist = persist
+        self.store = store
+        self.budget = budget
+        self.idle_time = idle_time
+        self.sizeof = sizeof
+        self.clock = clock
+        self.release = release
+        self.entries = OrderedDict()
+        self.evicted = {}
+        self.size = 0
+        self.lock = threading.RLock()
+
+    def __getitem__(self, user):
+        """
+        Gets the graph of a user, loading it if it has been evicted or if it
+        has been changed by another process.
+
+        :param user: Username.
+        :return: Progress of graph analysis.
+        :raise KeyError: If user has no graph.
+        """
+        with self.lock:
+            if self.store is not None:
+                return self._get_shared(user)
+            if user in self.entries:
+                project, size = self.entries.pop(user)[:2]
+                self.size -= size
+            elif user in self.evicted:
+                project = self._load(self.evicted.pop(user))
+                if project is None:
+                    raise KeyError(user)
+            else:
+                raise KeyError(user)
+            self._add(user, project)
+            return project
+
+    def _get_shared(self, user):
+        """
+        Gets the graph of a user, which is kept in memory only if its version
+        is the current version in store, or if it has not been saved yet.
+        """
+        if self._unsaved(user):
+            project, size = self.entries.pop(user)[:2]
+            self.size -= size
+            self._add(user, project, UNSAVED, UNSAVED)
+            return project
+        version = self.store.version(user)
+        if version is None:
+            self._remove(user)
+            raise KeyError(user)
+        entry = self.entries.pop(user, None)
+        if entry is not None:
+            self.size -= entry[1]
+        if entry is not None and entry[3] == version:
+            project, stamp = entry[0], entry[4]
+        else:
+            loaded = self.store.load(user)
+            if loaded is None:
+                self._remove(user)
+                raise KeyError(user)
+            version, data = loaded
+            project, stamp = deserialize(data), None
+        self._add(user, project, version, stamp)
+        return project
+
+    def __setitem__(self, user, project):
+        """
+        Sets the graph of a user. With store, graph is saved to store when it
+        is flushed, at the end of request, so that it is serialized once,
+        after request has finished changing it.
+
+        :param user: Username.
+        :param project: Progress of graph analysis.
+        """
+        with self.lock:
+            previous = self._discard(user)
+            if self.store is None:
+                self._add(user, project)
+            else:
+                self._add(user, project, UNSAVED, UNSAVED)
+            if previous is not None and previous is not project:
+                self._release(previous, project)
+
+    def __contains__(self, user):
+        with self.lock:
+            if self.store is not None:
+                return (self._unsaved(user) or
+                        self.store.version(user) is not None)
+            return user in self.entries or user in self.evicted
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries) + len(self.evicted)
+
+    def flush(self, user):
+        """
+        Saves the graph of a user to store, if it has changed since it was
+        loaded or saved. It is called at the end of every request of user, so
+        graph is serialized only if its change stamp has changed. Graphs which
+        have been evicted are persisted then too.
+
+        :param user: Username.
+        """
+        with self.lock:
+            if self.store is not None and user in self.entries:
+                project, size, last_access, version, stamp = self.entries[user]
+                current = change_stamp(project)
+                if current != stamp:
+                    data = serialize(project)
+                    if version_of(data) != version:
+                        version = self.store.save(user, data)
+                    self.entries[user] = (project, size, last_access, version,
+                                          current)
+        self.persist_evicted()
+
+    def persist_evicted(self):
+        """
+        Persists the graphs which have been evicted from memory. Graphs are
+        persisted outside of lock, so graphs of other users can be requested
+        in the meantime. A graph which is requested again before it has been
+        persisted is taken back from memory.
+        """
+        with self.lock:
+            pending = [(user, evicted) for user, evicted in self.evicted.items()
+                       if isinstance(evicted, Evicted) and not evicted.persisting]
+            for user, evicted in pending:
+                evicted.persisting = True
+        for user, evicted in pending:
+            key = self.persist(evicted.project)
+            with self.lock:
+                if self.evicted.get(user) is evicted:
+                    self.evicted[user] = key
+
+    def get(self, user, default=None):
+        """ Gets the graph of a user or default if user has no graph. """
+        try:
+            return self[user]
+        except KeyError:
+            return default
+
+    def pop(self, user, default=None):
+        """
+        Removes the graph of a user, without persisting it. With store, graph
+        is deleted from store too.
+
+        :param user: Username.
+        :param default: Value which is returned if user has no graph.
+        :return: Progress of graph analysis which was in memory or default.
+        """
+        with self.lock:
+            project = self.entries[user][0] if user in self.entries else None
+            discarded = self._discard(user)
+            if self.store is not None:
+                self.store.delete(user)
+            if discarded is not None:
+                self._release(discarded)
+            return default if project is None else project
+
+    def close(self):
+        """
+        Releases the graphs of all users, when graphs are not kept in a store,
+        so that they cannot be found again after process exits.
+        """
+        with self.lock:
+            if self.store is not None:
+                return
+            for user in list(self.entries) + list(self.evicted):
+                self.pop(user)
+
+    def _discard(self, user):
+        """
+        Removes the graph of a user from memory and gets it, loading it if it
+        is not in memory, so that its resources can be released.
+
+        :return: Progress of graph analysis or None if user has no graph.
+        """
+        key = self.evicted.get(user)
+        project = self._remove(user)
+        if project is None and key is not None:
+            project = self._load(key)
+        if project is None and self.store is not None:
+            loaded = self.store.load(user)
+            if loaded is not None:
+                project = deserialize(loaded[1])
+        return project
+
+    def _load(self, key):
+        """
+        Loads an evicted graph from its reference, or takes it back from memory
+        if it has not been persisted yet.
+        """
+        if isinstance(key, Evicted):
+            return key.project
+        return self.load(key)
+
+    def _release(self, project, kept=None):
+        """
+        Releases the resources of a discarded graph, unless they are shared
+        with the graph which is kept instead of it.
+        """
+        disk = getattr(getattr(project, 'graph', None), 'disk', None)
+        kept_disk = getattr(getattr(kept, 'graph', None), 'disk', None)
+        if disk is not None and kept_disk is not None and \
+                disk.directory == kept_disk.directory:
+            return
+        self.release(project)
+
+    def _add(self, user, project, version=None, stamp=None):
+        """
+        Adds a graph as the most recently used one and evicts graphs which are
+        idle or exceed budget. Size of graph is estimated every time it is
+        requested, because graphs grow while they are analyzed. Version is the
+        version of graph in store and stamp is the change stamp of graph when
+        it was saved to or loaded from store, which is taken now if it is None.
+        """
+        if stamp is None:
+            stamp = change_stamp(project)
+        size = self.sizeof(project)
+        self.entries[user] = (project, size, self.clock(), version, stamp)
+        self.size += size
+        self.evict()
+
+    def _unsaved(self, user):
+        """ Checks if graph of user has been set, but not saved to store. """
+        return user in self.entries and self.entries[user][3] == UNSAVED
+
+    def _remove(self, user):
+        """ Removes a graph from memory and forgets evicted graph of user. """
+        self.evicted.pop(user, None)
+        if user not in self.entries:
+            return None
+        project, size = self.entries.pop(user)[:2]
+        self.size -= size
+        return project
+
+    def evict(self):
+        """
+        Evicts graphs which have not been requested for idle time and least
+        recently used graphs while the size of graphs exceeds budget. The most
+        recently used graph is always kept. Without store, evicted graphs are
+        persisted later, by persist_evicted().
+        """
+        with self.lock:
+            deadline = self.clock() - self.idle_time
+            while len(self.entries) > 1:
+                user, entry = next(self.entries.iteritems())
+                project, size, last_access = entry[:3]
+                if self.size <= self.budget and last_access >= deadline:
+                    break
+                del self.entries[user]
+                self.size -= size
+                if self.store is None:
+                    self.evicted[user] = Evicted(project)
+                elif entry[3] == UNSAVED:
+                    self.store.save(user, serialize(project))
+
+
+# Registry of graphs of all users.
+graphfile = GraphRegistry(load_project, persist_project,
+                          create_store(os.environ.get('NETXANAL_SESSION_STORE')))
+atexit.register(graphfile.close)
@@ -0,0 +1,392 @@
+"""
+This module contains functions which read and write graph files.
+
+Graph files are either edge lists in txt format or files in a compact binary
+format.
+
+In txt format, each line contains the source node and the target node of an
+edge and optionally its weight, separated by whitespace. Files are read as
+streams in chunks of fixed size and edges are added to graph in batches, so
+that memory which is required depends on the size of graph and not on the
+size of file.
+
+Binary format consists of:
+-- A header with the magic bytes 'NXGB', the version of format, flags (directed,
+weighted, double precision weights), the number of nodes, the number of edges
+and the size of the table of node labels.
+-- The table of node labels, separated by NUL bytes and padded to a multiple of
+4 bytes. The position of a label in table is the index of node.
+-- An array of int32 indices of source nodes and an array of int32 indices of
+target nodes of edges.
+-- An array of float32 (or float64) weights of edges, for weighted graphs only.
+All numbers are little-endian. Binary files can be loaded by memory-mapping.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import mmap
+import struct
+from cStringIO import StringIO
+
+import networkx as nx
+import numpy as np
+
+
+# Number of bytes which are read from a graph file at once.
+CHUNK_SIZE = 1 << 16
+
+# Number of edges which are added to graph at once.
+BATCH_SIZE = 10000
+
+# Typical number of bytes of a line of a graph file in txt format, e.g.
+# '123456 654321\n', from which the number of edges of file is estimated.
+LINE_SIZE = 14
+
+# Magic bytes and version of binary format.
+MAGIC = 'NXGB'
+VERSION = 1
+
+# Header of binary format: magic bytes, version, flags, reserved bytes, number
+# of nodes, number of edges and size of table of node labels in bytes.
+HEADER = struct.Struct('<4sBBHIQQ')
+
+# Flags of header of binary format.
+DIRECTED = 1
+WEIGHTED = 2
+DOUBLE_WEIGHTS = 4
+
+
+class GraphFileError(IOError):
+    """
+    Error which is raised when a line of a graph file cannot be parsed.
+    """
+    def __init__(self, line_number, message):
+        """
+        Initializes error.
+
+        :param line_number Number of line which cannot be parsed, starting
+        from 1.
+        :param message Description of error.
+        """
+        IOError.__init__(self, 'Line %d: %s' % (line_number, message))
+        self.line_number = line_number
+
+
+def iter_lines(stream, chunk_size=CHUNK_SIZE):
+    """
+    Reads lines of a stream, chunk by chunk.
+
+    :param stream File-like object which supports read(size).
+    :param chunk_size Number of bytes which are read at once.
+    :return Generator of lines without line terminator.
+    """
+    rest = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (rest + chunk).split('\n')
+        rest = lines.pop()
+        for line in lines:
+            yield line
+    if rest:
+        yield rest
+
+
+def parse_edge_list(stream, chunk_size=CHUNK_SIZE):
+    """
+    Parses the edges of a graph file in txt format.
+
+    Columns of each line can be separated by any whitespace and empty lines
+    are ignored. Labels of nodes are interned, so that every label is stored
+    once, no matter how many edges it has.
+
+    :param stream File-like object or string with the contents of file.
+    :param chunk_size Number of bytes which are read at once.
+    :return Generator of edges. Each edge is a tuple of source node and target
+    node or a tuple of source node, target node and a dictionary with its
+    weight.
+    :raise GraphFileError If a line does not contain two or three columns or
+    if weight is not a number.
+    """
+    if isinstance(stream, basestring):
+        stream = StringIO(str(stream))
+    for line_number, line in enumerate(iter_lines(stream, chunk_size), 1):
+        words = line.split()
+        if not words:
+            continue
+        if len(words) != 2 and len(words) != 3:
+            raise GraphFileError(line_number, 'expected 2 or 3 columns, '
+                                              'found %d' % len(words))
+        u = intern(words[0])
+        v = intern(words[1])
+        if len(words) == 3:
+            try:
+                weight = float(words[2])
+            except ValueError:
+                raise GraphFileError(line_number,
+                                     "invalid weight '%s'" % words[2])
+            yield u, v, {'weight': weight}
+        else:
+            yield u, v
+
+
+def read_edge_list(graph, stream, chunk_size=CHUNK_SIZE,
+                   batch_size=BATCH_SIZE):
+    """
+    Adds the edges of a graph file in txt format to a graph.
+
+    :param graph Graph object.
+    :param stream File-like object or string with the contents of file.
+    :param chunk_size Number of bytes which are read at once.
+    :param batch_size Number of edges which are added to graph at once.
+    :return Graph object.
+    :raise GraphFileError If file contains a line which cannot be parsed.
+    """
+    batch = []
+    for edge in parse_edge_list(stream, chunk_size):
+        batch.append(edge)
+        if len(batch) == batch_size:
+            graph.add_edges_from(batch)
+            batch = []
+    graph.add_edges_from(batch)
+    return graph
+
+
+class BinaryGraph:
+    """
+    This class represents the contents of a graph file in binary format.
+    Arrays of edges are views of the buffer of file, so they are not copied
+    when file is memory-mapped.
+    """
+    def __init__(self, labels, directed, sources, targets, weights):
+        """
+        Initializes contents of file.
+
+        :param labels List of labels of nodes, indexed by node index.
+        :param directed True if graph is directed, False otherwise.
+        :param sources Array of indices of source nodes of edges.
+        :param targets Array of indices of target nodes of edges.
+        :param weights Array of weights of edges or None.
+        """
+        self.labels = labels
+        self.directed = directed
+        self.sources = sources
+        self.targets = targets
+        self.weights = weights
+
+
+def is_binary(data):
+    """
+    Check if the data of a graph file are in binary format, without consuming
+    stream.
+
+    :param data Stream or string of the data of graph file.
+    :return True if data start with the magic bytes of binary format.
+    """
+    if isinstance(data, basestring):
+        return data.startswith(MAGIC)
+    position = data.tell()
+    magic = data.read(len(MAGIC))
+    data.seek(position)
+    return magic == MAGIC
+
+
+def estimate_edges(data, line_size=LINE_SIZE):
+    """
+    Estimates the number of edges of a graph file without reading it, so that
+    it can be decided how graph is stored before file is parsed.
+
+    For files in binary format, number of edges is read from header. For files
+    in txt format, it is estimated from the size of file and the typical size
+    of a line.
+
+    :param data Stream or string of the data of graph file.
+    :param line_size Typical number of bytes of a line.
+    :return Number of edges.
+    """
+    if isinstance(data, basestring):
+        if data.startswith(MAGIC) and len(data) >= HEADER.size:
+            return HEADER.unpack_from(data)[5]
+        return len(data) // line_size
+    position = data.tell()
+    try:
+        if is_binary(data):
+            header = data.read(HEADER.size)
+            if len(header) == HEADER.size:
+                return HEADER.unpack(header)[5]
+            return 0
+        data.seek(0, 2)
+        return (data.tell() - position) // line_size
+    finally:
+        data.seek(position)
+
+
+def map_buffer(data):
+    """
+    Gets a buffer with the contents of a graph file. Files on disk are
+    memory-mapped, other streams are read in memory.
+
+    :param data Stream or string of the data of graph file.
+    :return Buffer object.
+    """
+    if isinstance(data, basestring):
+        return data
+    try:
+        data.flush()
+        return mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, EnvironmentError, ValueError):
+        data.seek(0)
+        return data.read()
+
+
+def load_binary(data):
+    """
+    Loads a graph file in binary format.
+
+    :param data Stream or string of the data of graph file.
+    :return BinaryGraph object.
+    :raise GraphFileError If file is not a valid graph file in binary format.
+    """
+    buf = map_buffer(data)
+    if len(buf) < HEADER.size:
+        raise GraphFileError(1, 'truncated header')
+    magic, version, flags, reserved, n, m, size = HEADER.unpack_from(buf)
+    if magic != MAGIC or version != VERSION:
+        raise GraphFileError(1, 'unsupported binary format')
+    offset = HEADER.size + size + (-size % 4)
+    weight_type = np.float64 if flags & DOUBLE_WEIGHTS else np.float32
+    expected = offset + 8 * m
+    if flags & WEIGHTED:
+        expected += np.dtype(weight_type).itemsize * m
+    if len(buf) < expected:
+        raise GraphFileError(1, 'truncated file')
+    labels = buf[HEADER.size:HEADER.size + size]
+    labels = [intern(label) for label in labels.split('\0')] if n else []
+    if len(labels) != n:
+        raise GraphFileError(1, 'expected %d node labels, found %d' %
+                             (n, len(labels)))
+    sources = np.frombuffer(buf, dtype='<i4', count=m, offset=offset)
+    targets = np.frombuffer(buf, dtype='<i4', count=m, offset=offset + 4 * m)
+    weights = None
+    if flags & WEIGHTED:
+        weights = np.frombuffer(buf, dtype=np.dtype(weight_type).newbyteorder('<'),
+                                count=m, offset=offset + 8 * m)
+    if m and (min(sources.min(), targets.min()) < 0 or
+              max(sources.max(), targets.max()) >= n):
+        raise GraphFileError(1, 'node index out of range')
+    return BinaryGraph(labels, bool(flags & DIRECTED), sources, targets, weights)
+
+
+def read_binary(data, batch_size=BATCH_SIZE):
+    """
+    Creates a graph from a graph file in binary format.
+
+    :param data Stream or string of the data of graph file.
+    :param batch_size Number of edges which are added to graph at once.
+    :return Graph object, which is directed if graph of file is directed.
+    :raise GraphFileError If file is not a valid graph file in binary format.
+    """
+    contents = load_binary(data)
+    if contents.directed:
+        graph = nx.DiGraph()
+    else:
+        graph = nx.Graph()
+    labels = contents.labels
+    graph.add_nodes_from(labels)
+    for start in range(0, len(contents.sources), batch_size):
+        end = start + batch_size
+        sources = contents.sources[start:end].tolist()
+        targets = contents.targets[start:end].tolist()
+        if contents.weights is None:
+            graph.add_edges_from((labels[u], labels[v])
+                                 for u, v in zip(sources, targets))
+        else:
+            weights = contents.weights[start:end].tolist()
+            graph.add_edges_from((labels[u], labels[v], {'weight': w})
+                                 for u, v, w in zip(sources, targets, weights))
+    return graph
+
+
+def _forward_blocks(snapshot):
+    """
+    Scans the edges of a graph in blocks, so that every edge of an undirected
+    graph is found once.
+
+    :param snapshot GraphSnapshot object of graph.
+    :return Generator of tuples of arrays of source node indices, target node
+    indices and weights of the edges of each block.
+    """
+    for rows, targets, values in snapshot.blocks():
+        if not snapshot.directed:
+            forward = rows <= targets
+            rows, targets, values = rows[forward], targets[forward], values[forward]
+        yield rows, targets, values
+
+
+def iter_binary(snapshot):
+    """
+    Converts a graph to binary format. Edges are written block by block, so
+    that graphs whose snapshot is memory-mapped are not loaded in memory.
+
+    Weights are stored in single precision, unless this would change some of
+    them.
+
+    :param snapshot GraphSnapshot object of graph.
+    :return Generator of the parts of file in binary format.
+    """
+    weighted = snapshot.weights is not None
+    flags = DIRECTED if snapshot.directed else 0
+    m = 0
+    for rows, targets, values in _forward_blocks(snapshot):
+        m += len(rows)
+        if weighted and not flags & DOUBLE_WEIGHTS and \
+                (values.astype('<f4') != values).any():
+            flags |= DOUBLE_WEIGHTS
+    if weighted:
+        flags |= WEIGHTED
+    weight_type = '<f8' if flags & DOUBLE_WEIGHTS else '<f4'
+    labels = '\0'.join(node.encode('utf-8') if isinstance(node, unicode)
+                       else str(node) for node in snapshot.nodes)
+    yield HEADER.pack(MAGIC, VERSION, flags, 0, len(snapshot.nodes), m,
+                      len(labels))
+    yield labels + '\0' * (-len(labels) % 4)
+    for rows, targets, values in _forward_blocks(snapshot):
+        yield rows.astype('<i4').tostring()
+    for rows, targets, values in _forward_blocks(snapshot):
+        yield targets.astype('<i4').tostring()
+    if weighted:
+        for rows, targets, values in _forward_blocks(snapshot):
+            yield values.astype(weight_type).tostring()
+
+
+def iter_edge_list(snapshot):
+    """
+    Converts a graph to txt format. Edges are written block by block, so that
+    graphs whose snapshot is memory-mapped are not loaded in memory.
+
+    :param snapshot GraphSnapshot object of graph.
+    :return Generator of the parts of file in txt format, each one with the
+    lines of a block of edges.
+    """
+    labels = [node.encode('utf-8') if isinstance(node, unicode) else str(node)
+              for node in snapshot.nodes]
+    weighted = snapshot.weights is not None
+    for rows, targets, values in _forward_blocks(snapshot):
+        if weighted:
+            yield ''.join('%s %s %r\n' % (labels[u], labels[v], w)
+                          for u, v, w in zip(rows.tolist(), targets.tolist(),
+                                             values.tolist()))
+        else:
+            yield ''.join('%s %s\n' % (labels[u], labels[v])
+                          for u, v in zip(rows.tolist(), targets.tolist()))
+
+
+def write_binary(snapshot, stream):
+    """
+    Writes a graph to a stream in binary format.
+
+    :param snapshot GraphSnapshot object of graph.
+    :param stream File-like object which supports write().
+    """
+    for part in iter_binary(snapshot):
+        stream.write(part)
@@ -0,0 +1,86 @@
+"""
+This module contains the modularity of the partitions of a graph into
+communities, by which the levels of communities which are detected by Girvan -
+Newman and Louvain algorithms are compared. Louvain algorithm itself is run by
+the community (python-louvain) library.
+
+Edge weights are used only if they are all positive, otherwise every edge has
+weight 1, for both algorithms.
+
+Graphs are integer indexed adjacency lists of dictionaries of edge weights
+keyed by neighbor. Every edge is stored at both its nodes and self-loops are
+stored once.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+
+def positive_weight(graph, weight='weight'):
+    """
+    Checks if the edge weights of a graph are used for modularity.
+
+    :param graph Undirected networkx graph.
+    :param weight Edge data key corresponding to the edge weight.
+    :return Weight key if all edge weights are positive, None otherwise.
+    """
+    if weight is not None and all(data.get(weight, 1) > 0 for u, v, data
+                                  in graph.edges_iter(data=True)):
+        return weight
+    return None
+
+
+def weighted_adjacency(graph, nodes, weight='weight'):
+    """
+    Creates the adjacency list of an undirected graph with the weights on
+    which modularity is based.
+
+    :param graph Undirected networkx graph.
+    :param nodes List of nodes of graph, which defines their indices.
+    :param weight Edge data key corresponding to the edge weight.
+    :return List of dictionaries of edge weights keyed by neighbor index.
+    """
+    index = dict((node, i) for i, node in enumerate(nodes))
+    weight = positive_weight(graph, weight)
+    adjacency = [{} for node in nodes]
+    for u, v, data in graph.edges_iter(data=True):
+        i, j = index[u], index[v]
+        w = float(data.get(weight, 1)) if weight is not None else 1.0
+        adjacency[i][j] = adjacency[i].get(j, 0.0) + w
+        if i != j:
+            adjacency[j][i] = adjacency[j].get(i, 0.0) + w
+    return adjacency
+
+
+def node_degrees(adjacency):
+    """
+    Calculates the weighted degree of every node, with self-loops counted
+    twice.
+
+    :param adjacency Adjacency list with edge weights.
+    :return List of degrees.
+    """
+    return [sum(neighbors.itervalues()) + neighbors.get(i, 0.0)
+            for i, neighbors in enumerate(adjacency)]
+
+
+def modularity(adjacency, labels):
+    """
+    Calculates the modularity of a partition of graph into communities.
+
+    :param adjacency Adjacency list with edge weights.
+    :param labels Sequence of community labels of nodes.
+    :return Modularity, or 0 for graphs without edges.
+    """
+    degrees = node_degrees(adjacency)
+    total = sum(degrees)
+    if total == 0:
+        return 0.0
+    inside = {}
+    totals = {}
+    for i, neighbors in enumerate(adjacency):
+        c = labels[i]
+        totals[c] = totals.get(c, 0.0) + degrees[i]
+        for j, w in neighbors.iteritems():
+            if labels[j] == c:
+                inside[c] = inside.get(c, 0.0) + (2 * w if i == j else w)
+    return sum(inside.get(c, 0.0) / total - (totals[c] / total) ** 2
+               for c in totals)
@@ -0,0 +1,230 @@
+"""
+This module contains functions for the parallel execution of graph traversals
+which are independent of each other, such as traversals from every node of
+graph for the calculation of betweenness centrality or the lengths of shortest
+paths.
+
+Source nodes of traversals are partitioned across a pool of worker processes.
+Adjacency list of graph is shipped to every worker once, the first time the
+worker runs a task of a traversal, and then each task only carries the indices
+of its source nodes. The partial results of tasks are reduced by the caller.
+
+Independent calculations on the same graph, such as different metrics, can
+also run as tasks of a pool, which share a read-only snapshot of graph.
+
+A pool can be shared by all the traversals of an analysis, so that worker
+processes are started once for it instead of once for every traversal.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+
+# Number of tasks created for every worker, so that workers which are assigned
+# source nodes with shorter traversals can take over more tasks.
+TASKS_PER_WORKER = 4
+
+# Graph data (adjacency list or snapshot of graph) which is shared by the
+# tasks of a worker process and the number of the call of pool it belongs to.
+_worker_data = (None, None)
+
+
+def _load_data(call, path):
+    """
+    Gets the graph data of a call of pool in a worker process. Data is loaded
+    from the file of call the first time a task of call runs in worker.
+
+    :param call Number of call of pool.
+    :param path Path of the file of graph data.
+    :return Integer indexed adjacency list or snapshot of graph.
+    """
+    global _worker_data
+    if _worker_data[0] != call:
+        _worker_data = (None, None)
+        with open(path, 'rb') as data_file:
+            _worker_data = (call, pickle.load(data_file))
+    return _worker_data[1]
+
+
+def _run_task(task):
+    """
+    Runs a task in a worker process.
+
+    :param task Tuple of the number of call and the path of its graph data,
+    the function to run, source nodes and extra arguments of function.
+    :return Partial result of function.
+    """
+    call, path, kernel, sources, args = task
+    return kernel(_load_data(call, path), sources, *args)
+
+
+def _run_independent_task(task):
+    """
+    Runs an independent task in a worker process.
+
+    :param task Tuple of the number of call and the path of its graph data,
+    the function to run, its extra arguments and its keyword arguments.
+    :return Result of function.
+    """
+    call, path, function, args, kwargs = task
+    return function(_load_data(call, path), *args, **kwargs)
+
+
+class WorkerPool:
+    """
+    This class represents a pool of worker processes, which is reused by
+    several calls on different graph data. Worker processes are started on
+    the first call.
+
+    The graph data of every call is written once to a temporary file, from
+    which every worker loads it when it runs its first task of the call.
+    """
+    def __init__(self, workers):
+        """
+        Initializes a pool.
+
+        :param workers Number of worker processes.
+        """
+        self.workers = workers
+        self.calls = 0
+        self.pool = None
+
+    def map(self, function, tasks, data):
+        """
+        Runs a function for every task in worker processes.
+
+        :param function Function of module which runs a task and accepts
+        the number of call and the path of graph data as the first items of
+        task.
+        :param tasks List of tuples of arguments of tasks.
+        :param data Graph data which is shared by tasks.
+        :return List of results of tasks, in the order of tasks.
+        """
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers)
+        self.calls += 1
+        handle, path = tempfile.mkstemp(prefix='netxanal-')
+        try:
+            with os.fdopen(handle, 'wb') as data_file:
+                pickle.dump(data, data_file, pickle.HIGHEST_PROTOCOL)
+            return self.pool.map(function, [(self.calls, path) + task
+                                            for task in tasks], chunksize=1)
+        finally:
+            os.remove(path)
+
+    def close(self):
+        """ Stops worker processes, once they finish their tasks. """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+
+def pool_size(workers):
+    """
+    Gets the number of worker processes.
+
+    :param workers Number of worker processes or WorkerPool object.
+    :return Number of worker processes.
+    """
+    if isinstance(workers, WorkerPool):
+        return workers.workers
+    return workers
+
+
+@contextmanager
+def open_pool(workers):
+    """
+    Gets a pool of worker processes for a call. A shared pool is returned
+    itself, otherwise a pool is created and it is closed after the call.
+
+    :param workers Number of worker processes or WorkerPool object.
+    :return WorkerPool object.
+    """
+    if isinstance(workers, WorkerPool):
+        yield workers
+        return
+    pool = WorkerPool(workers)
+    try:
+        yield pool
+    finally:
+        pool.close()
+
+
+def partition(sources, parts):
+    """
+    Partitions source nodes into disjoint parts of (almost) equal size.
+
+    Nodes are assigned to parts in turn, so that nodes of the same connected
+    component, which usually have adjacent indices, are spread across parts.
+
+    :param sources List of source nodes.
+    :param parts Number of parts.
+    :return List of parts which are not empty.
+    """
+    return [sources[i::parts] for i in range(min(parts, len(sources)))]
+
+
+def map_sources(kernel, adjacency, sources, workers=1, *args):
+    """
+    Runs a function for all source nodes of graph, either serially or
+    in parallel on a pool of worker processes.
+
+    Function has to be defined on module level, so that it can be sent to worker
+    processes, and is called as kernel(adjacency, sources, *args).
+
+    :param kernel Function which traverses graph from a list of source nodes.
+    :param adjacency Integer indexed adjacency list of graph.
+    :param sources List of indices of source nodes.
+    :param workers Number of worker processes or shared WorkerPool object.
+    If there is 1 worker or processes are not supported by the platform,
+    function runs in the current process.
+    :param args Extra arguments of function.
+    :return List of partial results of function, one for every part of source
+    nodes.
+    """
+    sources = list(sources)
+    size = pool_size(workers)
+    if size <= 1 or multiprocessing is None or len(sources) < 2:
+        return [kernel(adjacency, sources, *args)]
+    tasks = [(kernel, part, args)
+             for part in partition(sources, size * TASKS_PER_WORKER)]
+    with open_pool(workers) as pool:
+        return pool.map(_run_task, tasks, adjacency)
+
+
+def run_tasks(tasks, data, workers=1):
+    """
+    Runs independent functions on the same graph data, either serially or in
+    parallel on a pool of worker processes.
+
+    Functions have to be defined on module level and they are called as
+    function(data, *args, **kwargs). Data is shipped to every worker once, so
+    it should be compact, e.g. a snapshot of graph. Tasks are assigned to
+    workers in the given order, so longer tasks should come first.
+
+    :param tasks List of tuples of function, extra arguments and keyword
+    arguments.
+    :param data Graph data which is shared by all tasks.
+    :param workers Number of worker processes or shared WorkerPool object.
+    :return List of results of functions, in the order of tasks.
+    """
+    if pool_size(workers) <= 1 or multiprocessing is None or len(tasks) < 2:
+        return [function(data, *args, **kwargs)
+                for function, args, kwargs in tasks]
+    if not isinstance(workers, WorkerPool):
+        workers = min(workers, len(tasks))
+    with open_pool(workers) as pool:
+        return pool.map(_run_independent_task, tasks, data)
@@ -0,0 +1,219 @@
+"""
+This module contains stores of the graphs which are being analyzed by users,
+which can be shared by many processes of application.
+
+Graphs are serialized compactly, as compressed pickles, and every graph of a
+store has a version, which is the digest of serialized graph, so that it
+changes whenever graph changes. Processes keep graphs in memory and check their
+version against store, so that they load a graph again only when another
+process has changed it.
+
+There are two stores:
+-- MemoryStore, which keeps graphs in the memory of a single process.
+-- SQLiteStore, which keeps graphs in a SQLite database that can be shared by
+all processes of a machine.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import hashlib
+import pickle
+import sqlite3
+import threading
+import zlib
+
+
+def serialize(project):
+    """
+    Serializes a progress of graph analysis.
+
+    :param project: Progress of graph analysis.
+    :return: Compressed pickle of progress.
+    """
+    return zlib.compress(pickle.dumps(project, pickle.HIGHEST_PROTOCOL))
+
+
+def version_of(data):
+    """
+    Gets the version of a serialized progress of graph analysis.
+
+    :param data: Compressed pickle of progress.
+    :return: Hexadecimal digest of data.
+    """
+    return hashlib.sha1(data).hexdigest()
+
+
+def deserialize(data):
+    """
+    Restores a serialized progress of graph analysis.
+
+    :param data: Compressed pickle of progress.
+    :return: Progress of graph analysis.
+    """
+    return pickle.loads(zlib.decompress(data))
+
+
+class MemoryStore:
+    """
+    This class represents a store which keeps serialized graphs in the memory
+    of the current process.
+    """
+    def __init__(self):
+        """ Initializes an empty store. """
+        self.graphs = {}
+        self.lock = threading.Lock()
+
+    def version(self, user):
+        """
+        Gets the version of the graph of a user.
+
+        :param user: Username.
+        :return: Version of graph or None if user has no graph.
+        """
+        with self.lock:
+            if user not in self.graphs:
+                return None
+            return self.graphs[user][0]
+
+    def load(self, user):
+        """
+        Loads the graph of a user.
+
+        :param user: Username.
+        :return: Tuple of version and serialized graph or None if user has no
+        graph.
+        """
+        with self.lock:
+            return self.graphs.get(user)
+
+    def save(self, user, data):
+        """
+        Saves the graph of a user.
+
+        :param user: Username.
+        :param data: Serialized graph.
+        :return: Version of saved graph.
+        """
+        version = version_of(data)
+        with self.lock:
+            self.graphs[user] = (version, data)
+        return version
+
+    def delete(self, user):
+        """
+        Deletes the graph of a user.
+
+        :param user: Username.
+        """
+        with self.lock:
+            self.graphs.pop(user, None)
+
+
+class SQLiteStore:
+    """
+    This class represents a store which keeps serialized graphs in a SQLite
+    database. A connection is opened for every operation, so that store can be
+    used by many threads and by processes which are forked.
+    """
+    def __init__(self, path, timeout=30.0):
+        """
+        Initializes store and creates its table if it does not exist.
+
+        :param path: Path of database file.
+        :param timeout: Time in seconds to wait for a locked database.
+        """
+        self.path = path
+        self.timeout = timeout
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute('CREATE TABLE IF NOT EXISTS graphs '
+                                   '(user TEXT PRIMARY KEY, '
+                                   'version TEXT NOT NULL, '
+                                   'data BLOB NOT NULL)')
+        finally:
+            connection.close()
+
+    def connect(self):
+        """ Opens a connection to database. """
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    def version(self, user):
+        """
+        Gets the version of the graph of a user.
+
+        :param user: Username.
+        :return: Version of graph or None if user has no graph.
+        """
+        connection = self.connect()
+        try:
+            row = connection.execute('SELECT version FROM graphs WHERE user = ?',
+                                     (user,)).fetchone()
+        finally:
+            connection.close()
+        return None if row is None else row[0]
+
+    def load(self, user):
+        """
+        Loads the graph of a user.
+
+        :param user: Username.
+        :return: Tuple of version and serialized graph or None if user has no
+        graph.
+        """
+        connection = self.connect()
+        try:
+            row = connection.execute('SELECT version, data FROM graphs '
+                                     'WHERE user = ?', (user,)).fetchone()
+        finally:
+            connection.close()
+        return None if row is None else (row[0], str(row[1]))
+
+    def save(self, user, data):
+        """
+        Saves the graph of a user.
+
+        :param user: Username.
+        :param data: Serialized graph.
+        :return: Version of saved graph.
+        """
+        version = version_of(data)
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute('INSERT OR REPLACE INTO graphs '
+                                   'VALUES (?, ?, ?)',
+                                   (user, version, sqlite3.Binary(data)))
+        finally:
+            connection.close()
+        return version
+
+    def delete(self, user):
+        """
+        Deletes the graph of a user.
+
+        :param user: Username.
+        """
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute('DELETE FROM graphs WHERE user = ?', (user,))
+        finally:
+            connection.close()
+
+
+def create_store(url):
+    """
+    Creates a store from its URL.
+
+    :param url: 'memory' for a MemoryStore, 'sqlite:///<path>' for a
+    SQLiteStore, or None or empty string for no store.
+    :return: Store object or None.
+    :raise ValueError: If URL is not supported.
+    """
+    if not url:
+        return None
+    if url == 'memory':
+        return MemoryStore()
+    if url.startswith('sqlite:///'):
+        return SQLiteStore(url[len('sqlite:///'):])
+    raise ValueError("unsupported session store '%s'" % url)
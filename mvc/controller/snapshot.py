@@ -0,0 +1,354 @@
+"""
+This module contains a compact, immutable representation of a graph which is
+used by numeric algorithms, such as centralities, shortest path lengths and
+connected components.
+
+Nodes of graph are mapped to consecutive integer indices and edges are stored
+in compressed sparse row (CSR) format: the targets of the edges of node i are
+stored between offsets[i] and offsets[i + 1] of an array of targets, and their
+weights in the same positions of an array of weights. A snapshot is created
+once for every revision of graph and shared by all algorithms which run on it.
+
+Arrays of a snapshot can also be memory-mapped files, for graphs which do not
+fit in memory. Such snapshots are scanned in blocks of edges and traversed
+through a lazy adjacency list, so that their edges are never loaded at once.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import numpy as np
+
+
+# Number of edges of a block, when edges are scanned block by block.
+BLOCK_SIZE = 1 << 20
+
+
+def compress(n, rows, columns, values=None):
+    """
+    Sorts edges by their source node in compressed sparse row format.
+
+    :param n Number of nodes.
+    :param rows Array of indices of source nodes of edges.
+    :param columns Array of indices of target nodes of edges.
+    :param values Array of weights of edges or None.
+    :return Array of offsets, array of targets and array of weights (or None).
+    """
+    order = np.argsort(rows, kind='mergesort')
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+    if values is not None:
+        values = values[order]
+    return offsets, columns[order], values
+
+
+def create_snapshot(graph, weight='weight'):
+    """
+    Creates a snapshot of a graph.
+
+    Edges of an undirected graph are stored in both directions, except for
+    self loops which are stored once.
+
+    :param graph Graph object.
+    :param weight Edge attribute which is used as edge weight. If no edge has
+    this attribute, snapshot has no weights, otherwise edges without it have
+    weight 1.
+    :return GraphSnapshot object.
+    """
+    nodes = graph.nodes()
+    index = dict((node, i) for i, node in enumerate(nodes))
+    directed = graph.is_directed()
+    rows = []
+    columns = []
+    values = []
+    weighted = False
+    for u, v, data in graph.edges_iter(data=True):
+        if weight in data:
+            weighted = True
+        w = float(data.get(weight, 1))
+        rows.append(index[u])
+        columns.append(index[v])
+        values.append(w)
+        if not directed and u != v:
+            rows.append(index[v])
+            columns.append(index[u])
+            values.append(w)
+    rows = np.array(rows, dtype=np.int32)
+    columns = np.array(columns, dtype=np.int32)
+    if weighted:
+        values = np.array(values, dtype=np.float64)
+    else:
+        values = None
+    offsets, targets, weights = compress(len(nodes), rows, columns, values)
+    return GraphSnapshot(nodes, index, offsets, targets, weights, directed)
+
+
+class LazyAdjacency:
+    """
+    This class represents the adjacency list of a snapshot whose arrays are
+    memory-mapped. Neighbours of a node are read from arrays when they are
+    requested.
+    """
+    def __init__(self, snapshot, weighted=False):
+        """
+        Initializes adjacency list.
+
+        :param snapshot GraphSnapshot object.
+        :param weighted If True, neighbours are tuples of neighbour and the
+        weight of the corresponding edge.
+        """
+        self.offsets = snapshot.offsets
+        self.targets = snapshot.targets
+        self.weights = snapshot.weights if weighted else None
+        self.weighted = weighted
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        start = self.offsets[i]
+        end = self.offsets[i + 1]
+        targets = self.targets[start:end].tolist()
+        if not self.weighted:
+            return targets
+        if self.weights is None:
+            return [(j, 1.0) for j in targets]
+        return zip(targets, self.weights[start:end].tolist())
+
+
+class GraphSnapshot:
+    """
+    This class represents a graph at a specific revision, stored in compressed
+    sparse row format with integer indexed nodes.
+
+    Snapshot is never changed; a change of graph leads to a new snapshot.
+    """
+
+    # True if arrays of snapshot are memory-mapped files.
+    out_of_core = False
+
+    # Snapshots of reversed graph and of undirected view of graph, if they are
+    # stored instead of being derived from snapshot.
+    reverse_view = None
+    undirected_view = None
+
+    def __init__(self, nodes, index, offsets, targets, weights, directed):
+        """
+        Initializes a snapshot from its arrays.
+
+        :param nodes List of nodes, so that nodes[i] is the node with index i.
+        :param index Dictionary of indices keyed by node or None.
+        :param offsets Array of offsets of the edges of every node.
+        :param targets Array of indices of target nodes of edges.
+        :param weights Array of weights of edges or None if graph is not
+        weighted.
+        :param directed True if graph is directed, False otherwise.
+        """
+        self.nodes = nodes
+        self.index = index
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.directed = directed
+
+    @property
+    def number_of_nodes(self):
+        """ Number of nodes of graph. """
+        return len(self.nodes)
+
+    def rows(self):
+        """
+        Gets the index of the source node of every stored edge.
+
+        :return Array of indices, parallel to the array of targets.
+        """
+        return np.repeat(np.arange(len(self.nodes), dtype=np.int32),
+                         np.diff(self.offsets))
+
+    def values(self, weighted=True):
+        """
+        Gets the value of every stored edge.
+
+        :param weighted If False or if graph is not weighted, every edge has
+        value 1.
+        :return Array of values, parallel to the array of targets.
+        """
+        if weighted and self.weights is not None:
+            return self.weights
+        return np.ones(len(self.targets))
+
+    def blocks(self, weighted=True, size=BLOCK_SIZE):
+        """
+        Scans stored edges in blocks of consecutive edges.
+
+        :param weighted If False or if graph is not weighted, every edge has
+        value 1.
+        :param size Number of edges of a block.
+        :return Generator of tuples of the array of source node indices, the
+        array of target node indices and the array of values of the edges of
+        each block.
+        """
+        m = len(self.targets)
+        for start in range(0, m, size):
+            end = min(start + size, m)
+            first = np.searchsorted(self.offsets, start, 'right') - 1
+            last = np.searchsorted(self.offsets, end, 'left')
+            counts = np.diff(np.clip(self.offsets[first:last + 1], start, end))
+            rows = np.repeat(np.arange(first, last, dtype=np.int32), counts)
+            if weighted and self.weights is not None:
+                values = np.asarray(self.weights[start:end])
+            else:
+                values = np.ones(end - start)
+            yield rows, np.asarray(self.targets[start:end]), values
+
+    def edges(self):
+        """
+        Gets edges of graph. Every edge of an undirected graph is returned once,
+        with its source node index not greater than its target node index.
+
+        :return Array of indices of source nodes, array of indices of target
+        nodes and array of weights (or None) of edges.
+        """
+        rows = self.rows()
+        if self.directed:
+            return rows, self.targets, self.weights
+        forward = rows <= self.targets
+        weights = self.weights
+        if weights is not None:
+            weights = weights[forward]
+        return rows[forward], self.targets[forward], weights
+
+    def out_degree(self, weighted=False):
+        """
+        Calculates out-degree (degree for undirected graphs, without counting
+        self loops twice) of every node.
+
+        :param weighted If True, degree is the sum of edge weights.
+        :return Array of degrees.
+        """
+        if not weighted or self.weights is None:
+            return np.diff(self.offsets).astype(np.float64)
+        degree = np.zeros(len(self.nodes))
+        for rows, targets, values in self.blocks():
+            degree += np.bincount(rows, weights=values, minlength=len(self.nodes))
+        return degree
+
+    def in_degree(self, weighted=False):
+        """
+        Calculates in-degree of every node.
+
+        :param weighted If True, degree is the sum of edge weights.
+        :return Array of degrees.
+        """
+        degree = np.zeros(len(self.nodes))
+        for rows, targets, values in self.blocks(weighted):
+            degree += np.bincount(targets, weights=values,
+                                  minlength=len(self.nodes))
+        return degree
+
+    def self_loops(self, weighted=False):
+        """
+        Calculates the number (or total weight) of self loops of every node.
+
+        :param weighted If True, weights of self loops are summed.
+        :return Array of numbers of self loops.
+        """
+        loops = np.zeros(len(self.nodes))
+        for rows, targets, values in self.blocks(weighted):
+            mask = rows == targets
+            loops += np.bincount(rows[mask], weights=values[mask],
+                                 minlength=len(self.nodes))
+        return loops
+
+    def degree(self, weighted=False):
+        """
+        Calculates degree of every node. Self loops are counted twice, as in
+        networkx.
+
+        :param weighted If True, degree is the sum of edge weights.
+        :return Array of degrees.
+        """
+        if self.directed:
+            return self.out_degree(weighted) + self.in_degree(weighted)
+        return self.out_degree(weighted) + self.self_loops(weighted)
+
+    def reverse(self):
+        """
+        Gets the snapshot of the reversed graph.
+
+        :return GraphSnapshot object, which is the snapshot itself for
+        undirected graphs.
+        """
+        if not self.directed:
+            return self
+        if self.reverse_view is not None:
+            return self.reverse_view
+        offsets, targets, weights = compress(len(self.nodes), self.targets,
+                                             self.rows(), self.weights)
+        return GraphSnapshot(self.nodes, self.index, offsets, targets, weights,
+                             True)
+
+    def undirected(self):
+        """
+        Gets the snapshot of the undirected view of graph, in which nodes are
+        adjacent if there is an edge between them in either direction. If there
+        are edges in both directions, the edge with the minimum weight is kept.
+
+        Stored undirected views of memory-mapped snapshots may keep both edges,
+        which does not affect traversals of graph.
+
+        :return GraphSnapshot object, which is the snapshot itself for
+        undirected graphs.
+        """
+        if not self.directed:
+            return self
+        if self.undirected_view is not None:
+            return self.undirected_view
+        rows = self.rows()
+        sources = np.concatenate((rows, self.targets))
+        targets = np.concatenate((self.targets, rows))
+        values = self.values()
+        values = np.concatenate((values, values))
+        order = np.lexsort((values, targets, sources))
+        sources = sources[order]
+        targets = targets[order]
+        first = np.ones(len(sources), dtype=bool)
+        first[1:] = ((sources[1:] != sources[:-1]) |
+                     (targets[1:] != targets[:-1]))
+        weights = None
+        if self.weights is not None:
+            weights = values[order][first]
+        offsets, targets, weights = compress(len(self.nodes), sources[first],
+                                             targets[first], weights)
+        return GraphSnapshot(self.nodes, self.index, offsets, targets, weights,
+                             False)
+
+    def adjacency(self, weighted=False):
+        """
+        Creates an integer indexed adjacency list, which is used by traversals
+        of graph such as breadth first search and Dijkstra algorithm.
+
+        :param weighted If False adjacency list contains only neighbours of
+        each node, otherwise it contains tuples of neighbours and the weight of
+        the corresponding edge.
+        :return List, so that adjacency[i] contains the neighbours of nodes[i].
+        For memory-mapped snapshots, it is a LazyAdjacency object.
+        """
+        if self.out_of_core:
+            return LazyAdjacency(self, weighted)
+        offsets = self.offsets.tolist()
+        targets = self.targets.tolist()
+        if weighted:
+            weights = self.values().tolist()
+            return [zip(targets[offsets[i]:offsets[i + 1]],
+                        weights[offsets[i]:offsets[i + 1]])
+                    for i in range(len(self.nodes))]
+        return [targets[offsets[i]:offsets[i + 1]]
+                for i in range(len(self.nodes))]
+
+    def node_values(self, values):
+        """
+        Maps values which are indexed by node index to nodes.
+
+        :param values Array of values of nodes.
+        :return Dictionary of values keyed by node.
+        """
+        return dict(zip(self.nodes, values.tolist()))
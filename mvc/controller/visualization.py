@@ -9,23 +9,75 @@ Apart from this, there are also classes for the creation of frequency diagrams
 (for many measures of nodes such as closeness centrality, clustering coefficient),
 and diagrams of average degree and average shortest path length evolution through
 the time.
+
+Images are drawn on their own Figure and Axes objects and rendered by the Agg
+canvas, without the global state of pyplot, so that images can be created by
+many threads at the same time. Rendered images of graphs are kept in a cache,
+keyed by the content of graph, the positions of its nodes, the style of image
+and what is depicted on it, so that an image which has been rendered before is
+not drawn again. Images also keep their figure and its artists, so that when
+only the style of an image changes, its artists are changed in place and only
+the figure is rendered again.
 """
 __author__ = 'Thodoris Sotiropoulos'
 
 
-from mvc.controller.analysis import Community
 from mvc.controller.analysis import Path
+from mvc.controller.cache import AnalysisCache
 import matplotlib
 
 matplotlib.use('AGG')
 import StringIO
-import pylab as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.cm import get_cmap
+from matplotlib.figure import Figure
 import networkx as nx
 import copy
+import hashlib
 import math
+import numpy as np
 from random import random
 
 
+# Maximum size in bytes of the rendered images which are kept in cache.
+RENDER_CAPACITY = 32 << 20
+
+# Cache of rendered images of graphs, which is shared by all users of system.
+render_cache = AnalysisCache(RENDER_CAPACITY, None)
+
+# Components of image style which are changed in place on the figure of an
+# image, without drawing it again.
+RESTYLED_COMPONENTS = ('node_size', 'node_color', 'edge_width', 'edge_color',
+                       'edge_style', 'font_size', 'font_color')
+
+# Roles of node artists whose size is the node size of image style, unlike
+# nodes which are sized by their ranking.
+FIXED_SIZE_NODES = ('nodes', 'path_nodes', 'colored_nodes')
+
+
+def new_axes():
+    """
+    Creates a figure with a single axes, which is rendered by Agg canvas.
+
+    :return Axes object.
+    """
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    return figure.add_subplot(111)
+
+
+def get_image_url(figure):
+    """
+    Renders a figure as a PNG image.
+
+    :param figure Figure object.
+    :return Encoded string of image based on base64 encoding.
+    """
+    rv = StringIO.StringIO()
+    figure.savefig(rv, format="png")
+    return "data:image/png;base64,%s" % rv.getvalue().encode("base64").strip()
+
+
 class GraphImage:
     """
     This class represents an image of graph and how graph's nodes and edges
@@ -33,7 +85,23 @@ class GraphImage:
 
     For example, nodes of graph are depicted with red and edges are depicted
     with black.
+
+    Image is drawn on the axes which is created for it. Axes is kept together
+    with the artists which depend on the style of image, each one with its
+    role, e.g. 'nodes', 'path_edges' or 'labels', so that style can be changed
+    in place. They are not pickled. Images are taken from render cache when
+    they have already been rendered.
+
+    Communities which are depicted are kept by the metrics of graph, so they
+    are not pickled with image either; they are taken from graph again
+    whenever communities are depicted.
     """
+    axes = None
+    artists = None
+    retained = None
+    communities = None
+    community_algorithm = 'girvan_newman'
+
     def __init__(self, image_style, graphfile):
         """
         Initialize image of graph according to what should be depicted.
@@ -60,6 +128,18 @@ class GraphImage:
         self.image_style = image_style
         self.simple_image()
 
+    def __getstate__(self):
+        """
+        Gets the state of image to be pickled, without its figure and
+        communities.
+
+        :return Dictionary of attributes of image.
+        """
+        state = self.__dict__.copy()
+        for name in ('axes', 'artists', 'retained', 'communities'):
+            state.pop(name, None)
+        return state
+
     def get_node_pos(self):
         """
         Gets layout of graph's nodes.
@@ -91,14 +171,16 @@ class GraphImage:
             edge_labels[tuple(e1)] = self.graph.graph.edge[u][v]['weight']
             if edge_list.count(str(u + v)) == 0 and self.graph.graphtype == 'Directed':
                 nx.draw_networkx_edge_labels(self.graph, pos, edge_labels=edge_labels,
-                                             font_size=9, label_pos=0.2)
+                                             font_size=9, label_pos=0.2,
+                                             ax=self.axes)
                 if self.graph.graph.has_edge(v, u):
                     edge_lab = {}
                     e2 = (v, u)
                     edge_list.append(str(v + u))
                     edge_lab[tuple(e2)] = self.graph.graph.edge[v][u]['weight']
                     nx.draw_networkx_edge_labels(self.graph, pos, edge_labels=edge_lab,
-                                                 font_size=9, label_pos=0.2)
+                                                 font_size=9, label_pos=0.2,
+                                                 ax=self.axes)
 
     def draw_edge_weights_undirected(self, pos):
         """
@@ -113,20 +195,188 @@ class GraphImage:
             e = (u, v)
             edge_labels[tuple(e)] = self.graph.graph.edge[u][v]['weight']
         nx.draw_networkx_edge_labels(self.graph, pos, edge_labels=edge_labels,
-                                     font_size=9)
+                                     font_size=9, ax=self.axes)
 
     def create_image_url(self):
         """
         Creates an encoded string of PNG image of graph based on base64 encoding.
         """
-        plt.axis("off")
+        self.axes.set_axis_off()
+        self.url = get_image_url(self.axes.figure)
+
+    def retain(self, role, artist):
+        """
+        Keeps an artist of image, so that its style can be changed in place.
+
+        :param role Role of artist in image.
+        :param artist Artist or None if nothing has been drawn.
+        """
+        if artist is not None:
+            self.artists.append((role, artist))
+
+    def retain_edges(self, role, edges, first):
+        """
+        Keeps the edges which have been drawn by networkx. For directed graphs,
+        networkx draws their arrows as another collection, which is kept with
+        role '<role>_arrows'.
+
+        :param role Role of edges in image.
+        :param edges Collection of edges or None if nothing has been drawn.
+        :param first Number of collections of axes before edges were drawn.
+        """
+        for collection in self.axes.collections[first:]:
+            self.retain(role if collection is edges else role + '_arrows',
+                        collection)
+
+    def retain_labels(self, labels):
+        """
+        Keeps the labels of nodes, which have been drawn by networkx.
+
+        :param labels Dictionary of text artists keyed by node.
+        """
+        for text in labels.values():
+            self.retain('labels', text)
+
+    def image_mode(self):
+        """
+        Gets what is depicted on image.
+
+        :return 'path', 'communities', 'ranking' or 'simple'.
+        """
+        if self.path_image:
+            return 'path'
+        elif self.communities_image:
+            return 'communities'
+        elif self.ranking_image:
+            return 'ranking'
+        return 'simple'
+
+    def layout_key(self):
+        """
+        Gets the digest of the content of graph and the positions of nodes.
+
+        :return Hexadecimal digest.
+        """
+        pos = self.get_node_pos()
+        return hashlib.sha1(repr([
+            self.graph.canonical_form.digest, self.graph.graphtype,
+            sorted((node, map(float, pos[node])) for node in pos)
+        ])).hexdigest()
+
+    def image_key(self):
+        """
+        Gets the key of image in render cache. It is the digest of everything
+        that image depends on: the content of graph, the positions of nodes,
+        the style of image and the path, communities or ranking which is
+        depicted.
+
+        :return Hexadecimal digest.
+        """
+        mode = self.image_mode()
+        parts = [self.layout_key(), sorted(vars(self.image_style).items()),
+                 mode]
+        if mode == 'path':
+            parts.append(self.paths.path_sequence)
+        elif mode == 'communities':
+            parts.append((self.community_algorithm, self.level,
+                          sorted(self.communities_color.items())))
+        elif mode == 'ranking':
+            parts.append((self.ranking.type,
+                          getattr(self.ranking, 'cmap', None),
+                          list(getattr(self.ranking, 'color_ranking', [])),
+                          getattr(self.ranking, 'size_ranking', None)))
+        return hashlib.sha1(repr(parts)).hexdigest()
+
+    def render(self, *draw_functions):
+        """
+        Creates the image of graph, if it is not in render cache. Image is
+        stored in cache only if drawing it has not changed the state of image,
+        e.g. when new random colors are given to communities. The figure of an
+        image which is drawn is kept, whereas the figure of an image which is
+        taken from cache is released.
+
+        :param draw_functions Functions which draw the parts of image, given
+        the positions of nodes.
+        """
+        key = self.image_key()
+        url = render_cache.get(key)
+        self.axes = self.artists = self.retained = None
+        if url is not None:
+            self.url = url
+            return
         try:
-            rv = StringIO.StringIO()
-            plt.savefig(rv, format="png")
-            self.url = "data:image/png;base64,%s" % rv.getvalue().encode("base64").strip()
-        finally:
-            plt.clf()
-            plt.close()
+            self.axes = new_axes()
+            self.artists = []
+            pos = self.get_node_pos()
+            for draw in draw_functions:
+                draw(pos)
+            self.create_image_url()
+        except Exception:
+            self.axes = self.artists = None
+            raise
+        self.retained = (self.image_mode(), self.layout_key())
+        if self.image_key() == key:
+            render_cache.put(key, self.url)
+
+    def restyle(self, component):
+        """
+        Changes a component of the style of image in place, on the artists of
+        its figure, and renders figure again.
+
+        Image is restyled only if its figure has been kept, it still depicts
+        the same graph, layout and path, communities or ranking, and some of
+        its artists depend on the component. Restyled images are not stored in
+        render cache; only images which are drawn again are.
+
+        :param component Component of image style which has been changed.
+        :return True if image has been restyled, False if it has to be drawn
+        again.
+        """
+        if self.axes is None or component not in RESTYLED_COMPONENTS or \
+                self.retained != (self.image_mode(), self.layout_key()):
+            return False
+        style = self.image_style
+        restyled = False
+        for role, artist in self.artists:
+            if role == 'labels':
+                if component == 'font_size':
+                    artist.set_fontsize(style.font_size)
+                elif component == 'font_color':
+                    artist.set_color(style.font_color)
+                else:
+                    continue
+            elif role.endswith('nodes'):
+                if component == 'node_size' and role in FIXED_SIZE_NODES:
+                    size = style.node_size
+                    if role == 'path_nodes':
+                        size += 100
+                    artist.set_sizes([size])
+                elif component == 'node_color' and role in ('nodes',
+                                                            'sized_nodes'):
+                    artist.set_facecolor(style.node_color)
+                else:
+                    continue
+            else:
+                path = role.startswith('path')
+                if component == 'edge_width':
+                    width = style.edge_width + 1 if path else style.edge_width
+                    if role.endswith('arrows'):
+                        width *= 4
+                    artist.set_linewidth(width)
+                elif component == 'edge_color' and not path:
+                    artist.set_color(style.edge_color)
+                elif component == 'edge_style' and role == 'edges':
+                    artist.set_linestyle(style.edge_style)
+                else:
+                    continue
+            restyled = True
+        if not restyled:
+            return False
+        url = render_cache.get(self.image_key())
+        if url is None:
+            url = get_image_url(self.axes.figure)
+        self.url = url
+        return True
 
     def simple_image(self):
         """
@@ -135,10 +385,7 @@ class GraphImage:
         nodes according to their values in a measure (closeness centrality,
         clustering coefficient, etc.)
         """
-        pos = self.get_node_pos()
-        self.draw_nodes(pos)
-        self.draw_edges(pos)
-        self.create_image_url()
+        self.render(self.draw_nodes, self.draw_edges)
 
     def draw_nodes(self, pos):
         """
@@ -149,10 +396,11 @@ class GraphImage:
         :param pos Position of nodes.
         """
         nodes = self.graph.graph.nodes()
-        nx.draw_networkx_nodes(self.graph.graph, pos, nodelist=nodes,
-                               node_size=self.image_style.node_size,
-                               node_color=self.image_style.node_color,
-                               node_shape=self.image_style.node_shape)
+        self.retain('nodes', nx.draw_networkx_nodes(
+            self.graph.graph, pos, nodelist=nodes,
+            node_size=self.image_style.node_size,
+            node_color=self.image_style.node_color,
+            node_shape=self.image_style.node_shape, ax=self.axes))
 
     def create_path(self, path=None):
         """
@@ -167,10 +415,7 @@ class GraphImage:
         self.ranking_image = False
         if path is not None:
             self.paths = path
-        pos = self.get_node_pos()
-        self.draw_path_nodes(pos)
-        self.draw_path_edges(pos)
-        self.create_image_url()
+        self.render(self.draw_path_nodes, self.draw_path_edges)
 
     def draw_path_nodes(self, pos):
         """
@@ -183,16 +428,18 @@ class GraphImage:
         :param pos Position of nodes.
         """
         for path in self.paths.path_sequence:
-            nx.draw_networkx_nodes(self.graph.graph, pos, nodelist=path,
-                                   node_size=self.image_style.node_size + 100,
-                                   node_color='crimson',
-                                   node_shape=self.image_style.node_shape)
+            self.retain('path_nodes', nx.draw_networkx_nodes(
+                self.graph.graph, pos, nodelist=path,
+                node_size=self.image_style.node_size + 100,
+                node_color='crimson',
+                node_shape=self.image_style.node_shape, ax=self.axes))
         rest_nodes = Path.get_nodes_which_are_not_in_path(self.graph.graph,
                                                           self.paths.path_sequence)
-        nx.draw_networkx_nodes(self.graph.graph, pos, nodelist=rest_nodes,
-                               node_size=self.image_style.node_size,
-                               node_color=self.image_style.node_color,
-                               node_shape=self.image_style.node_shape)
+        self.retain('nodes', nx.draw_networkx_nodes(
+            self.graph.graph, pos, nodelist=rest_nodes,
+            node_size=self.image_style.node_size,
+            node_color=self.image_style.node_color,
+            node_shape=self.image_style.node_shape, ax=self.axes))
 
     def draw_path_edges(self, pos):
         """
@@ -208,50 +455,52 @@ class GraphImage:
         for path in self.paths.path_sequence:
             path_vertices = Path.get_path_edges(path)
             all_vertices.append(path_vertices)
-            nx.draw_networkx_edges(self.graph.graph, pos, edgelist=path_vertices,
-                                   width=self.image_style.edge_width + 1,
-                                   edge_color="black", style="dashed")
+            first = len(self.axes.collections)
+            edges = nx.draw_networkx_edges(self.graph.graph, pos,
+                                           edgelist=path_vertices,
+                                           width=self.image_style.edge_width + 1,
+                                           edge_color="black", style="dashed",
+                                           ax=self.axes)
+            self.retain_edges('path_edges', edges, first)
         rest_edges = Path.get_edges_which_are_not_in_paths(self.graph.graph,
                                                            all_vertices)
         label = self.graph.get_node_label()
-        nx.draw_networkx_edges(self.graph.graph, pos, rest_edges,
-                               width=self.image_style.edge_width,
-                               edge_color=self.image_style.edge_color,
-                               style=self.image_style.edge_style)
-        nx.draw_networkx_labels(self.graph.graph, pos, labels=label,
-                                font_size=self.image_style.font_size,
-                                font_color=self.image_style.font_color)
+        first = len(self.axes.collections)
+        edges = nx.draw_networkx_edges(self.graph.graph, pos, rest_edges,
+                                       width=self.image_style.edge_width,
+                                       edge_color=self.image_style.edge_color,
+                                       style=self.image_style.edge_style,
+                                       ax=self.axes)
+        self.retain_edges('edges', edges, first)
+        self.retain_labels(nx.draw_networkx_labels(
+            self.graph.graph, pos, labels=label,
+            font_size=self.image_style.font_size,
+            font_color=self.image_style.font_color, ax=self.axes))
         if self.graph.is_weighted and self.image_style.edge_label:
             self.draw_edge_weights(pos)
 
     def draw_communities(self, pos):
         """
         Draws communities of graph. Each community is depicted with different
-        color. Each community is consisted of a list of nodes.
+        color. Each community is consisted of a list of nodes. Communities
+        which have no color yet get a random one.
 
         :param pos Position of nodes.
         """
-        g = nx.Graph(self.graph.graph)
-        self.communities = Community(g)
         counter = 0
-        for community in self.communities.communities[self.level - 1]:
-            if not self.communities_image:
+        for community in self.communities.get_level(self.level):
+            try:
+                color = self.communities_color[counter]
+            except KeyError:
                 color = (random(), random(), random())
                 self.communities_color[counter] = color
-            else:
-                try:
-                    color = self.communities_color[counter]
-                except KeyError:
-                    color = (random(), random(), random())
-                    self.communities_color[counter] = color
-            nx.draw_networkx_nodes(g, pos, nodelist=community.nodes(),
-                                   node_size=self.image_style.node_size,
-                                   node_color=color,
-                                   node_shape=self.image_style.node_shape)
+            self.retain('colored_nodes', nx.draw_networkx_nodes(
+                self.graph.graph, pos, nodelist=community,
+                node_size=self.image_style.node_size, node_color=color,
+                node_shape=self.image_style.node_shape, ax=self.axes))
             counter += 1
-        self.communities_image = True
 
-    def image_communities(self, level=None):
+    def image_communities(self, level=None, algorithm=None):
         """
         Creates an image of graph with a depiction of communities which
         are detected in graph.
@@ -260,18 +509,30 @@ class GraphImage:
         algorithm. Higher value of this parameter means more communities which
         are consisted of fewer nodes, whereas lowe value of this parameter means
         fewer communities which are consisted of more nodes.
+        :param algorithm Algorithm of community detection, 'girvan_newman' or
+        'louvain'.
         """
         self.path_image = False
         self.ranking_image = False
         if level is not None:
             self.level = level
-        pos = self.get_node_pos()
-        self.draw_communities(pos)
-        self.draw_edges(pos)
-        self.create_image_url()
+        if algorithm is not None:
+            self.community_algorithm = algorithm
+        if not self.communities_image:
+            self.communities_color = {}
+            self.communities_image = True
+        self.communities = self.graph.get_communities(self.community_algorithm)
+        self.render(self.draw_communities, self.draw_edges)
+
+    def update_image(self, component=None):
+        """
+        Update image of graph according to a change by user.
 
-    def update_image(self):
-        """ Update image of graph according to a change by user."""
+        :param component Component of image style which has been changed, so
+        that image can be restyled in place, or None.
+        """
+        if component is not None and self.restyle(component):
+            return
         if self.communities_image:
             self.image_communities()
         elif self.path_image:
@@ -291,13 +552,18 @@ class GraphImage:
         :param pos Position of nodes.
         """
         label = self.graph.get_node_label()
-        nx.draw_networkx_edges(self.graph.graph, pos, self.graph.graph.edges(),
-                               width=self.image_style.edge_width,
-                               edge_color=self.image_style.edge_color,
-                               style=self.image_style.edge_style)
-        nx.draw_networkx_labels(self.graph.graph, pos, labels=label,
-                                font_size=self.image_style.font_size,
-                                font_color=self.image_style.font_color)
+        first = len(self.axes.collections)
+        edges = nx.draw_networkx_edges(self.graph.graph, pos,
+                                       self.graph.graph.edges(),
+                                       width=self.image_style.edge_width,
+                                       edge_color=self.image_style.edge_color,
+                                       style=self.image_style.edge_style,
+                                       ax=self.axes)
+        self.retain_edges('edges', edges, first)
+        self.retain_labels(nx.draw_networkx_labels(
+            self.graph.graph, pos, labels=label,
+            font_size=self.image_style.font_size,
+            font_color=self.image_style.font_color, ax=self.axes))
         if self.graph.is_weighted and self.image_style.edge_label:
             self.draw_edge_weights(pos)
 
@@ -309,12 +575,12 @@ class GraphImage:
 
         :param pos Position of nodes.
         """
-        nx.draw_networkx_nodes(self.graph.graph, pos,
-                               nodelist=self.graph.graph.nodes(),
-                               node_size=self.image_style.node_size,
-                               node_color=self.ranking.color_ranking,
-                               node_shape=self.image_style.node_shape,
-                               cmap=plt.get_cmap(self.ranking.cmap))
+        self.retain('colored_nodes', nx.draw_networkx_nodes(
+            self.graph.graph, pos, nodelist=self.graph.graph.nodes(),
+            node_size=self.image_style.node_size,
+            node_color=self.ranking.color_ranking,
+            node_shape=self.image_style.node_shape,
+            cmap=get_cmap(self.ranking.cmap), ax=self.axes))
 
     def rank_nodes_by_size(self, pos):
         """
@@ -324,11 +590,11 @@ class GraphImage:
 
         :param pos Position of nodes.
         """
-        nx.draw_networkx_nodes(self.graph.graph,
-                               pos, nodelist=self.ranking.size_ranking[1],
-                               node_size=self.ranking.size_ranking[0],
-                               node_color=self.image_style.node_color,
-                               node_shape=self.image_style.node_shape)
+        self.retain('sized_nodes', nx.draw_networkx_nodes(
+            self.graph.graph, pos, nodelist=self.ranking.size_ranking[1],
+            node_size=self.ranking.size_ranking[0],
+            node_color=self.image_style.node_color,
+            node_shape=self.image_style.node_shape, ax=self.axes))
 
     def rank_nodes_by_color_and_size(self, pos):
         """
@@ -338,12 +604,12 @@ class GraphImage:
 
         :param pos Position of nodes.
         """
-        nx.draw_networkx_nodes(self.graph.graph, pos,
-                               nodelist=self.ranking.size_ranking[1],
-                               node_size=self.ranking.size_ranking[0],
-                               node_color=self.ranking.color_ranking,
-                               node_shape=self.image_style.node_shape,
-                               cmap=plt.get_cmap(self.ranking.cmap))
+        self.retain('ranked_nodes', nx.draw_networkx_nodes(
+            self.graph.graph, pos, nodelist=self.ranking.size_ranking[1],
+            node_size=self.ranking.size_ranking[0],
+            node_color=self.ranking.color_ranking,
+            node_shape=self.image_style.node_shape,
+            cmap=get_cmap(self.ranking.cmap), ax=self.axes))
 
     def ranking_nodes_image(self, ranking=None):
         """
@@ -359,15 +625,13 @@ class GraphImage:
         self.path_image = False
         if ranking is not None:
             self.ranking = ranking
-        pos = self.get_node_pos()
         if self.ranking.type == 'colorRanking':
-            self.rank_nodes_by_color(pos)
+            draw_nodes = self.rank_nodes_by_color
         elif self.ranking.type == 'sizeRanking':
-            self.rank_nodes_by_size(pos)
+            draw_nodes = self.rank_nodes_by_size
         else:
-            self.rank_nodes_by_color_and_size(pos)
-        self.draw_edges(pos)
-        self.create_image_url()
+            draw_nodes = self.rank_nodes_by_color_and_size
+        self.render(draw_nodes, self.draw_edges)
 
 
 class ImageStyle:
@@ -406,11 +670,9 @@ def get_x_values(measure, graphfile):
 
     :param measure Measure to get values of each node.
     :param graphfile Graph object.
-    :return list of values.
+    :return array of values.
     """
-    graph = graphfile.graph.graph
-    values = list(nx.get_node_attributes(graph, measure).values())
-    return values
+    return np.array(graphfile.graph.get_node_values(measure).values())
 
 
 class Diagram:
@@ -443,9 +705,10 @@ class Diagram:
         self.initial_values = []
         self.values = get_x_values(self.x_values_type, graphfile)
         self.initialize_values()
-        self.create_histogram()
-        self.create_polygon()
-        self.url = Diagram.get_url()
+        axes = new_axes()
+        self.create_histogram(axes)
+        self.create_polygon(axes)
+        self.url = get_image_url(axes.figure)
 
     def initialize_values(self):
         """
@@ -460,8 +723,8 @@ class Diagram:
         - Polygon frequency values of each class.
         - Histogram frequency values of each class.
         """
-        min_value = min(self.values)
-        max_value = max(self.values)
+        min_value = float(self.values.min())
+        max_value = float(self.values.max())
         variance = max_value - min_value
         self.classes_number = int(math.ceil(1 + 3.3 * math.log10(len(self.values)))) + 1
         self.class_width = variance / float(self.classes_number)
@@ -475,34 +738,39 @@ class Diagram:
             self.central_values.append((lower_limit + upper_limit) / 2)
         self.polygon_frequencies.append(0)
         for diagram_class in classes:
-            counter = 0
-            for value in self.values:
-                if diagram_class[0] <= value < diagram_class[1]:
-                    counter += 1
+            counter = int(((self.values >= diagram_class[0]) &
+                           (self.values < diagram_class[1])).sum())
             self.bar_frequencies.append(counter)
             self.polygon_frequencies.append(counter)
             self.initial_values.append(diagram_class[0])
 
-    def create_polygon(self):
-        """ Creates the polygon frequency diagram. """
-        plt.plot(self.central_values, self.polygon_frequencies)
+    def create_polygon(self, axes):
+        """
+        Creates the polygon frequency diagram.
 
-    def create_histogram(self):
-        """ Creates the histogram frequency diagram. """
-        plt.subplots()
+        :param axes Axes object of diagram.
+        """
+        axes.plot(self.central_values, self.polygon_frequencies)
+
+    def create_histogram(self, axes):
+        """
+        Creates the histogram frequency diagram.
+
+        :param axes Axes object of diagram.
+        """
         opacity = 0.7
         error_config = {'ecolor': '0.1'}
-        plt.bar(self.initial_values,
-                self.bar_frequencies,
-                self.class_width,
-                alpha=opacity,
-                color='green',
-                error_kw=error_config)
-        plt.xlabel(str.capitalize(self.x_values_type))
-        plt.ylabel('Number of Nodes')
-        plt.title(str.capitalize(self.x_values_type) + ' Distribution')
-        plt.legend()
-        plt.tight_layout()
+        axes.bar(self.initial_values,
+                 self.bar_frequencies,
+                 self.class_width,
+                 alpha=opacity,
+                 color='green',
+                 error_kw=error_config)
+        axes.set_xlabel(str.capitalize(self.x_values_type))
+        axes.set_ylabel('Number of Nodes')
+        axes.set_title(str.capitalize(self.x_values_type) + ' Distribution')
+        axes.legend()
+        axes.figure.tight_layout()
 
     @staticmethod
     def graph_evolution_over_time(time, graphfile):
@@ -523,27 +791,16 @@ class Diagram:
         degree_values = values_to_analyze[0].values()
         shortest_path_values = values_to_analyze[1].values()
         x_values = values_to_analyze[0].keys()
-        plt.figure(1)
-        plt.plot(x_values, degree_values, 'ro-')
-        plt.xlabel('Time')
-        plt.ylabel('Degree')
-        plt.title('Degree over time')
-        url1 = Diagram.get_url()
-        plt.figure(2)
-        plt.plot(x_values, shortest_path_values, 'ro-')
-        plt.xlabel('Time')
-        plt.ylabel('Average shortest path length')
-        plt.title('Average shortest path length over time')
-        url2 = Diagram.get_url()
-        return url1, url2
-
-    @staticmethod
-    def get_url():
-        try:
-            rv = StringIO.StringIO()
-            plt.savefig(rv, format="png")
-            url = "data:image/png;base64,%s" % rv.getvalue().encode("base64").strip()
-        finally:
-            plt.clf()
-            plt.close()
-        return url
\ No newline at end of file
+        axes = new_axes()
+        axes.plot(x_values, degree_values, 'ro-')
+        axes.set_xlabel('Time')
+        axes.set_ylabel('Degree')
+        axes.set_title('Degree over time')
+        url1 = get_image_url(axes.figure)
+        axes = new_axes()
+        axes.plot(x_values, shortest_path_values, 'ro-')
+        axes.set_xlabel('Time')
+        axes.set_ylabel('Average shortest path length')
+        axes.set_title('Average shortest path length over time')
+        url2 = get_image_url(axes.figure)
+        return url1, url2
\ No newline at end of file
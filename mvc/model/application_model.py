@@ -50,6 +50,24 @@ class GraphFile(db.Model):
     graph = ObjectProperty()
 
 
+class EvictedProgress(db.Model):
+    """
+    This class represents the progress of analysis of a graph which user has
+    saved with a name, as it was when it was evicted from memory. It is kept
+    apart from the saved progress, which changes only when user saves it.
+
+    Attributes:
+    user: User who analyze graph.
+    filename: Name of saved progress.
+    image: Encoded String for graph visualization based on base64 encoding.
+    graph: Graph object to be analyzed.
+    """
+    user = db.StringProperty()
+    filename = db.StringProperty()
+    image = ObjectProperty()
+    graph = ObjectProperty()
+
+
 class User(db.Model):
     """
     A class that represents user which is registered to the system. Not a guest
@@ -81,3 +99,48 @@ def delete_data():
         'filename =', 'file.txt')
     list4 = query4.fetch(limit=10000)
     db.delete(list4)
+    evicted = db.Query(EvictedProgress).filter('user =', session['user'])
+    db.delete(evicted.fetch(limit=10000))
+
+
+def persist_project(project):
+    """
+    Persists progress of a graph analysis before it is evicted from memory.
+    Temporary progress is written to datastore, whereas progress which user
+    has saved with a name is kept as it was saved and its current state is
+    written to datastore as an evicted progress.
+
+    :param project: Progress of graph analysis.
+    :return: Key of progress in datastore or, for saved progress, tuple of
+    the keys of saved progress and of evicted progress.
+    """
+    if project.filename == 'file.txt':
+        project.put()
+        return project.key()
+    evicted = EvictedProgress(user=project.user, filename=project.filename,
+                              image=project.image, graph=project.graph)
+    evicted.put()
+    return project.key(), evicted.key()
+
+
+def load_project(key):
+    """
+    Loads progress of a graph analysis which was evicted from memory. Saved
+    progress gets the state it had when it was evicted, which is then removed
+    from datastore.
+
+    :param key: Key of progress in datastore or tuple of keys of saved
+    progress and of evicted progress.
+    :return: Progress of graph analysis or None if it has been deleted.
+    """
+    if not isinstance(key, tuple):
+        return db.get(key)
+    key, evicted_key = key
+    project = db.get(key)
+    evicted = db.get(evicted_key)
+    if evicted is not None:
+        db.delete(evicted)
+        if project is not None:
+            project.graph = evicted.graph
+            project.image = evicted.image
+    return project
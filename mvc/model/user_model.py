@@ -138,6 +138,8 @@ class User:
             if pr.filename == projectname and not save:
                 return False
         self.delete_project(projectname)
+        if graphfile.graph.out_of_core:
+            graphfile.graph.disk.persistent = True
         project = model.GraphFile(user=self.username,
                                   filename=projectname,
                                   data=query.data,
@@ -4,7 +4,10 @@ requests for file downloading.
 
 For instance, these files can be, image of graph visualization in png format,
 edge information and node in information in CSV format, graph file in txt format,
-diagrams in png format.
+diagrams in png format, graph file in binary format.
+
+Graphs which are stored on disk have neither an image nor lists of node and
+edge information, so user is redirected to the page of diagrams instead.
 """
 __author__ = 'Thodoris Sotiropoulos'
 
@@ -13,7 +16,8 @@ import StringIO
 from base64 import decodestring
 
 from mvc.controller import graphfile as current_graph
-from flask import stream_with_context, request, session
+from mvc.controller.graphformat import iter_binary, iter_edge_list
+from flask import redirect, stream_with_context, request, session, url_for
 from main import app
 from werkzeug.datastructures import Headers
 from werkzeug.wrappers import Response
@@ -27,6 +31,9 @@ def download_node_info():
 
     :return: CSV file with the node information
     """
+    if current_graph.graphfile[session['user']].graph.out_of_core:
+        return redirect(url_for('diagrams'))
+
     def download():
         """
         Gets all node information of the graph such as centrality measures
@@ -71,6 +78,9 @@ def download_edge_info():
 
     :return: CSV file with the edge information
     """
+    if current_graph.graphfile[session['user']].graph.out_of_core:
+        return redirect(url_for('diagrams'))
+
     def download():
         """
         Gets all edge information of the graph such as edge's source node,
@@ -107,7 +117,10 @@ def download_graph_image():
 
     :return: Image of graph in png format.
     """
-    image = current_graph.graphfile[session['user']].image.url.split(",")[1]
+    graph = current_graph.graphfile[session['user']]
+    if graph.graph.out_of_core:
+        return redirect(url_for('diagrams'))
+    image = graph.image.url.split(",")[1]
     image_output = StringIO.StringIO()
     image_output.write(decodestring(image))  # Write decoded image to buffer
     image_output.seek(0)
@@ -144,10 +157,21 @@ def download_diagram():
 @app.route('/download_graph')
 def download_graph():
     """
-    Gets edges of graph and then generates a graph file in txt format.
+    Gets edges of graph and then generates a graph file in txt format. Graphs
+    which are stored on disk are written block by block from their snapshot.
 
     :return: Graph file in txt format.
     """
+    graph = current_graph.graphfile[session['user']]
+    headers = Headers()
+    headers.add('Content-Disposition', 'attachment', filename='graph.txt')
+    if graph.graph.out_of_core:
+        return Response(
+            stream_with_context(iter_edge_list(graph.graph.snapshot)),
+            mimetype='text/txt',
+            headers=headers
+        )
+
     def download():
         """
         Gets graph's edges and then generates a graph file in txt format.
@@ -160,7 +184,6 @@ def download_graph():
 
         If graph is weighted row also includes edge weight
         """
-        graph = current_graph.graphfile[session['user']]
         info = graph.graph.get_graph_txtformat()
         data = StringIO.StringIO()
         for row in info:
@@ -171,10 +194,26 @@ def download_graph():
             yield data.getvalue()
             data.seek(0)
             data.truncate(0)
-    headers = Headers()
-    headers.add('Content-Disposition', 'attachment', filename='graph.txt')
     return Response(
         stream_with_context(download()),
         mimetype='text/txt',
         headers=headers
     )
+
+
+@app.route('/download_graph_binary')
+def download_graph_binary():
+    """
+    Gets nodes and edges of graph and then generates a graph file in binary
+    format, which can be uploaded again much faster than a file in txt format.
+
+    :return: Graph file in binary format.
+    """
+    graph = current_graph.graphfile[session['user']]
+    headers = Headers()
+    headers.add('Content-Disposition', 'attachment', filename='graph.nxgb')
+    return Response(
+        stream_with_context(iter_binary(graph.graph.snapshot)),
+        mimetype='application/octet-stream',
+        headers=headers
+    )
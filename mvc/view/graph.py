@@ -24,6 +24,7 @@ import json
 from flask import session, request, render_template, redirect, url_for, Response
 from main import app
 from mvc.controller.graph import *
+from mvc.controller.graphformat import GraphFileError
 from mvc.controller.analysis import *
 from mvc.controller.visualization import *
 from mvc.model import user_model as user_admin
@@ -45,28 +46,41 @@ def draw_graph():
 
     If graph is weighted row also includes edge weight
 
+    Graph files in binary format, as they are downloaded from system, are
+    supported too. For these files, type of graph is defined by file.
+
+    Large graph files are stored on disk. Such graphs have no image and user
+    is redirected to the page of diagrams.
+
+    If the same graph has been uploaded before, by any user, its analysis is
+    restored from the shared cache of analyses.
+
     :return: Main page of graph visualization.
     """
     if not session['login']:
         return redirect(url_for('index'))
     f = request.files['file']
-    filestream = f.read()
     parameters = request.form
     try:
         graph = Graphs(parameters, layout='random', upload=True,
-                       data=filestream)
-    except IOError:
+                       data=f.stream)
+    except IOError as e:
+        if isinstance(e, GraphFileError):
+            session['fileError'] = str(e)
         return redirect(url_for('mainpage', warning=True))
+    graph.restore_analysis()
     user = user_admin.User(session['user'])
     current_graph.graphfile[session['user']] = user.create_temp_project(graph)
     if graph.graphtype == 'Directed':
         session['undirected'] = False
     else:
         session['undirected'] = True
+    session['showimage'] = True
+    if graph.out_of_core:
+        return redirect(url_for('diagrams'))
     image_style = ImageStyle()
     current_graph.graphfile[session['user']].image = GraphImage(image_style,
                                                                 current_graph.graphfile[session['user']])
-    session['showimage'] = True
     return redirect(url_for('graph'))
 
 
@@ -120,10 +134,45 @@ def update_image():
             graph.image.image_style.edge_label = True
         else:
             graph.image.image_style.edge_label = False
-    graph.image.update_image()
+    graph.image.update_image(component_to_update)
     return Response(json.dumps(graph.image.url))
 
 
+def characteristic_to_json(value):
+    """
+    Converts a characteristic of graph to a value which can be encoded in
+    JSON format.
+
+    :param value: Value of characteristic which may be an estimate.
+    :return: Dictionary of estimated value and its range for estimates, the
+    value itself otherwise.
+    """
+    if isinstance(value, Estimate):
+        return value.to_dict()
+    return value
+
+
+@app.route('/_graph_characteristics')
+def graph_characteristics():
+    """
+    Get characteristics of graph which are expensive to calculate, such as
+    diameter and average shortest path length.
+
+    These characteristics are requested by client after graph visualization
+    page has been loaded, so that page is not delayed by their calculation.
+    For large graphs, they are estimates and they are returned together with
+    their error bounds.
+
+    :return: JSON object which includes diameter and average shortest path
+    lengths of graph.
+    """
+    graph = current_graph.graphfile[session['user']]
+    json_obj = {'diameter': characteristic_to_json(graph.graph.diameter),
+                'averagePath': [characteristic_to_json(value) for value in
+                                graph.graph.average_shortest_path_length]}
+    return Response(json.dumps(json_obj))
+
+
 @app.route('/_find_paths', methods=['GET', 'POST'])
 def shortest_paths():
     """
@@ -166,34 +215,49 @@ def find_communities():
 
     Communities are depicted to graph image, colored with different colors.
     Renewed image is represented as an encoded string based on base64.
-    Also list of communities is returned.
+    Also list of communities is returned. Communities are detected either by
+    Girvan - Newman algorithm or, if algorithm is 'louvain', by Louvain
+    algorithm.
 
-    :return: JSON object which included encoded string of graph image, and
-    list of communities.
+    :return: JSON object which included encoded string of graph image, list
+    of communities, number of levels and modularity of communities.
 
     """
     graph = current_graph.graphfile[session['user']]
     level = request.args.get('level', 1, type=int)
-    graph.image.image_communities(level)
+    algorithm = request.args.get('algorithm', 'girvan_newman', type=str)
+    graph.image.image_communities(level, algorithm)
     json_obj = {'url': graph.image.url}
-    componets_of_communities = []
-    for community in graph.image.communities.communities[level - 1]:
-        componets_of_communities.append(community.nodes())
-    json_obj['listOfCommunities'] = componets_of_communities
-    json_obj['levels'] = len(graph.image.communities.communities) - 1
+    json_obj['listOfCommunities'] = graph.image.communities.get_level(level)
+    json_obj['levels'] = graph.image.communities.number_of_levels()
+    json_obj['modularity'] = graph.image.communities.get_modularity(level)
     return Response(json.dumps(json_obj))
 
 
 @app.route('/_find_cliques')
 def find_cliques():
     """
-    Detect cliques of graph. List of cliques is returned.
+    Detect cliques of graph. Cliques with fewer nodes than a minimum size are
+    skipped and at most a maximum number of cliques is detected. Cliques are
+    returned in pages, in decreasing order of size.
 
-    :return: JSON object with the list of cliques.
+    :return: JSON object with the list of cliques of the requested page, the
+    number of cliques and pages, and whether all cliques have been detected.
     """
     graph = current_graph.graphfile[session['user']]
-    cliques = Community(graph.graph.graph)
-    return Response(json.dumps(cliques.cliques))
+    page = request.args.get('page', 1, type=int)
+    page_size = max(request.args.get('pageSize', PAGE_SIZE, type=int), 1)
+    min_size = request.args.get('minSize', 1, type=int)
+    limit = min(request.args.get('limit', MAX_CLIQUES, type=int), MAX_CLIQUES)
+    cliques = graph.graph.get_cliques(min_size, max(limit, 1))
+    number_of_cliques = cliques.number_of_cliques()
+    json_obj = {'cliques': cliques.get_page(page, page_size)}
+    json_obj['page'] = page
+    json_obj['pageSize'] = page_size
+    json_obj['pages'] = max(-(-number_of_cliques // page_size), 1)
+    json_obj['numberOfCliques'] = number_of_cliques
+    json_obj['complete'] = cliques.complete
+    return Response(json.dumps(json_obj))
 
 
 @app.route('/_rank_nodes')
@@ -211,13 +275,19 @@ def rank_nodes():
     With node ranking user can easily see which nodes have the higher
     and lower values, which is variance of node values.
 
+    Betweenness centrality can be either estimated or calculated exactly,
+    according to the parameter approximate ('true' or 'false'). If it is not
+    given, betweenness centrality is estimated for large graphs only.
+
     :return: JSON object which includes encoded string of graph image
-    based on base64.
+    based on base64 and the list of measures whose values are estimates.
 
     """
     graph = current_graph.graphfile[session['user']]
-    if not graph.graph.data_exists():
-        graph.graph.add_data()
+    approximate = {'true': True, 'false': False}.get(
+        request.args.get('approximate', '', type=str))
+    if not graph.graph.data_exists(approximate):
+        graph.graph.add_data(approximate)
     color_measure = request.args.get("colorMeasure", None, type=str)
     size_measure = request.args.get('sizeMeasure', None, type=str)
     colors = request.args.get("colors", None, type=str)
@@ -230,6 +300,9 @@ def rank_nodes():
         urls = [graph.image.url]
     else:
         urls = [graph.image.url]
+    estimates = [measure for measure in set([color_measure, size_measure])
+                 if measure is not None and graph.graph.is_estimate(measure)]
+    urls.append(estimates)
     return Response(json.dumps(urls))
 
 
@@ -304,8 +377,6 @@ def dynamic_graph():
                            density=graph.graph.density,
                            is_DAG=graph.graph.is_DAG,
                            is_connected=graph.graph.is_connected,
-                           diameter=graph.graph.diameter,
-                           average_path=graph.graph.average_shortest_path_length,
                            growing=graph.graph.growing,
                            new_edges=edges)
 
@@ -326,7 +397,6 @@ def add_node():
     graph_obj = current_graph.graphfile[session['user']]
     new_edges = " ".join(str(x) for x in returned_data[1])
     graph_obj.graph.set_node_pos()
-    graph_obj.graph.initialize_graph_characteristics()
     image_style = ImageStyle()
     graph_obj.image = GraphImage(image_style, graph_obj)
     return redirect(url_for('dynamic_graph', edges=new_edges))
@@ -346,7 +416,6 @@ def delete_node():
     current_graph.graphfile[session['user']].graph.graph = graph_obj.graph.delete_node()
     graph_obj = current_graph.graphfile[session['user']]
     graph_obj.graph.set_node_pos()
-    graph_obj.graph.initialize_graph_characteristics()
     image_style = ImageStyle()
     graph_obj.image = GraphImage(image_style, graph_obj)
     return redirect(url_for('graph'))
@@ -21,7 +21,7 @@ system.
 __author__ = 'Thodoris Sotiropoulos'
 
 from mvc.controller import graphfile as current_graph
-from flask import render_template, session, redirect, url_for
+from flask import render_template, session, redirect, url_for, request
 from main import app
 from mvc.model.application_model import delete_data
 from mvc.model.user_model import User
@@ -45,8 +45,13 @@ def graph():
     information about graph such as the list of nodes, if it is weighted,
     if it is a DAG, measures(density), etc.
 
+    Graphs which are stored on disk cannot be visualized, so user is redirected
+    to the page of diagrams.
+
     """
     user_graph = current_graph.graphfile[session['user']]
+    if user_graph.graph.out_of_core:
+        return redirect(url_for('diagrams'))
     return render_template("index.html", name=user_graph.graph.graphtype,
                            number_of_nodes=user_graph.graph.number_of_nodes,
                            nodes=user_graph.graph.graph.nodes(),
@@ -58,8 +63,6 @@ def graph():
                            density=user_graph.graph.density,
                            is_DAG=user_graph.graph.is_DAG,
                            is_connected=user_graph.graph.is_connected,
-                           diameter=user_graph.graph.diameter,
-                           average_path=user_graph.graph.average_shortest_path_length,
                            growing=user_graph.graph.growing)
 
 
@@ -76,7 +79,8 @@ def diagrams():
     return render_template('diagrams.html',
                            graphtype=user_graph.graph.graphtype,
                            is_weighted=user_graph.graph.is_weighted,
-                           growing=user_graph.graph.growing)
+                           growing=user_graph.graph.growing,
+                           out_of_core=user_graph.graph.out_of_core)
 
 
 @app.route("/node_info")
@@ -101,20 +105,32 @@ def node_info():
     -- Eigenvector centrality,
     -- Connected Components
 
+    Betweenness centrality is estimated for large graphs, unless parameter
+    approximate is 'false'.
+
+    Lists of graphs which are stored on disk are not shown, so user is
+    redirected to the page of diagrams.
+
     """
     if not session['login']:
         return redirect(url_for('index'))
     user_graph = current_graph.graphfile[session['user']]
-    if not user_graph.graph.data_exists():
-        user_graph.graph.add_data()
+    if user_graph.graph.out_of_core:
+        return redirect(url_for('diagrams'))
+    approximate = {'true': True, 'false': False}.get(
+        request.args.get('approximate', '', type=str))
+    if not user_graph.graph.data_exists(approximate):
+        user_graph.graph.add_data(approximate)
     if user_graph.graph.graphtype == 'Directed':
         return render_template("graph_info.html",
                                graph=user_graph.graph.graph,
-                               is_weighted=user_graph.graph.is_weighted)
+                               is_weighted=user_graph.graph.is_weighted,
+                               estimates=user_graph.graph.get_estimated_metrics())
     else:
         return render_template("graph_info.html",
                                graph=user_graph.graph.graph,
-                               is_weighted=user_graph.graph.is_weighted)
+                               is_weighted=user_graph.graph.is_weighted,
+                               estimates=user_graph.graph.get_estimated_metrics())
 
 
 @app.route("/import_file", methods=['GET', 'POST'])
@@ -140,4 +156,6 @@ def import_file():
 def mainpage(warning):
     user = User(session['user'])
     projects = user.get_existing_projects()
-    return render_template('index.html', projects=projects, wrong_file=warning)
\ No newline at end of file
+    file_error = session.pop('fileError', None)
+    return render_template('index.html', projects=projects, wrong_file=warning,
+                           file_error=file_error)
\ No newline at end of file
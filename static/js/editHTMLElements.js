@@ -2,6 +2,29 @@ function updateGraphImage(url) {
     $("#graphImage").find("img").attr("src", url);
 }
 
+function showGraphCharacteristics(diameter, averagePath) {
+    $("#diameter").text(characteristicText(diameter));
+    $("#average_path").text(characteristicText(averagePath[0]));
+    if (averagePath.length > 1)
+        $("#average_path_weighted").text(characteristicText(averagePath[1]));
+}
+
+function characteristicText(value) {
+    if (value === null)
+        return "None";
+    if (typeof value !== "object")
+        return String(value);
+    var text = "~" + value.value;
+    if (value.lower !== value.upper) {
+        if (value.confidence < 1)
+            text += " (" + Math.round(value.confidence * 100) + "% confidence: ";
+        else
+            text += " (bounds: ";
+        text += value.lower + " - " + value.upper + ")";
+    }
+    return text;
+}
+
 function alertPath(pathSequence, pathLength) {
     removePathSequence();
     var source = $("#source").val();
@@ -37,13 +60,15 @@ function removePathSequence() {
     $("#pathInfo").empty();
 }
 
-function showCommunities(listOfCommunities, levels) {
+function showCommunities(listOfCommunities, levels, modularity) {
     removeCommunities();
     var communities = $("#communitiesInfo");
     communities.append("<p><span class='ui-icon ui-icon-alert' " +
         "style='float: left; margin-right: .3em;'></span>" +
         "<strong>" + levels + " Levels of communities " +
         "are detected!</strong></p>");
+    communities.append("<p><b>Modularity: </b>" + modularity.toFixed(4) +
+        "</p>");
     if (listOfCommunities.length > 1) {
         communities.append("<label id='tooltip' for='level' " +
         "title='Lower level means that fewer communities are" +
@@ -59,17 +84,40 @@ function showCommunities(listOfCommunities, levels) {
     }
 }
 
-function showCliques(cliques) {
+function showCliques(data) {
     removeCliques();
+    var cliques = data.cliques;
     var cliquesInfo = $("#cliquesInfo");
+    var detected = data.complete ? data.numberOfCliques + " Cliques are detected."
+        : "The first " + data.numberOfCliques + " Cliques are detected.";
     cliquesInfo.append("<div class='ui-state-highlight ui-corner-all' " +
         "style='margin-top: 20px; padding: 0 .7em;'><p id = 'cliqueList'><span " +
         "class='ui-icon ui-icon-info' style='float: left; margin-right: .3em;'>" +
-        "</span><b>" + cliques.length + " Cliques are detected.</b><br></p></div>");
+        "</span><b>" + detected + "</b><br></p></div>");
+    var offset = (data.page - 1) * data.pageSize;
     for (var i = 0; i < cliques.length; i++) {
-        var counter = i + 1;
+        var counter = offset + i + 1;
         cliquesInfo.find("p").append("Clique " + counter + ": " + cliques[i] + "<br>");
     }
+    if (data.pages > 1) {
+        cliquesInfo.find("p").append("<br>Page " + data.page + " of " + data.pages + " ");
+        if (data.page > 1)
+            cliquesInfo.find("p").append("<button onclick='findCliques(" +
+                (data.page - 1) + ")'>Previous</button>");
+        if (data.page < data.pages)
+            cliquesInfo.find("p").append("<button onclick='findCliques(" +
+                (data.page + 1) + ")'>Next</button>");
+        cliquesInfo.find("button").button();
+    }
+}
+
+function showRankingEstimates(estimates) {
+    var rankingInfo = $("#rankingInfo");
+    rankingInfo.empty();
+    if (estimates.length > 0)
+        rankingInfo.append("<p><span class='ui-icon ui-icon-info' " +
+            "style='float: left; margin-right: .3em;'></span>" +
+            "<b>Estimated values: </b>" + estimates.join(", ") + "</p>");
 }
 
 function removeCommunities() {
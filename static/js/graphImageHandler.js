@@ -31,17 +31,20 @@ function updateImage(componentToUpdate, color) {
 function findCommunities(level) {
 	createWaitingBar($("#communities"));
     $.getJSON($SCRIPT_ROOT + '/_find_communities', {
-		level: $("#level").val()
+		level: $("#level").val(),
+		algorithm: $('#communityAlgorithm').find("input[type='radio']:checked").val()
 	}, function(data) {
 		removeProgressBar();
 		updateGraphImage(data.url);
-		showCommunities(data.listOfCommunities, data.levels);
+		showCommunities(data.listOfCommunities, data.levels, data.modularity);
 	});
 }
 
-function findCliques() {
+function findCliques(page) {
 	createWaitingBar($("#cliques"));
 	$.getJSON($SCRIPT_ROOT + '/_find_cliques', {
+		page: page === undefined ? 1 : page,
+		minSize: $("#clique-size").val()
 	}, function(data) {
 		removeProgressBar();
 		showCliques(data);
@@ -55,11 +58,12 @@ function rankNodes() {
 		colorMeasure: $('#colorNodes').val(),
 		sizeMeasure: $('#sizeNodes').val(),
 		colors: $('#color-map').val(),
-		rankingWay: rankingWay
+		rankingWay: rankingWay,
+		approximate: $('#betweenness-calculation').val()
 	}, function(data) {
 		removeProgressBar();
 		updateGraphImage(data[0]);
-
+		showRankingEstimates(data[1]);
 	});
 	return false;
 }
@@ -5,6 +5,13 @@ $(function() {
     });
 });
 
+function loadGraphCharacteristics() {
+    $.getJSON($SCRIPT_ROOT + '/_graph_characteristics', {
+    }, function(data) {
+        showGraphCharacteristics(data.diameter, data.averagePath);
+    });
+}
+
 function saveProject(graphName, save) {
     $.getJSON($SCRIPT_ROOT + '/_save_project', {
         project: graphName,
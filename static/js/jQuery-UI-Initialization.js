@@ -52,6 +52,7 @@ function initializeButtonSets() {
     $("#graph-type").buttonset();
     $("#projects").buttonset();
     $("#calculationWay").buttonset();
+    $("#communityAlgorithm").buttonset();
     $("#analysis").buttonset();
 }
 
@@ -239,4 +240,8 @@ function initializeSpinners() {
         },
         step: .001
     });
+    $( "#clique-size" ).spinner({
+        min: 1,
+        step: 1
+    });
 }
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+Fake models of datastore for tests, which run without App Engine.
+
+Fakes keep progress of analysis in memory. They are installed only while the
+modules which import models are imported and tested, so they do not leak to
+other tests.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import sys
+import types
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+class Project:
+    """ Progress of graph analysis, which is not stored in datastore. """
+    def __init__(self, user, graph):
+        self.user = user
+        self.filename = 'file.txt'
+        self.graph = graph
+        self.image = None
+
+
+class User:
+    """ User whose progress of analysis is not stored in datastore. """
+    def __init__(self, username='', *args, **kwargs):
+        self.username = username
+
+    def create_temp_project(self, graph):
+        return Project(self.username, graph)
+
+    def get_existing_projects(self):
+        return []
+
+
+def fake_models():
+    """
+    Creates fake modules of models of datastore.
+
+    :return Dictionary of modules keyed by their name.
+    """
+    application_model = types.ModuleType('mvc.model.application_model')
+    application_model.delete_data = lambda: None
+    application_model.load_project = lambda key: None
+    application_model.persist_project = lambda project: None
+    user_model = types.ModuleType('mvc.model.user_model')
+    user_model.User = User
+    return {'mvc.model.application_model': application_model,
+            'mvc.model.user_model': user_model}
+
+
+class ModulePatcher:
+    """
+    Patcher which installs fake modules while it is started. When it is
+    stopped, fakes and the modules of application which have been imported
+    with them are removed, whereas libraries are kept, since some of them
+    cannot be imported twice.
+    """
+    def __init__(self, modules):
+        """
+        :param modules Dictionary of fake modules keyed by their name.
+        """
+        self.modules = modules
+        self.imported = None
+
+    def start(self):
+        self.imported = set(sys.modules)
+        sys.modules.update(self.modules)
+
+    def stop(self):
+        for name in set(sys.modules) - self.imported:
+            if name == 'main' or name.startswith('mvc.'):
+                del sys.modules[name]
+
+
+def patch_models():
+    """
+    Creates patchers which install fake models of datastore, as modules and
+    as attributes of their package, from which submodules are imported too.
+
+    :return List of patchers, which are started in this order.
+    """
+    import mvc.model
+    models = fake_models()
+    return [ModulePatcher(models)] + [
+        mock.patch.object(mvc.model, name.rsplit('.', 1)[1], module,
+                          create=True)
+        for name, module in models.items()]
@@ -0,0 +1,136 @@
+"""
+Tests of the accumulation of node and edge betweenness centrality with a
+single pass of Brandes algorithm and of its estimation from a sample of source
+nodes, against networkx.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import random
+import unittest
+from math import ceil, log
+
+import networkx as nx
+
+from mvc.controller.brandes import accumulate_betweenness
+from mvc.controller.graph import Graphs, betweenness_sample_size
+from mvc.controller.snapshot import create_snapshot
+from tests.models import mock
+from tests.test_graph import create_graph
+
+
+def small_graph(graph):
+    """ Adds two weighted connected components to a graph. """
+    graph.add_edge(1, 2, weight=1.0)
+    graph.add_edge(2, 3, weight=2.0)
+    graph.add_edge(1, 3, weight=4.0)
+    graph.add_edge(3, 4, weight=1.0)
+    graph.add_edge(4, 1, weight=1.0)
+    graph.add_edge(4, 5, weight=3.0)
+    graph.add_edge(6, 7, weight=1.0)
+    graph.add_edge(7, 8, weight=1.0)
+    return graph
+
+
+class AccumulateBetweennessTest(unittest.TestCase):
+    def assert_networkx(self, graph, weighted):
+        snapshot = create_snapshot(graph)
+        nodes = snapshot.nodes
+        directed = graph.is_directed()
+        betweenness, edge_betweenness = accumulate_betweenness(
+            snapshot.adjacency(weighted), range(len(nodes)), weighted,
+            directed)
+        weight = 'weight' if weighted else None
+        # networkx halves the values of undirected graphs, which are counted
+        # from both ends of every path.
+        scale = 1.0 if directed else 0.5
+        expected = nx.betweenness_centrality(graph, normalized=False,
+                                             weight=weight)
+        for i, node in enumerate(nodes):
+            self.assertAlmostEqual(betweenness[i] * scale, expected[node])
+        expected = nx.edge_betweenness_centrality(graph, normalized=False,
+                                                  weight=weight)
+        index = dict((node, i) for i, node in enumerate(nodes))
+        for (u, v), value in expected.items():
+            i, j = index[u], index[v]
+            if not directed and i > j:
+                i, j = j, i
+            # Edges which are on no shortest path are not accumulated.
+            self.assertAlmostEqual(edge_betweenness.get((i, j), 0.0) * scale,
+                                   value)
+
+    def test_undirected(self):
+        self.assert_networkx(small_graph(nx.Graph()), False)
+
+    def test_undirected_weighted(self):
+        self.assert_networkx(small_graph(nx.Graph()), True)
+
+    def test_directed(self):
+        self.assert_networkx(small_graph(nx.DiGraph()), False)
+
+    def test_directed_weighted(self):
+        self.assert_networkx(small_graph(nx.DiGraph()), True)
+
+
+class SampledBetweennessTest(unittest.TestCase):
+    """
+    Tests of betweenness centrality which is estimated from a sample of source
+    nodes, for a graph above a lowered betweenness threshold.
+    """
+    epsilon = 0.2
+    delta = 0.1
+
+    def setUp(self):
+        random.seed(3)
+        for name, value in (('betweenness_threshold', 100),
+                            ('betweenness_epsilon', self.epsilon),
+                            ('betweenness_delta', self.delta),
+                            ('analysis_cache', None)):
+            patcher = mock.patch.object(Graphs, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        graph = nx.connected_watts_strogatz_graph(400, 4, 0.1, seed=3)
+        self.nxgraph = nx.relabel_nodes(graph, dict((node, str(node))
+                                                    for node in graph))
+        self.graph = create_graph(self.nxgraph)
+
+    def test_sample_size(self):
+        n = self.graph.number_of_nodes
+        sample_size = betweenness_sample_size(n, self.epsilon, self.delta)
+        self.assertEqual(sample_size, int(ceil(log(2.0 * n / self.delta) /
+                                                (2 * self.epsilon ** 2))))
+        self.assertTrue(sample_size < n)
+        self.assertTrue(betweenness_sample_size(n, self.epsilon / 2,
+                                                self.delta) > sample_size)
+
+    def test_estimate_is_within_bound(self):
+        self.graph.add_data()
+        sample_size = betweenness_sample_size(400, self.epsilon, self.delta)
+        self.assertEqual(self.graph.metrics.get('betweenness'),
+                         {'epsilon': self.epsilon, 'delta': self.delta,
+                          'sources': sample_size})
+        self.assertEqual(sorted(self.graph.get_estimated_metrics()),
+                         ['betweenness', 'edge_betweenness'])
+        graph = self.graph.graph
+        expected = nx.betweenness_centrality(self.nxgraph)
+        errors = [abs(graph.node[node]['betweenness'] - value)
+                  for node, value in expected.items()]
+        self.assertTrue(max(errors) <= self.epsilon)
+        self.assertTrue(sum(errors) > 0)
+        expected = nx.edge_betweenness_centrality(self.nxgraph)
+        for (u, v), value in expected.items():
+            self.assertTrue(abs(graph[u][v]['betweenness'] - value) <=
+                            self.epsilon)
+
+    def test_exact_values_are_requested(self):
+        self.graph.add_data()
+        self.assertFalse(self.graph.data_exists(approximate=False))
+        self.graph.add_data(approximate=False)
+        self.assertEqual(self.graph.get_estimated_metrics(), [])
+        expected = nx.betweenness_centrality(self.nxgraph)
+        for node, value in expected.items():
+            self.assertAlmostEqual(self.graph.graph.node[node]['betweenness'],
+                                   value)
+
+
+if __name__ == '__main__':
+    unittest.main()
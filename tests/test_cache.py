@@ -0,0 +1,170 @@
+"""
+Tests of the cache of analyses of uploaded graphs, which are keyed by the
+canonical form of graphs.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import networkx as nx
+
+from mvc.controller.cache import AnalysisCache, canonical_form
+from mvc.controller.graph import Graphs
+from mvc.controller.snapshot import create_snapshot
+from tests.models import mock
+from tests.test_graph import create_graph
+
+
+def analysis(size):
+    """ Creates an analysis which is hard to compress. """
+    return os.urandom(size)
+
+
+class CanonicalFormTest(unittest.TestCase):
+    def test_order_does_not_matter(self):
+        edges = [('a', 'b', 1.0), ('b', 'c', 2.0), ('c', 'd', 0.5)]
+        graph = nx.Graph()
+        graph.add_weighted_edges_from(edges)
+        reordered = nx.Graph()
+        reordered.add_nodes_from('dcba')
+        reordered.add_weighted_edges_from((v, u, w) for u, v, w
+                                          in reversed(edges))
+        form = canonical_form(create_snapshot(graph))
+        self.assertEqual(form.labels, ['a', 'b', 'c', 'd'])
+        self.assertEqual(form.digest,
+                         canonical_form(create_snapshot(reordered)).digest)
+
+    def test_content_matters(self):
+        graph = nx.Graph([('a', 'b'), ('b', 'c')])
+        digests = set(canonical_form(create_snapshot(g)).digest for g in (
+            graph, nx.DiGraph(graph), nx.Graph([('a', 'b'), ('a', 'c')]),
+            nx.Graph([('a', 'b'), ('b', 'd')])))
+        self.assertEqual(len(digests), 4)
+        weighted = nx.Graph()
+        weighted.add_weighted_edges_from([('a', 'b', 1.0), ('b', 'c', 1.5)])
+        self.assertNotIn(canonical_form(create_snapshot(weighted)).digest,
+                         digests)
+
+
+class AnalysisCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.parent = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.parent)
+        self.directory = os.path.join(self.parent, 'analyses')
+
+    def files(self):
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.endswith('.analysis'))
+
+    def test_least_recently_used_are_evicted(self):
+        cache = AnalysisCache(capacity=3500, directory=None)
+        values = dict((key, analysis(1000)) for key in 'abcd')
+        for key in 'abc':
+            cache.put(key, values[key])
+        self.assertEqual(cache.get('a'), values['a'])
+        cache.put('d', values['d'])
+        self.assertEqual(list(cache.entries), ['c', 'a', 'd'])
+        self.assertIsNone(cache.get('b'))
+        self.assertTrue(cache.size <= cache.capacity)
+        cache.put('c', {'metrics': {}})
+        self.assertEqual(list(cache.entries), ['a', 'd', 'c'])
+        self.assertEqual(cache.get('c'), {'metrics': {}})
+
+    def test_evicted_are_spilled_and_reloaded(self):
+        cache = AnalysisCache(capacity=1500, directory=self.directory)
+        first, second = analysis(1000), analysis(1000)
+        cache.put('first', first)
+        cache.put('second', second)
+        self.assertEqual(list(cache.entries), ['second'])
+        self.assertEqual(self.files(), ['first.analysis'])
+        self.assertEqual(os.stat(self.directory).st_mode & 0777, 0700)
+        self.assertEqual(cache.get('first'), first)
+        self.assertEqual(list(cache.entries), ['first'])
+        self.assertEqual(self.files(), ['first.analysis', 'second.analysis'])
+        other = AnalysisCache(directory=self.directory)
+        self.assertEqual(other.get('second'), second)
+
+    def test_disk_capacity(self):
+        cache = AnalysisCache(capacity=0, directory=self.directory,
+                              disk_capacity=2500)
+        for i, key in enumerate('abc'):
+            cache.put(key, analysis(1000))
+            os.utime(os.path.join(self.directory, key + '.analysis'),
+                     (i, i))
+        self.assertEqual(self.files(), ['b.analysis', 'c.analysis'])
+        self.assertIsNone(cache.get('a'))
+        cache.put('large', analysis(3000))
+        self.assertNotIn('large.analysis', self.files())
+
+    def test_shared_directory_is_not_used(self):
+        os.mkdir(self.directory, 0755)
+        cache = AnalysisCache(capacity=0, directory=self.directory)
+        cache.put('key', analysis(100))
+        self.assertEqual(self.files(), [])
+        self.assertIsNone(cache.get('key'))
+
+
+class CachedAnalysisTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = AnalysisCache(directory=None)
+        patcher = mock.patch.object(Graphs, 'analysis_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.nxgraph = nx.Graph()
+        self.nxgraph.add_weighted_edges_from([
+            ('a', 'b', 1.0), ('b', 'c', 2.0), ('c', 'a', 1.0), ('c', 'd', 3.0),
+            ('d', 'e', 1.0), ('e', 'f', 0.5), ('f', 'd', 1.0)])
+
+    def test_analysis_is_restored_by_canonical_form(self):
+        graph = create_graph(self.nxgraph)
+        self.assertFalse(graph.restore_analysis())
+        graph.add_data()
+        graph.diameter
+        expected = graph.export_analysis()
+        self.assertEqual(list(self.cache.entries), [graph.analysis_key])
+        self.assertTrue(graph.analysis_key.startswith(
+            graph.canonical_form.digest))
+        reordered = nx.Graph()
+        reordered.add_weighted_edges_from(
+            (v, u, data['weight']) for u, v, data
+            in reversed(self.nxgraph.edges(data=True)))
+        restored = create_graph(reordered)
+        self.assertTrue(restored.restore_analysis())
+        self.assertTrue(restored.data_exists())
+        self.assertEqual(restored.metrics.get('diameter'), 3)
+        with mock.patch.object(restored, 'calculate_diameter') as calculate:
+            self.assertEqual(restored.diameter, 3)
+            self.assertFalse(calculate.called)
+        for node, data in graph.graph.nodes_iter(data=True):
+            for name in ('betweenness', 'closeness', 'clustering'):
+                self.assertAlmostEqual(restored.graph.node[node][name],
+                                       data[name])
+        for u, v, data in graph.graph.edges_iter(data=True):
+            self.assertAlmostEqual(restored.graph[u][v]['betweenness'],
+                                   data['betweenness'])
+        exported = restored.export_analysis()
+        self.assertEqual(sorted(exported['metrics']),
+                         sorted(expected['metrics']))
+        self.assertEqual(exported['characteristics'],
+                         expected['characteristics'])
+
+    def test_changed_graph_is_not_stored(self):
+        graph = create_graph(self.nxgraph)
+        graph.restore_analysis()
+        graph.add_data()
+        key = graph.analysis_key
+        stored = self.cache.get(key)
+        graph.metrics.invalidate('weights')
+        graph.add_data()
+        self.assertEqual(sorted(self.cache.get(key)['metrics']),
+                         sorted(stored['metrics']))
+        other = create_graph(nx.path_graph(4))
+        self.assertFalse(other.restore_analysis())
+        self.assertNotEqual(other.analysis_key, key)
+
+
+if __name__ == '__main__':
+    unittest.main()
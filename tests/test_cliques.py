@@ -0,0 +1,159 @@
+"""
+Tests of the maximal cliques of a graph, which are enumerated with a minimum
+size and a limit and read in pages, against networkx.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import json
+import unittest
+from cStringIO import StringIO
+
+import networkx as nx
+
+from mvc.controller.analysis import MAX_CLIQUES, Cliques
+from mvc.controller.graph import Graphs
+from mvc.controller.snapshot import create_snapshot
+from tests.test_snapshot import sort_groups
+from tests.views import ViewTestCase, mock
+
+
+def clique_graph():
+    """ Creates a graph with many maximal cliques of different sizes. """
+    graph = nx.relabel_nodes(nx.karate_club_graph(),
+                             dict((i, 'n%d' % i) for i in range(34)))
+    graph.add_node('isolated')
+    return graph
+
+
+def all_cliques(cliques):
+    """ Reads all cliques, page by page. """
+    pages = []
+    page = 1
+    while True:
+        found = cliques.get_page(page, 7)
+        if not found:
+            return pages
+        pages.extend(found)
+        page += 1
+
+
+class CliquesTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = clique_graph()
+        self.snapshot = create_snapshot(self.graph)
+
+    def test_pages(self):
+        cliques = Cliques(self.snapshot)
+        expected = sort_groups(nx.find_cliques(self.graph))
+        self.assertTrue(cliques.complete)
+        self.assertEqual(cliques.number_of_cliques(), len(expected))
+        found = all_cliques(cliques)
+        self.assertEqual(sort_groups(found), expected)
+        sizes = [len(clique) for clique in found]
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+        self.assertEqual(cliques.get_page(0, 7), cliques.get_page(1, 7))
+        self.assertEqual(cliques.get_page(1, len(expected)), found)
+        last = -(-len(expected) // 7)
+        self.assertEqual(len(cliques.get_page(last, 7)),
+                         len(expected) - 7 * (last - 1))
+        self.assertEqual(cliques.get_page(last + 1, 7), [])
+
+    def test_minimum_size(self):
+        cliques = Cliques(self.snapshot, min_size=3)
+        self.assertEqual(sort_groups(all_cliques(cliques)),
+                         sort_groups(clique for clique
+                                     in nx.find_cliques(self.graph)
+                                     if len(clique) >= 3))
+
+    def test_limit_keeps_first_cliques_for_any_workers(self):
+        serial = Cliques(self.snapshot, min_size=2, limit=5)
+        self.assertFalse(serial.complete)
+        self.assertEqual(serial.number_of_cliques(), 5)
+        for workers in (2, 3):
+            cliques = Cliques(self.snapshot, min_size=2, limit=5,
+                              workers=workers)
+            self.assertFalse(cliques.complete)
+            self.assertEqual(cliques.offsets.tolist(), serial.offsets.tolist())
+            self.assertEqual(cliques.members.tolist(), serial.members.tolist())
+
+    def test_covers(self):
+        number = len(list(nx.find_cliques(self.graph)))
+        complete = Cliques(self.snapshot, min_size=2)
+        self.assertTrue(complete.covers(2, MAX_CLIQUES))
+        self.assertTrue(complete.covers(2, number))
+        self.assertTrue(complete.covers(2, None))
+        self.assertFalse(complete.covers(2, number - 2))
+        self.assertFalse(complete.covers(3, MAX_CLIQUES))
+        limited = Cliques(self.snapshot, min_size=2, limit=5)
+        self.assertTrue(limited.covers(2, 5))
+        self.assertFalse(limited.covers(2, 6))
+        self.assertFalse(limited.covers(2, 4))
+
+    def test_graph_keeps_cliques_which_cover_request(self):
+        graph = Graphs({'graphtype': 'Undirected'}, layout=None,
+                       data='\n'.join('%s %s' % edge
+                                      for edge in self.graph.edges()))
+        cliques = graph.get_cliques(2)
+        self.assertIs(graph.get_cliques(2, 100), cliques)
+        limited = graph.get_cliques(2, 5)
+        self.assertIsNot(limited, cliques)
+        self.assertEqual(limited.number_of_cliques(), 5)
+        self.assertIs(graph.get_cliques(2, 5), limited)
+
+
+class FindCliquesViewTest(ViewTestCase):
+    def setUp(self):
+        super(FindCliquesViewTest, self).setUp()
+        patcher = mock.patch.object(Graphs, 'analysis_cache', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.graph = clique_graph()
+        self.graph.remove_node('isolated')
+        lines = '\n'.join('%s %s' % edge for edge in self.graph.edges())
+        response = self.client.post('/upload', data={
+            'file': (StringIO(lines), 'graph.txt'),
+            'graphtype': 'Undirected'})
+        self.assertEqual(response.status_code, 302)
+
+    def find(self, **args):
+        response = self.client.get('/_find_cliques', query_string=args)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def test_pages(self):
+        expected = sort_groups(nx.find_cliques(self.graph))
+        first = self.find(pageSize=10)
+        self.assertEqual(first['numberOfCliques'], len(expected))
+        self.assertEqual(first['pages'], -(-len(expected) // 10))
+        self.assertTrue(first['complete'])
+        found = []
+        for page in range(1, first['pages'] + 1):
+            result = self.find(page=page, pageSize=10)
+            self.assertEqual(result['page'], page)
+            found.extend(result['cliques'])
+        self.assertEqual(sort_groups(found), expected)
+        self.assertEqual(self.find(pageSize=0)['pageSize'], 1)
+
+    def test_minimum_size_and_limit(self):
+        expected = [clique for clique in nx.find_cliques(self.graph)
+                    if len(clique) >= 4]
+        result = self.find(minSize=4, limit=MAX_CLIQUES + 1)
+        self.assertEqual(sort_groups(result['cliques']), sort_groups(expected))
+        self.assertTrue(result['complete'])
+        result = self.find(minSize=2, limit=3, pageSize=2)
+        self.assertEqual(result['numberOfCliques'], 3)
+        self.assertEqual(result['pages'], 2)
+        self.assertFalse(result['complete'])
+        result = self.find(minSize=2, limit=0)
+        self.assertEqual(result['numberOfCliques'], 1)
+
+    def test_empty_result(self):
+        result = self.find(minSize=100)
+        self.assertEqual(result['cliques'], [])
+        self.assertEqual(result['numberOfCliques'], 0)
+        self.assertEqual(result['pages'], 1)
+        self.assertTrue(result['complete'])
+
+
+if __name__ == '__main__':
+    unittest.main()
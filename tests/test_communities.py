@@ -0,0 +1,100 @@
+"""
+Tests of the levels of communities which are detected lazily by Girvan -
+Newman algorithm, against the detection of all levels at once with networkx.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import unittest
+
+import networkx as nx
+
+from mvc.controller.analysis import Community
+from tests.test_brandes import small_graph
+from tests.test_snapshot import sort_groups
+
+
+def eager_levels(graph, weight='weight'):
+    """
+    Detects all levels of communities of a graph with Girvan - Newman
+    algorithm, as they were detected before levels were detected lazily.
+
+    :param graph Networkx graph.
+    :param weight Edge data key corresponding to the edge weight.
+    :return List of the sorted groups of nodes of every level.
+    """
+    g = nx.Graph(graph)
+    levels = []
+    while g.number_of_edges() > 0:
+        components = nx.number_connected_components(g)
+        while nx.number_connected_components(g) <= components:
+            betweenness = nx.edge_betweenness_centrality(g, weight=weight)
+            highest = max(betweenness.values())
+            for edge in g.edges():
+                if betweenness[edge] == highest:
+                    g.remove_edge(*edge)
+        levels.append(sort_groups(nx.connected_components(g)))
+    return levels
+
+
+def chain_of_cliques():
+    """ Creates a chain of cliques of different sizes with a pendant node. """
+    graph = nx.Graph()
+    start = 0
+    for size in (3, 4, 5):
+        graph.add_edges_from((start + i, start + j) for i in range(size)
+                             for j in range(i + 1, size))
+        if start:
+            graph.add_edge(start - 1, start)
+        start += size
+    graph.add_edge(start - 1, start)
+    return graph
+
+
+class CommunityTest(unittest.TestCase):
+    def graphs(self):
+        return [chain_of_cliques(), small_graph(nx.Graph()),
+                nx.Graph([(1, 2), (3, 4)]), nx.karate_club_graph(),
+                nx.florentine_families_graph()]
+
+    def test_levels_match_eager_detection(self):
+        for graph in self.graphs():
+            expected = eager_levels(graph)
+            communities = Community(graph)
+            for level, groups in enumerate(expected, 1):
+                self.assertEqual(sort_groups(communities.get_level(level)),
+                                 groups)
+            self.assertEqual(communities.number_of_levels(),
+                             len(expected) - 1)
+            self.assertEqual(sort_groups(communities.get_level(len(expected) + 1)),
+                             expected[-1])
+
+    def test_levels_are_detected_on_demand(self):
+        graph = chain_of_cliques()
+        expected = eager_levels(graph)
+        self.assertTrue(len(expected) > 3)
+        communities = Community(graph)
+        self.assertEqual(communities.levels, [])
+        self.assertEqual(sort_groups(communities.get_level(1)), expected[0])
+        self.assertEqual(len(communities.levels), 2)
+        self.assertEqual(communities.number_of_levels(), 2)
+        self.assertEqual(sort_groups(communities.get_level(2)), expected[1])
+        self.assertEqual(len(communities.levels), 3)
+        self.assertEqual(communities.number_of_levels(), 3)
+
+    def test_communities_are_ordered_by_size(self):
+        communities = Community(chain_of_cliques())
+        for level in range(1, 4):
+            sizes = [len(group) for group in communities.get_level(level)]
+            self.assertEqual(sizes, sorted(sizes, reverse=True))
+
+    def test_graph_without_edges(self):
+        graph = nx.Graph()
+        graph.add_nodes_from([1, 2, 3])
+        communities = Community(graph)
+        self.assertEqual(sort_groups(communities.get_level(1)),
+                         [[1], [2], [3]])
+        self.assertEqual(communities.number_of_levels(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Tests of the summary of all shortest path lengths of a graph, which is built
+with a single traversal from every node, against networkx.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import unittest
+
+import networkx as nx
+
+from mvc.controller.graph import summarize_distances
+from mvc.controller.snapshot import create_snapshot
+from tests.test_brandes import small_graph
+
+
+class SummarizeDistancesTest(unittest.TestCase):
+    def assert_closeness(self, graph, weighted):
+        summary = summarize_distances(create_snapshot(graph), weighted)
+        distance = 'weight' if weighted else None
+        expected = nx.closeness_centrality(graph, distance=distance)
+        for node, value in summary.closeness().items():
+            self.assertAlmostEqual(value, expected[node])
+        return summary
+
+    def test_disconnected(self):
+        graph = small_graph(nx.Graph())
+        summary = self.assert_closeness(graph, False)
+        self.assertEqual(summary.diameter, None)
+        components = [graph.subgraph(nodes)
+                      for nodes in nx.connected_components(graph)]
+        expected = [nx.average_shortest_path_length(component)
+                    for component in components]
+        self.assertAlmostEqual(summary.average_shortest_path_length,
+                               sum(expected) / len(expected))
+
+    def test_connected(self):
+        graph = small_graph(nx.Graph())
+        graph.remove_nodes_from([6, 7, 8])
+        for weighted in (False, True):
+            summary = self.assert_closeness(graph, weighted)
+            weight = 'weight' if weighted else None
+            self.assertAlmostEqual(
+                summary.average_shortest_path_length,
+                nx.average_shortest_path_length(graph, weight=weight))
+        summary = summarize_distances(create_snapshot(graph))
+        self.assertEqual(summary.diameter, nx.diameter(graph))
+
+    def test_directed(self):
+        graph = small_graph(nx.DiGraph())
+        self.assert_closeness(graph, False)
+        self.assert_closeness(graph, True)
+        strong = graph.subgraph([1, 2, 3, 4])
+        summary = summarize_distances(create_snapshot(strong))
+        self.assertEqual(summary.diameter, nx.diameter(strong))
+        self.assertAlmostEqual(summary.average_shortest_path_length,
+                               nx.average_shortest_path_length(strong))
+
+    def test_negative_weights(self):
+        graph = nx.Graph()
+        graph.add_edge(1, 2, weight=-1.0)
+        self.assertRaises(ValueError, summarize_distances,
+                          create_snapshot(graph), True)
+
+
+if __name__ == '__main__':
+    unittest.main()
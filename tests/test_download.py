@@ -0,0 +1,73 @@
+"""
+Tests of the downloads of a graph which is stored on disk.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import shutil
+import tempfile
+import unittest
+from cStringIO import StringIO
+
+from mvc.controller.graph import Graphs
+from mvc.controller.graphformat import iter_binary, read_edge_list
+from tests.views import ViewTestCase, mock
+
+import networkx as nx
+
+
+EDGES = 'a b 1.5\nb c 2\nc a 0.25\nc d 1\n'
+
+
+class DiskGraphDownloadTest(ViewTestCase):
+    def setUp(self):
+        super(DiskGraphDownloadTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        for name, value in (('disk_threshold', 0),
+                            ('disk_directory', self.directory),
+                            ('analysis_cache', None)):
+            patcher = mock.patch.object(Graphs, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        response = self.client.post('/upload', data={
+            'file': (StringIO(EDGES), 'graph.txt'),
+            'graphtype': 'Undirected'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.location.endswith('/diagrams'))
+
+    def tearDown(self):
+        super(DiskGraphDownloadTest, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def test_graph_is_on_disk(self):
+        self.assertTrue(self.registry[self.user].graph.out_of_core)
+
+    def test_header_hides_image(self):
+        response = self.client.get('/diagrams')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('download_graph_binary', response.data)
+        self.assertNotIn('download_graph_image', response.data)
+
+    def test_download_graph(self):
+        response = self.client.get('/download_graph')
+        self.assertEqual(response.status_code, 200)
+        expected = read_edge_list(nx.Graph(), EDGES)
+        graph = read_edge_list(nx.Graph(), response.data)
+        self.assertEqual(sorted(graph.edges(data=True)),
+                         sorted(expected.edges(data=True)))
+
+    def test_download_graph_binary(self):
+        response = self.client.get('/download_graph_binary')
+        self.assertEqual(response.status_code, 200)
+        snapshot = self.registry[self.user].graph.snapshot
+        self.assertEqual(response.data, ''.join(iter_binary(snapshot)))
+
+    def test_unavailable_downloads_redirect(self):
+        for route in ('/download_graph_image', '/download_node_info',
+                      '/download_edge_info'):
+            response = self.client.get(route)
+            self.assertEqual(response.status_code, 302, route)
+            self.assertTrue(response.location.endswith('/diagrams'), route)
+
+
+if __name__ == '__main__':
+    unittest.main()
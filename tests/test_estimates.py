@@ -0,0 +1,168 @@
+"""
+Tests of the estimates of diameter and average shortest path lengths of large
+graphs, against networkx.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import json
+import random
+import unittest
+from cStringIO import StringIO
+
+import networkx as nx
+
+from mvc.controller.graph import (Estimate, Graphs, estimate_diameter,
+                                  estimate_average_shortest_path_length)
+from mvc.controller.snapshot import create_snapshot
+from tests.test_brandes import small_graph
+from tests.test_graph import create_graph
+from tests.views import ViewTestCase, mock
+
+
+def connected_graph(seed):
+    """ Generates a connected small-world graph with weights. """
+    graph = nx.connected_watts_strogatz_graph(60, 4, 0.2, seed=seed)
+    for u, v, data in graph.edges_iter(data=True):
+        data['weight'] = float((u * v) % 5 + 1)
+    return graph
+
+
+def threshold(value):
+    """ Lowers the number of nodes above which characteristics are estimated. """
+    patchers = [mock.patch.object(Graphs, 'approximation_threshold', value),
+                mock.patch.object(Graphs, 'sample_size', 8),
+                mock.patch.object(Graphs, 'analysis_cache', None)]
+    for patcher in patchers:
+        patcher.start()
+    return lambda: [patcher.stop() for patcher in patchers]
+
+
+class EstimateDiameterTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(7)
+
+    def test_bounds(self):
+        graphs = [connected_graph(seed) for seed in range(5)]
+        graphs.append(nx.karate_club_graph())
+        graphs.append(nx.DiGraph([(i, (i + 1) % 20) for i in range(20)] +
+                                 [(0, 10), (15, 5)]))
+        for graph in graphs:
+            estimate = estimate_diameter(create_snapshot(graph), 4)
+            diameter = nx.diameter(graph)
+            self.assertEqual(estimate.value, estimate.lower)
+            self.assertTrue(estimate.lower <= diameter <= estimate.upper)
+            self.assertEqual(estimate.confidence, 1.0)
+
+    def test_sample_of_all_nodes_is_exact(self):
+        graph = connected_graph(1)
+        estimate = estimate_diameter(create_snapshot(graph), len(graph))
+        self.assertEqual(estimate.lower, nx.diameter(graph))
+
+    def test_unreachable_nodes(self):
+        self.assertIsNone(estimate_diameter(
+            create_snapshot(small_graph(nx.Graph())), 4))
+        self.assertIsNone(estimate_diameter(
+            create_snapshot(nx.DiGraph([(1, 2), (2, 3)])), 4))
+
+
+class EstimateAverageShortestPathLengthTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(7)
+
+    def test_small_components_are_exact(self):
+        graph = small_graph(nx.Graph())
+        components = [graph.subgraph(nodes)
+                      for nodes in nx.connected_components(graph)]
+        for weighted in (False, True):
+            weight = 'weight' if weighted else None
+            expected = [nx.average_shortest_path_length(c, weight=weight)
+                        for c in components]
+            estimate = estimate_average_shortest_path_length(
+                create_snapshot(graph), weighted, 8)
+            self.assertAlmostEqual(estimate.value,
+                                   sum(expected) / len(expected))
+            self.assertAlmostEqual(estimate.lower, estimate.upper)
+
+    def test_confidence_interval(self):
+        covered = []
+        for seed in range(5):
+            graph = connected_graph(seed)
+            for weighted in (False, True):
+                weight = 'weight' if weighted else None
+                exact = nx.average_shortest_path_length(graph, weight=weight)
+                for i in range(4):
+                    estimate = estimate_average_shortest_path_length(
+                        create_snapshot(graph), weighted, 30)
+                    self.assertEqual(estimate.confidence, 0.95)
+                    self.assertTrue(estimate.lower < estimate.value <
+                                    estimate.upper)
+                    covered.append(estimate.lower <= exact <= estimate.upper)
+        # Interval covers exact value with probability 0.95.
+        self.assertTrue(sum(covered) >= 0.85 * len(covered))
+
+    def test_negative_weights(self):
+        graph = nx.Graph([(1, 2), (2, 3)])
+        graph[1][2]['weight'] = -1.0
+        graph[2][3]['weight'] = 1.0
+        self.assertIsNone(estimate_average_shortest_path_length(
+            create_snapshot(graph), True, 8))
+
+
+class ApproximationThresholdTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(7)
+        self.addCleanup(threshold(40))
+
+    def test_large_graphs_are_estimated(self):
+        graph = connected_graph(3)
+        estimated = create_graph(graph)
+        self.assertTrue(estimated.is_approximate)
+        diameter = estimated.diameter
+        self.assertIsInstance(diameter, Estimate)
+        self.assertTrue(diameter.lower <= nx.diameter(graph) <= diameter.upper)
+        paths = estimated.average_shortest_path_length
+        self.assertEqual(len(paths), 2)
+        for weighted, estimate in zip((False, True), paths):
+            self.assertIsInstance(estimate, Estimate)
+            self.assertAlmostEqual(
+                estimate.value,
+                nx.average_shortest_path_length(
+                    graph, weight='weight' if weighted else None),
+                delta=estimate.upper - estimate.lower)
+
+    def test_small_graphs_are_exact(self):
+        graph = nx.karate_club_graph()
+        exact = create_graph(graph)
+        self.assertFalse(exact.is_approximate)
+        self.assertEqual(exact.diameter, nx.diameter(graph))
+        self.assertAlmostEqual(exact.average_shortest_path_length[0],
+                               nx.average_shortest_path_length(graph))
+
+
+class GraphCharacteristicsViewTest(ViewTestCase):
+    def setUp(self):
+        super(GraphCharacteristicsViewTest, self).setUp()
+        random.seed(7)
+        self.addCleanup(threshold(40))
+        self.graph = connected_graph(4)
+        lines = '\n'.join('%s %s' % edge for edge in self.graph.edges())
+        response = self.client.post('/upload', data={
+            'file': (StringIO(lines), 'graph.txt'),
+            'graphtype': 'Undirected'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_estimates_are_sent_with_bounds(self):
+        response = self.client.get('/_graph_characteristics')
+        self.assertEqual(response.status_code, 200)
+        characteristics = json.loads(response.data)
+        diameter = characteristics['diameter']
+        self.assertEqual(diameter['confidence'], 1.0)
+        self.assertTrue(diameter['lower'] <= nx.diameter(self.graph) <=
+                        diameter['upper'])
+        [path] = characteristics['averagePath']
+        self.assertEqual(path['confidence'], 0.95)
+        self.assertTrue(path['lower'] <= path['value'] <= path['upper'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+Tests of graph objects which are analyzed and of the metrics which are kept
+with them.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import pickle
+import unittest
+
+import networkx as nx
+
+from mvc.controller.graph import Graphs, MetricStore
+from tests.models import mock
+
+
+def create_graph(graph, graphtype='Undirected'):
+    """
+    Creates a graph object by uploading the edges of a networkx graph.
+
+    :param graph Networkx graph.
+    :param graphtype Type of graph, 'Directed' or 'Undirected'.
+    :return Graphs object.
+    """
+    lines = []
+    for u, v, data in graph.edges_iter(data=True):
+        if 'weight' in data:
+            lines.append('%s %s %r' % (u, v, data['weight']))
+        else:
+            lines.append('%s %s' % (u, v))
+    return Graphs({'graphtype': graphtype}, layout=None, data='\n'.join(lines))
+
+
+def barabasi_graph(nodes=4, graphtype='Undirected'):
+    """ Generates a growing graph of Albert Barabasi model. """
+    return Graphs({'model': 'barabasi', 'nodes': nodes,
+                   'graphtype': graphtype}, layout=None, upload=False)
+
+
+class MetricStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = MetricStore()
+        for name in ('closeness', 'betweenness', 'is_weighted', 'diameter'):
+            self.store.add(name)
+
+    def current(self):
+        return sorted(name for name in ('closeness', 'betweenness',
+                                        'is_weighted', 'diameter')
+                      if self.store.is_current(name))
+
+    def test_weights_keep_metrics_of_structure(self):
+        changes = self.store.changes
+        self.store.invalidate('weights')
+        self.assertEqual(self.store.revision, 1)
+        self.assertEqual(self.store.changes, changes + 1)
+        self.assertEqual(self.current(), ['closeness', 'diameter'])
+        self.store.invalidate('nodes')
+        self.assertEqual(self.current(), [])
+
+    def test_stale_metrics_are_not_carried(self):
+        self.store.invalidate('nodes', 'edges')
+        self.store.add('betweenness', 0.05)
+        self.store.invalidate('weights')
+        self.assertEqual(self.current(), [])
+        self.assertEqual(self.store.get('betweenness'), 0.05)
+
+    def test_edges_keep_metrics_of_nodes_only(self):
+        self.store.add('unknown')
+        self.store.invalidate('edges')
+        self.assertEqual(self.current(), [])
+        self.assertFalse(self.store.is_current('unknown'))
+
+
+class GrowingGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = barabasi_graph()
+        self.graph.add_data()
+
+    def assert_degrees(self):
+        expected = nx.degree_centrality(self.graph.graph)
+        for node, value in expected.items():
+            self.assertAlmostEqual(self.graph.graph.node[node]['degree'],
+                                   value)
+
+    def test_growth_invalidates_metrics(self):
+        revision = self.graph.metrics.revision
+        self.assertTrue(self.graph.data_exists())
+        self.graph.add_new_node_barabasi_model()
+        self.assertEqual(self.graph.metrics.revision, revision + 1)
+        self.assertFalse(self.graph.data_exists())
+        self.assertEqual(self.graph.number_of_nodes, 5)
+        self.graph.add_data()
+        self.assertTrue(self.graph.data_exists())
+        self.assert_degrees()
+        self.graph.delete_node()
+        self.assertEqual(self.graph.metrics.revision, revision + 2)
+        self.assertFalse(self.graph.data_exists())
+        self.assertEqual(self.graph.number_of_nodes, 4)
+        self.graph.add_data()
+        self.assert_degrees()
+
+    def test_initial_nodes_are_not_deleted(self):
+        revision = self.graph.metrics.revision
+        self.graph.delete_node()
+        self.assertEqual(self.graph.metrics.revision, revision)
+        self.assertTrue(self.graph.data_exists())
+
+    def test_only_stale_metrics_are_calculated(self):
+        self.graph.metrics.invalidate('weights')
+        spies = {}
+        for name in ('calculate_betweeness_centrality',
+                     'calculate_closeness_centrality',
+                     'calculate_degree_centrality'):
+            patcher = mock.patch.object(self.graph, name,
+                                        wraps=getattr(self.graph, name))
+            spies[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+        self.graph.add_data()
+        self.assertTrue(spies['calculate_betweeness_centrality'].called)
+        self.assertFalse(spies['calculate_closeness_centrality'].called)
+        self.assertFalse(spies['calculate_degree_centrality'].called)
+        self.assertTrue(self.graph.data_exists())
+
+
+class PickledGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = create_graph(nx.karate_club_graph())
+
+    def test_size_is_bounded(self):
+        size = len(pickle.dumps(self.graph, 2))
+        self.graph.get_communities().get_level(4)
+        self.graph.get_communities('louvain').get_level(1)
+        self.graph.get_cliques()
+        self.graph.distance_summary
+        n = self.graph.number_of_nodes
+        m = self.graph.number_of_edges
+        # Levels of communities and removed edges, which are int32 arrays.
+        bound = 3 * 1024 + 4 * (4 * n + 3 * n) + 8 * m
+        self.assertLess(len(pickle.dumps(self.graph, 2)) - size, bound)
+
+    def test_communities_are_detected_after_unpickling(self):
+        expected = create_graph(nx.karate_club_graph()).get_communities()
+        levels = [expected.get_level(level) for level in range(1, 6)]
+        self.graph.get_communities().get_level(2)
+        graph = pickle.loads(pickle.dumps(self.graph, 2))
+        communities = graph.get_communities()
+        self.assertIsNone(communities.algorithm)
+        self.assertEqual(communities.get_level(2), levels[1])
+        self.assertIsNone(communities.algorithm)
+        for level in range(1, 6):
+            self.assertEqual(
+                sorted(map(sorted, communities.get_level(level))),
+                sorted(map(sorted, levels[level - 1])))
+            self.assertAlmostEqual(communities.get_modularity(level),
+                                   expected.get_modularity(level))
+        self.assertEqual(communities.number_of_levels(),
+                         expected.number_of_levels())
+
+    def test_transient_metrics_are_calculated_again(self):
+        cliques = self.graph.get_cliques().get_page(1)
+        closeness = self.graph.distance_summary.closeness()
+        graph = pickle.loads(pickle.dumps(self.graph, 2))
+        self.assertFalse(graph.metrics.is_current('cliques'))
+        self.assertEqual(graph.get_cliques().get_page(1), cliques)
+        self.assertEqual(graph.distance_summary.closeness(), closeness)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,254 @@
+"""
+Tests of the registry of graphs which are being analyzed, of its session
+stores and of the removal of the directories of graphs which are stored on
+disk.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import networkx as nx
+
+from mvc.controller.diskgraph import create_disk_graph
+from mvc.controller.sessionstore import MemoryStore, SQLiteStore
+from tests import models
+from tests.models import mock, patch_models
+from tests.test_graph import create_graph
+
+GraphRegistry = None
+registry_module = None
+patchers = patch_models()
+
+
+def setUpModule():
+    """
+    Imports registry with fake models of datastore. Registries of tests
+    persist graphs with the functions which are given to them instead.
+    """
+    global GraphRegistry, registry_module
+    for patcher in patchers:
+        patcher.start()
+    from mvc.controller.graphfile import GraphRegistry
+    registry_module = sys.modules['mvc.controller.graphfile']
+
+
+def tearDownModule():
+    for patcher in reversed(patchers):
+        patcher.stop()
+
+
+class Graph:
+    """ Graph of a progress, whose edges are stored on disk. """
+    def __init__(self, disk):
+        self.disk = disk
+
+
+class Project:
+    """ Progress of graph analysis. """
+    def __init__(self, disk=None):
+        self.filename = 'file.txt'
+        self.graph = Graph(disk)
+
+
+class DiskGraphRemovalTest(unittest.TestCase):
+    def setUp(self):
+        self.parent = tempfile.mkdtemp()
+        self.persisted = {}
+
+    def tearDown(self):
+        shutil.rmtree(self.parent)
+
+    def disk_project(self):
+        return Project(create_disk_graph('a b\nb c\nc a\n', False, self.parent))
+
+    def registry(self, store=None, budget=1 << 30):
+        def persist(project):
+            self.persisted[id(project)] = project
+            return id(project)
+        return GraphRegistry(self.persisted.get, persist, store, budget=budget,
+                             sizeof=lambda project: 1)
+
+    def test_failed_upload_removes_directory(self):
+        self.assertRaises(IOError, create_disk_graph, 'a b\na b c d\n', False,
+                          self.parent)
+        self.assertEqual(os.listdir(self.parent), [])
+
+    def test_pop_removes_directory(self):
+        registry = self.registry()
+        project = self.disk_project()
+        registry['user'] = project
+        registry.pop('user')
+        self.assertFalse(os.path.exists(project.graph.disk.directory))
+
+    def test_replacement_removes_directory(self):
+        for store in (None, MemoryStore()):
+            registry = self.registry(store)
+            first, second = self.disk_project(), self.disk_project()
+            registry['user'] = first
+            registry['user'] = second
+            self.assertFalse(os.path.exists(first.graph.disk.directory))
+            self.assertTrue(os.path.exists(second.graph.disk.directory))
+            registry['user'] = second
+            self.assertTrue(os.path.exists(second.graph.disk.directory))
+
+    def test_saved_graph_is_kept(self):
+        registry = self.registry()
+        project = self.disk_project()
+        project.graph.disk.persistent = True
+        registry['user'] = project
+        registry.pop('user')
+        self.assertTrue(os.path.exists(project.graph.disk.directory))
+
+    def test_evicted_graph_is_kept_until_it_is_removed(self):
+        registry = self.registry(budget=1)
+        evicted, project = self.disk_project(), self.disk_project()
+        registry['evicted'] = evicted
+        registry['user'] = project
+        self.assertIn('evicted', registry.evicted)
+        self.assertTrue(os.path.exists(evicted.graph.disk.directory))
+        registry.close()
+        self.assertFalse(os.path.exists(evicted.graph.disk.directory))
+        self.assertFalse(os.path.exists(project.graph.disk.directory))
+
+    def test_stored_graphs_are_kept_at_exit(self):
+        registry = self.registry(MemoryStore())
+        project = self.disk_project()
+        registry['user'] = project
+        registry.close()
+        self.assertTrue(os.path.exists(project.graph.disk.directory))
+
+
+class EvictionTest(unittest.TestCase):
+    """
+    Tests of the eviction of graphs from a registry, whose time is given by a
+    fake clock.
+    """
+    def setUp(self):
+        self.time = 0
+        self.persisted = {}
+        self.registry = GraphRegistry(self.persisted.get, self.persist,
+                                      budget=2, idle_time=10,
+                                      sizeof=lambda project: project.size,
+                                      clock=lambda: self.time)
+
+    def persist(self, project):
+        self.assertFalse(self.registry.lock._is_owned())
+        self.persisted[id(project)] = project
+        return id(project)
+
+    def project(self, size=1):
+        project = Project()
+        project.size = size
+        return project
+
+    def test_idle_graphs_are_evicted(self):
+        idle, active = self.project(), self.project()
+        self.registry['idle'] = idle
+        self.time = 5
+        self.registry['active'] = active
+        self.time = 12
+        self.assertIs(self.registry['active'], active)
+        self.assertEqual(list(self.registry.entries), ['active'])
+        self.assertEqual(self.persisted, {})
+        self.registry.flush('active')
+        self.assertEqual(self.registry.evicted, {'idle': id(idle)})
+        self.assertIs(self.registry['idle'], idle)
+        self.assertEqual(self.registry.evicted, {})
+
+    def test_least_recently_used_graphs_are_evicted(self):
+        projects = [self.project() for i in range(3)]
+        for i, project in enumerate(projects):
+            self.time = i
+            self.registry[i] = project
+        self.assertEqual(list(self.registry.entries), [1, 2])
+        self.registry[1]
+        self.registry[3] = self.project(2)
+        self.assertEqual(list(self.registry.entries), [3])
+        self.assertEqual(self.registry.size, 2)
+        self.registry.flush(3)
+        self.assertEqual(sorted(self.persisted.values()),
+                         sorted(projects))
+
+    def test_graph_is_taken_back_before_it_is_persisted(self):
+        evicted, project = self.project(2), self.project(2)
+        self.registry['evicted'] = evicted
+        self.registry['user'] = project
+        self.assertIn('evicted', self.registry.evicted)
+        self.assertIs(self.registry['evicted'], evicted)
+        self.registry.flush('evicted')
+        self.assertEqual(self.persisted, {id(project): project})
+        self.assertEqual(self.registry.evicted, {'user': id(project)})
+
+
+class SessionStoreTest(unittest.TestCase):
+    """
+    Tests of registries of processes which share a store. Every registry has
+    its own connection to the same store.
+    """
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'sessions.db')
+        memory = MemoryStore()
+        self.stores = [(lambda: memory), (lambda: SQLiteStore(path))]
+
+    def registries(self, create_store):
+        return [GraphRegistry(None, None, create_store(),
+                              sizeof=lambda project: 1) for i in range(2)]
+
+    def project(self):
+        return models.Project('user', create_graph(nx.path_graph(4)))
+
+    def serializations(self):
+        return mock.patch.object(registry_module, 'serialize',
+                                 wraps=registry_module.serialize)
+
+    def test_set_graph_is_saved_once_when_flushed(self):
+        for create_store in self.stores:
+            first, second = self.registries(create_store)
+            with self.serializations() as serialize:
+                first['user'] = project = self.project()
+                self.assertIn('user', first)
+                self.assertIs(first['user'], project)
+                self.assertNotIn('user', second)
+                project.image = 'image'
+                first.flush('user')
+                first.flush('user')
+                self.assertEqual(serialize.call_count, 1)
+            self.assertEqual(second['user'].image, 'image')
+
+    def test_changes_are_loaded_by_other_registries(self):
+        for create_store in self.stores:
+            first, second = self.registries(create_store)
+            first['user'] = self.project()
+            first.flush('user')
+            project = second['user']
+            self.assertEqual(project.graph.number_of_edges, 3)
+            self.assertEqual(project.graph.diameter, 3)
+            second.flush('user')
+            loaded = first['user']
+            self.assertTrue(loaded.graph.metrics.is_current('diameter'))
+            self.assertEqual(loaded.graph.metrics.get('diameter'), 3)
+            self.assertIs(first['user'], loaded)
+            with self.serializations() as serialize:
+                first.flush('user')
+                self.assertFalse(serialize.called)
+
+    def test_removed_graphs_are_not_found(self):
+        for create_store in self.stores:
+            first, second = self.registries(create_store)
+            first['user'] = self.project()
+            first.flush('user')
+            self.assertIsNotNone(second['user'])
+            second.pop('user')
+            self.assertNotIn('user', first)
+            self.assertRaises(KeyError, first.__getitem__, 'user')
+            self.assertRaises(KeyError, second.__getitem__, 'user')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+"""
+Tests of the reading and writing of graph files in txt and binary format.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import struct
+import tempfile
+import unittest
+from cStringIO import StringIO
+
+import networkx as nx
+
+from mvc.controller.graphformat import (DIRECTED, DOUBLE_WEIGHTS, HEADER,
+                                        WEIGHTED, GraphFileError, is_binary,
+                                        estimate_edges, iter_binary, iter_lines,
+                                        load_binary, parse_edge_list,
+                                        read_binary, read_edge_list,
+                                        write_binary)
+from mvc.controller.snapshot import create_snapshot
+
+
+class EdgeListTest(unittest.TestCase):
+    def assert_error(self, data, line_number, message):
+        for chunk_size in (1, 3, 7, 1 << 16):
+            try:
+                read_edge_list(nx.Graph(), StringIO(data), chunk_size,
+                               batch_size=2)
+            except GraphFileError as e:
+                self.assertEqual(e.line_number, line_number)
+                self.assertEqual(str(e), 'Line %d: %s' % (line_number, message))
+                self.assertIsInstance(e, IOError)
+            else:
+                self.fail('%r was parsed with chunks of size %d' %
+                          (data, chunk_size))
+
+    def test_lines_across_chunks(self):
+        data = 'node1 node2\n\nnode2 node3 2.5\nnode3 node1'
+        for chunk_size in (1, 3, 7, 100):
+            self.assertEqual(list(iter_lines(StringIO(data), chunk_size)),
+                             data.split('\n'))
+        graph = read_edge_list(nx.DiGraph(), data, chunk_size=3, batch_size=2)
+        self.assertEqual(sorted(graph.edges(data=True)),
+                         [('node1', 'node2', {}),
+                          ('node2', 'node3', {'weight': 2.5}),
+                          ('node3', 'node1', {})])
+
+    def test_wrong_number_of_columns(self):
+        self.assert_error('a b\nb c\na b c d\n', 3,
+                          'expected 2 or 3 columns, found 4')
+        self.assert_error('a b\n\n  \nc\n', 4,
+                          'expected 2 or 3 columns, found 1')
+
+    def test_invalid_weight(self):
+        self.assert_error('a b 1\nb c 1e3\nc d one\n', 3,
+                          "invalid weight 'one'")
+
+    def test_last_line_without_terminator(self):
+        self.assert_error('a b 1\nb c 2\na\tb c d', 3,
+                          'expected 2 or 3 columns, found 4')
+
+    def test_edges_are_parsed_lazily(self):
+        edges = parse_edge_list('a b\nb c 1.5\nc')
+        self.assertEqual(next(edges), ('a', 'b'))
+        self.assertEqual(next(edges), ('b', 'c', {'weight': 1.5}))
+        self.assertRaises(GraphFileError, next, edges)
+
+
+def binary(graph):
+    """ Converts a networkx graph to binary format. """
+    return ''.join(iter_binary(create_snapshot(graph)))
+
+
+def sorted_edges(graph):
+    """ Gets the edges of a graph with the nodes of undirected ones sorted. """
+    if graph.is_directed():
+        return sorted(graph.edges(data=True))
+    return sorted(tuple(sorted((u, v))) + (data,)
+                  for u, v, data in graph.edges(data=True))
+
+
+class BinaryFormatTest(unittest.TestCase):
+    def setUp(self):
+        self.directed = nx.DiGraph([('a', 'b'), ('b', 'a'), ('b', 'c'),
+                                    ('c', 'c')])
+        self.directed.add_node('d')
+        # Weights which are exact in single precision.
+        self.single = nx.Graph()
+        self.single.add_weighted_edges_from([('a', 'b', 0.5), ('b', 'c', -2.0),
+                                             ('c', 'a', 1024.25)])
+        self.double = nx.Graph()
+        self.double.add_weighted_edges_from([('a', 'b', 0.1), ('b', 'c', 3.0),
+                                             ('x', 'y', 1.0 / 3)])
+
+    def assert_round_trip(self, graph, flags):
+        data = binary(graph)
+        self.assertTrue(is_binary(data))
+        self.assertEqual(HEADER.unpack_from(data)[2], flags)
+        self.assertEqual(estimate_edges(data), graph.number_of_edges())
+        contents = load_binary(data)
+        self.assertEqual(contents.directed, graph.is_directed())
+        self.assertEqual(sorted(contents.labels), sorted(graph.nodes()))
+        if flags & WEIGHTED:
+            itemsize = 8 if flags & DOUBLE_WEIGHTS else 4
+            self.assertEqual(contents.weights.dtype.itemsize, itemsize)
+        else:
+            self.assertIsNone(contents.weights)
+        loaded = read_binary(StringIO(data), batch_size=2)
+        self.assertEqual(loaded.is_directed(), graph.is_directed())
+        self.assertEqual(sorted(loaded.nodes()), sorted(graph.nodes()))
+        self.assertEqual(sorted_edges(loaded), sorted_edges(graph))
+
+    def test_directed(self):
+        self.assert_round_trip(self.directed, DIRECTED)
+
+    def test_single_precision_weights(self):
+        self.assert_round_trip(self.single, WEIGHTED)
+
+    def test_double_precision_weights(self):
+        self.assert_round_trip(self.double, WEIGHTED | DOUBLE_WEIGHTS)
+
+    def test_file_is_memory_mapped(self):
+        with tempfile.TemporaryFile() as data:
+            write_binary(create_snapshot(self.double), data)
+            data.seek(0)
+            self.assertTrue(is_binary(data))
+            self.assertEqual(data.tell(), 0)
+            self.assertEqual(sorted_edges(read_binary(data)),
+                             sorted_edges(self.double))
+
+    def assert_rejected(self, data, message):
+        try:
+            load_binary(data)
+        except GraphFileError as e:
+            self.assertEqual(str(e), 'Line 1: %s' % message)
+        else:
+            self.fail('invalid file was loaded')
+
+    def test_truncated_file(self):
+        for graph in (self.directed, self.single, self.double):
+            data = binary(graph)
+            self.assert_rejected(data[:-1], 'truncated file')
+            self.assert_rejected(data[:HEADER.size + 4], 'truncated file')
+            self.assert_rejected(data[:HEADER.size - 1], 'truncated header')
+
+    def test_unsupported_format(self):
+        data = binary(self.directed)
+        self.assert_rejected('NXGX' + data[4:], 'unsupported binary format')
+        self.assert_rejected(data[:4] + '\x02' + data[5:],
+                             'unsupported binary format')
+
+    def test_node_index_out_of_range(self):
+        data = binary(self.single)
+        n, m, size = HEADER.unpack_from(data)[4:]
+        offset = HEADER.size + size + (-size % 4)
+        for index in (n, -1):
+            for position in (offset, offset + 4 * m + 4 * (m - 1)):
+                invalid = (data[:position] + struct.pack('<i', index) +
+                           data[position + 4:])
+                self.assert_rejected(invalid, 'node index out of range')
+
+    def test_wrong_number_of_labels(self):
+        data = binary(self.directed)
+        header = list(HEADER.unpack_from(data))
+        header[4] += 1
+        self.assert_rejected(HEADER.pack(*header) + data[HEADER.size:],
+                             'expected 5 node labels, found 4')
+
+
+if __name__ == '__main__':
+    unittest.main()
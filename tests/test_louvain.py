@@ -0,0 +1,116 @@
+"""
+Tests of the levels of communities which are detected by Louvain algorithm of
+the community (python-louvain) library, and of their modularity.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import unittest
+
+import community
+import networkx as nx
+
+from mvc.controller.analysis import LouvainCommunities
+from mvc.controller.louvain import modularity, weighted_adjacency
+
+
+# Modularity of the best partition of Zachary's karate club graph.
+KARATE_MODULARITY = 0.4198
+
+
+def library_modularity(partition, graph, weight='weight'):
+    """
+    Calculates modularity as community.modularity() defines it.
+
+    :param partition Dictionary of community labels keyed by node.
+    :param graph Undirected networkx graph.
+    :param weight Edge data key corresponding to the edge weight.
+    :return Modularity.
+    """
+    links = float(graph.size(weight=weight))
+    inside = {}
+    degrees = {}
+    for node in graph:
+        c = partition[node]
+        degrees[c] = degrees.get(c, 0.0) + graph.degree(node, weight=weight)
+        for neighbor, data in graph[node].items():
+            if partition[neighbor] == c:
+                w = data.get(weight, 1)
+                inside[c] = inside.get(c, 0.0) + (w if neighbor == node
+                                                  else w / 2.0)
+    return sum(inside.get(c, 0.0) / links - (degrees[c] / (2 * links)) ** 2
+               for c in degrees)
+
+
+def weighted_graph():
+    """ Creates a weighted graph with a self-loop and two components. """
+    graph = nx.Graph()
+    graph.add_weighted_edges_from([(1, 2, 3.0), (2, 3, 1.0), (1, 3, 2.0),
+                                   (3, 4, 0.5), (4, 5, 2.0), (5, 6, 1.0),
+                                   (4, 6, 1.5), (6, 6, 1.0), (7, 8, 1.0)])
+    return graph
+
+
+def partitions(communities):
+    """ Gets the partitions of all levels of communities. """
+    return [dict((node, label) for label, group in
+                 enumerate(communities.get_level(level)) for node in group)
+            for level in range(1, communities.number_of_levels() + 1)]
+
+
+class LouvainTest(unittest.TestCase):
+    def test_modularity(self):
+        for graph in (nx.karate_club_graph(), weighted_graph()):
+            communities = LouvainCommunities(graph)
+            adjacency = weighted_adjacency(graph, graph.nodes())
+            for level, partition in enumerate(partitions(communities), 1):
+                labels = [partition[node] for node in graph.nodes()]
+                expected = community.modularity(partition, graph)
+                self.assertAlmostEqual(modularity(adjacency, labels), expected)
+                self.assertAlmostEqual(library_modularity(partition, graph),
+                                       expected)
+                self.assertAlmostEqual(communities.get_modularity(level),
+                                       expected)
+
+    def test_karate(self):
+        communities = LouvainCommunities(nx.karate_club_graph())
+        self.assertTrue(communities.get_modularity(1) >=
+                        KARATE_MODULARITY - 0.01)
+        values = [communities.get_modularity(level) for level
+                  in range(1, communities.number_of_levels() + 1)]
+        self.assertEqual(values, sorted(values, reverse=True))
+        sizes = [len(group) for group in communities.get_level(1)]
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+
+    def test_levels_are_nested(self):
+        levels = partitions(LouvainCommunities(nx.karate_club_graph()))
+        self.assertTrue(len(levels) > 1)
+        for coarse, fine in zip(levels, levels[1:]):
+            merged = {}
+            for node, label in fine.items():
+                self.assertEqual(merged.setdefault(label, coarse[node]),
+                                 coarse[node])
+
+    def test_levels_are_reproducible(self):
+        graph = nx.karate_club_graph()
+        self.assertEqual(partitions(LouvainCommunities(graph)),
+                         partitions(LouvainCommunities(graph)))
+
+    def test_non_positive_weights_are_ignored(self):
+        graph = weighted_graph()
+        graph[1][2]['weight'] = -1.0
+        communities = LouvainCommunities(graph)
+        unweighted = nx.Graph(graph.edges())
+        for level, partition in enumerate(partitions(communities), 1):
+            self.assertAlmostEqual(communities.get_modularity(level),
+                                   community.modularity(partition, unweighted))
+
+    def test_graph_without_edges(self):
+        graph = nx.Graph()
+        graph.add_nodes_from([1, 2, 3])
+        communities = LouvainCommunities(graph)
+        self.assertEqual(sorted(communities.get_level(1)), [[1], [2], [3]])
+        self.assertEqual(communities.get_modularity(1), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
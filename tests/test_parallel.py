@@ -0,0 +1,175 @@
+"""
+Tests of the traversals of graph which run in parallel on pools of worker
+processes, against the ones which run serially.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import multiprocessing
+import unittest
+
+import networkx as nx
+
+from mvc.controller import graph as graph_module, parallel
+from mvc.controller.brandes import accumulate_betweenness
+from mvc.controller.graph import (Graphs, label_connected_components,
+                                  summarize_distances)
+from mvc.controller.parallel import WorkerPool, map_sources, run_tasks
+from mvc.controller.snapshot import create_snapshot
+from tests.models import mock
+from tests.test_graph import create_graph
+
+
+def weighted_graph():
+    """ Generates a connected weighted graph. """
+    graph = nx.connected_watts_strogatz_graph(40, 4, 0.3, seed=1)
+    for u, v, data in graph.edges_iter(data=True):
+        data['weight'] = float((u + v) % 3 + 1)
+    return nx.relabel_nodes(graph, dict((node, str(node)) for node in graph))
+
+
+def node_values(graph, name):
+    """ Gets the values of a metric of every node of a graph object. """
+    return dict((node, data[name])
+                for node, data in graph.graph.nodes_iter(data=True))
+
+
+class WorkerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = create_snapshot(weighted_graph())
+        self.pools = mock.patch.object(multiprocessing, 'Pool',
+                                       wraps=multiprocessing.Pool)
+
+    def test_map_sources(self):
+        adjacency = self.snapshot.adjacency(True)
+        sources = range(len(self.snapshot.nodes))
+        [expected] = map_sources(accumulate_betweenness, adjacency, sources, 1,
+                                 True, False)
+        results = map_sources(accumulate_betweenness, adjacency, sources, 2,
+                              True, False)
+        self.assertEqual(len(results), 2 * parallel.TASKS_PER_WORKER)
+        betweenness = [sum(values) for values in
+                       zip(*[partial for partial, edges in results])]
+        for value, exact in zip(betweenness, expected[0]):
+            self.assertAlmostEqual(value, exact)
+
+    def test_pool_is_reused(self):
+        pool = WorkerPool(2)
+        with self.pools as pools:
+            try:
+                for weighted in (False, True):
+                    summary = summarize_distances(self.snapshot, weighted, pool)
+                    expected = summarize_distances(self.snapshot, weighted)
+                    self.assertEqual(summary.closeness(), expected.closeness())
+                results = run_tasks([(summarize_distances, (), {}),
+                                     (summarize_distances, (True,), {})],
+                                    self.snapshot, pool)
+                self.assertEqual(results[1].closeness(),
+                                 expected.closeness())
+            finally:
+                pool.close()
+            self.assertEqual(pools.call_count, 1)
+        self.assertEqual(pool.calls, 3)
+        self.assertIsNone(pool.pool)
+
+
+class ParallelGraphTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(Graphs, 'analysis_cache', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.nxgraph = weighted_graph()
+
+    def analyze(self, workers):
+        graph = create_graph(self.nxgraph)
+        graph.workers = workers
+        graph.add_data(approximate=False)
+        graph.diameter
+        graph.average_shortest_path_length
+        return graph
+
+    def test_workers_match_serial(self):
+        serial = self.analyze(1)
+        with mock.patch.object(multiprocessing, 'Pool',
+                               wraps=multiprocessing.Pool) as pools:
+            graph = self.analyze(2)
+            # One pool for the metrics and one for the shortest path lengths.
+            self.assertEqual(pools.call_count, 2)
+        self.assertIsNone(graph.pool)
+        for name in ('betweenness', 'closeness', 'clustering', 'degree'):
+            values = node_values(graph, name)
+            for node, value in node_values(serial, name).items():
+                self.assertAlmostEqual(values[node], value)
+        self.assertEqual(graph.diameter, serial.diameter)
+        for value, expected in zip(graph.average_shortest_path_length,
+                                   serial.average_shortest_path_length):
+            self.assertAlmostEqual(value, expected)
+
+
+class ParallelMetricsTest(unittest.TestCase):
+    """
+    Tests of metrics which are calculated at the same time, as tasks of a
+    pool of worker processes.
+    """
+    def setUp(self):
+        patcher = mock.patch.object(Graphs, 'analysis_cache', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def graphs(self, graphtype):
+        nxgraph = weighted_graph()
+        if graphtype == 'Directed':
+            nxgraph = nxgraph.to_directed()
+            nxgraph.remove_edges_from([(u, v) for u, v in nxgraph.edges()
+                                       if int(u) % 3 == 0 and u < v])
+        serial = create_graph(nxgraph, graphtype)
+        serial.add_data(approximate=False)
+        graph = create_graph(nxgraph, graphtype)
+        graph.workers = 2
+        return serial, graph
+
+    def assert_metrics(self, graph, serial):
+        self.assertTrue(graph.data_exists(approximate=False))
+        for name, calculate in serial.required_metrics():
+            if name == 'edge_betweenness':
+                for u, v, data in serial.graph.edges_iter(data=True):
+                    self.assertAlmostEqual(graph.graph[u][v]['betweenness'],
+                                           data['betweenness'])
+                continue
+            values = node_values(graph, name)
+            for node, value in node_values(serial, name).items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(values[node], value, places=6)
+                else:
+                    self.assertEqual(values[node], value)
+
+    def test_parallel_matches_serial(self):
+        for graphtype in ('Undirected', 'Directed'):
+            serial, graph = self.graphs(graphtype)
+            with mock.patch.object(graph_module, 'run_tasks',
+                                   wraps=graph_module.run_tasks) as run:
+                graph.add_data(approximate=False, parallel=True)
+                self.assertEqual(run.call_count, 1)
+            functions = [task[0] for task in run.call_args[0][0]]
+            self.assertIn(label_connected_components, functions)
+            self.assert_metrics(graph, serial)
+
+    def test_only_stale_metrics_are_calculated(self):
+        serial, graph = self.graphs('Undirected')
+        graph.add_data(approximate=False, parallel=True)
+        graph.metrics.invalidate('weights')
+        self.assertTrue(graph.metrics.is_current('closeness'))
+        with mock.patch.object(graph_module, 'run_tasks',
+                               wraps=graph_module.run_tasks) as run:
+            graph.add_data(approximate=False, parallel=True)
+        functions = [task[0] for task in run.call_args[0][0]]
+        self.assertNotIn(summarize_distances, functions)
+        self.assertNotIn(label_connected_components, functions)
+        self.assertIn(graph_module.calculate_betweenness, functions)
+        self.assert_metrics(graph, serial)
+        with mock.patch.object(graph_module, 'run_tasks') as run:
+            graph.add_data(approximate=False, parallel=True)
+            self.assertEqual(run.call_args[0][0], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
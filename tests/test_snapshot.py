@@ -0,0 +1,77 @@
+"""
+Tests of the algorithms which run on the compact adjacency snapshot of a
+graph, against networkx.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import unittest
+
+import networkx as nx
+
+from mvc.controller.centrality import pagerank
+from mvc.controller.cliques import degeneracy_ordering, find_cliques
+from mvc.controller.graph import label_strong_components
+from mvc.controller.snapshot import create_snapshot
+from tests.test_brandes import small_graph
+
+
+def sort_groups(groups):
+    """ Sorts groups of nodes and the nodes of every group. """
+    return sorted(sorted(group) for group in groups)
+
+
+def node_groups(snapshot, groups):
+    """ Converts groups of node indices to sorted groups of nodes. """
+    return sort_groups([snapshot.nodes[i] for i in group] for group in groups)
+
+
+class SnapshotTest(unittest.TestCase):
+    def test_adjacency(self):
+        graph = small_graph(nx.DiGraph())
+        snapshot = create_snapshot(graph)
+        for i, neighbors in enumerate(snapshot.adjacency(True)):
+            node = snapshot.nodes[i]
+            self.assertEqual(
+                sorted((snapshot.nodes[j], w) for j, w in neighbors),
+                sorted((v, data['weight'])
+                       for v, data in graph[node].items()))
+
+    def test_strong_components(self):
+        graph = small_graph(nx.DiGraph())
+        graph.add_edge(8, 6)
+        snapshot = create_snapshot(graph)
+        components = label_strong_components(snapshot.adjacency())
+        self.assertEqual(node_groups(snapshot, components),
+                         sort_groups(nx.strongly_connected_components(graph)))
+
+    def test_pagerank(self):
+        graph = small_graph(nx.DiGraph())
+        snapshot = create_snapshot(graph)
+        for weighted in (False, True):
+            weight = 'weight' if weighted else None
+            expected = nx.pagerank(graph, weight=weight, tol=1.0e-10)
+            values = pagerank(snapshot, weighted=weighted, tol=1.0e-10)
+            for node, value in values.items():
+                self.assertAlmostEqual(value, expected[node], places=6)
+
+    def test_cliques(self):
+        graph = small_graph(nx.Graph())
+        graph.add_edges_from([(1, 5), (2, 4), (8, 8)])
+        graph.add_node(9)
+        snapshot = create_snapshot(graph)
+        order, adjacency = degeneracy_ordering(
+            snapshot.undirected().adjacency())
+        found, truncated = find_cliques(adjacency, range(len(order)))
+        self.assertFalse(truncated)
+        cliques = [[order[u] for u in clique] for node, clique in found]
+        self.assertEqual(node_groups(snapshot, cliques),
+                         sort_groups(nx.find_cliques(graph)))
+        found, truncated = find_cliques(adjacency, range(len(order)),
+                                        min_size=3, limit=1)
+        self.assertTrue(truncated)
+        self.assertEqual(len(found), 1)
+        self.assertTrue(len(found[0][1]) >= 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests of images of graphs, which are taken from render cache, restyled in
+place and pickled with the progress of analysis.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import pickle
+import unittest
+
+import networkx as nx
+
+from mvc.controller import visualization
+from mvc.controller.analysis import Path
+from mvc.controller.cache import AnalysisCache
+from mvc.controller.visualization import GraphImage, ImageStyle
+from tests.models import Project, mock
+from tests.test_brandes import small_graph
+from tests.test_graph import create_graph
+
+
+class GraphImageTest(unittest.TestCase):
+    def setUp(self):
+        self.clear_cache()
+        graph = create_graph(small_graph(nx.Graph()))
+        graph.set_node_pos('circular')
+        self.project = Project('user', graph)
+
+    def clear_cache(self):
+        patcher = mock.patch.object(
+            visualization, 'render_cache',
+            AnalysisCache(visualization.RENDER_CAPACITY, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_image(self, **style):
+        return GraphImage(ImageStyle(**style), self.project)
+
+    def test_rendered_image_is_cached(self):
+        image = self.create_image()
+        self.assertIsNotNone(image.axes)
+        self.assertEqual(visualization.render_cache.get(image.image_key()),
+                         image.url)
+        with mock.patch.object(visualization, 'new_axes') as new_axes:
+            cached = self.create_image()
+        self.assertFalse(new_axes.called)
+        self.assertIsNone(cached.axes)
+        self.assertEqual(cached.url, image.url)
+
+    def test_changed_image_is_drawn_again(self):
+        image = self.create_image()
+        with mock.patch.object(visualization, 'new_axes',
+                               wraps=visualization.new_axes) as new_axes:
+            other = self.create_image(ncolor='blue')
+        self.assertTrue(new_axes.called)
+        self.assertNotEqual(other.image_key(), image.image_key())
+        self.assertNotEqual(other.url, image.url)
+
+    def test_keys(self):
+        image = self.create_image()
+        layout, key = image.layout_key(), image.image_key()
+        image.image_style.font_size = 20
+        self.assertEqual(image.layout_key(), layout)
+        self.assertNotEqual(image.image_key(), key)
+        image.image_style.font_size = 12
+        self.assertEqual(image.image_key(), key)
+        image.path_image = True
+        image.paths = Path(self.project.graph, '1', '4', 'shortest',
+                           'unweighted')
+        self.assertEqual(image.layout_key(), layout)
+        self.assertNotEqual(image.image_key(), key)
+        image.path_image = False
+        self.project.graph.set_node_pos('shell')
+        self.assertNotEqual(image.layout_key(), layout)
+        self.assertNotEqual(image.image_key(), key)
+
+    def test_restyle_gives_url_of_full_render(self):
+        for component, name, value, style in (
+                ('node_color', 'node_color', 'blue', {'ncolor': 'blue'}),
+                ('node_size', 'node_size', 300, {'n_size': 300}),
+                ('edge_width', 'edge_width', 3.0, {'edge_width': 3.0}),
+                ('edge_color', 'edge_color', 'green', {'ecolor': 'green'}),
+                ('edge_style', 'edge_style', 'dashed', {'estyle': 'dashed'}),
+                ('font_size', 'font_size', 20, {'fsize': 20}),
+                ('font_color', 'font_color', 'blue', {'fcolor': 'blue'})):
+            image = self.create_image()
+            setattr(image.image_style, name, value)
+            self.assertTrue(image.restyle(component), component)
+            self.assertIsNone(
+                visualization.render_cache.get(image.image_key()), component)
+            self.assertEqual(self.create_image(**style).url, image.url,
+                             component)
+            self.clear_cache()
+
+    def test_restyle_needs_same_layout(self):
+        image = self.create_image()
+        self.project.graph.set_node_pos('shell')
+        image.image_style.node_color = 'blue'
+        self.assertFalse(image.restyle('node_color'))
+        self.assertFalse(image.restyle('node_shape'))
+
+    def test_cached_image_is_drawn_to_be_restyled(self):
+        self.create_image()
+        image = self.create_image()
+        self.assertIsNone(image.axes)
+        image.image_style.node_color = 'blue'
+        image.update_image('node_color')
+        self.assertIsNotNone(image.axes)
+        self.assertEqual(self.create_image(ncolor='blue').url, image.url)
+
+    def test_pickled_image_renders(self):
+        image = self.create_image()
+        image.image_communities(2)
+        state = image.__getstate__()
+        for name in ('axes', 'artists', 'retained', 'communities'):
+            self.assertNotIn(name, state)
+        restored = pickle.loads(pickle.dumps(image, 2))
+        self.assertIsNone(restored.axes)
+        self.assertIsNone(restored.communities)
+        self.clear_cache()
+        restored.update_image('node_size')
+        self.assertIsNotNone(restored.axes)
+        self.assertEqual(restored.communities.get_level(2),
+                         image.communities.get_level(2))
+        self.assertEqual(restored.url, image.url)
+        restored.image_style.node_size = 300
+        self.assertTrue(restored.restyle('node_size'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Helpers of tests of view functions, which run without App Engine.
+"""
+__author__ = 'Thodoris Sotiropoulos'
+
+import unittest
+
+from tests.models import mock, patch_models
+
+
+class ViewTestCase(unittest.TestCase):
+    """
+    Test case of view functions. Application is imported again with fake
+    models for every test case and requests are sent by a logged in user.
+    """
+    user = 'user'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.patchers = patch_models()
+        for patcher in cls.patchers:
+            patcher.start()
+        import main
+        import mvc.controller.graphfile
+        cls.app = main.app
+        cls.registry = mvc.controller.graphfile.graphfile
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.registry.close()
+        for patcher in reversed(cls.patchers):
+            patcher.stop()
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['user'] = self.user
+            session['login'] = True
+
+    def tearDown(self):
+        self.registry.pop(self.user, None)